@@ -0,0 +1,28 @@
+from django.db import migrations, models
+
+
+def fill_birth_months(apps, schema_editor):
+    Child = apps.get_model("people", "Child")
+
+    children = list(Child.objects.only("id", "birth_date"))
+    for child in children:
+        child.birth_month = child.birth_date.year * 12 + child.birth_date.month
+
+    Child.objects.bulk_update(children, ["birth_month"], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('people', '0005_child_security_deposit_child_tuition_override'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='child',
+            name='birth_month',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_birth_months, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,8 @@
-from django.db import models
+from datetime import date
 from decimal import Decimal
 
+from django.db import models
+
 HOUSEHOLD_TYPES = [
     ("CV", "Civil Servant"),
     ("P", "Public"),
@@ -8,40 +10,6 @@ HOUSEHOLD_TYPES = [
     ("M", "Military"),
 ]
 
-TUITION_RATES = {
-    # -----------------------
-    # Civil Servant (NASA)
-    # -----------------------
-    ("IN", "CV"): Decimal("1380.12"),
-    ("TL", "CV"): Decimal("1341.17"),
-    ("TR", "CV"): Decimal("1213.17"),
-    ("PS", "CV"): Decimal("978.33"),
-
-    # -----------------------
-    # Military (same as NASA)
-    # -----------------------
-    ("IN", "M"): Decimal("1380.12"),
-    ("TL", "M"): Decimal("1341.17"),
-    ("TR", "M"): Decimal("1213.17"),
-    ("PS", "M"): Decimal("978.33"),
-
-    # -----------------------
-    # Staff (10% discount vs NASA)
-    # -----------------------
-    ("IN", "S"): Decimal("1242.11"),  # 1380.12 * 0.9
-    ("TL", "S"): Decimal("1207.05"),  # 1341.17 * 0.9
-    ("TR", "S"): Decimal("1091.85"),  # 1213.17 * 0.9
-    ("PS", "S"): Decimal("880.50"),   # 978.33 * 0.9
-
-    # -----------------------
-    # Public
-    # -----------------------
-    ("IN", "P"): Decimal("1536.85"),
-    ("TL", "P"): Decimal("1493.74"),
-    ("TR", "P"): Decimal("1357.64"),
-    ("PS", "P"): Decimal("1100.17"),
-}
-
 class Household(models.Model):
     name = models.CharField(max_length=255, unique=True)
     address = models.TextField(blank=True)
@@ -76,6 +44,50 @@ class Parent(models.Model):
         return f"{self.first_name} {self.last_name}"
 
 
+def month_ordinal(d):
+    """
+    Months since year 0 of a date (year * 12 + month), so that ages in
+    months are a single subtraction, in Python or in SQL.
+    """
+
+    return d.year * 12 + d.month
+
+
+class ChildQuerySet(models.QuerySet):
+
+    def with_age_months(self, as_of=None):
+        """
+        Annotates `age_in_months`: whole calendar months on `as_of`
+        (default: today).
+        """
+
+        as_of_month = month_ordinal(as_of or date.today())
+
+        return self.annotate(
+            age_in_months=models.Value(as_of_month) - models.F("birth_month"),
+        )
+
+    def aged_between(self, min_months, max_months, as_of=None):
+        """
+        Children aged `min_months` to `max_months` inclusive on `as_of`,
+        as an indexed range on birth_month.
+        """
+
+        as_of_month = month_ordinal(as_of or date.today())
+
+        return self.filter(
+            birth_month__gte=as_of_month - max_months,
+            birth_month__lte=as_of_month - min_months,
+        )
+
+    def eligible_for(self, room, as_of=None):
+        """
+        Children within the room's age limits on `as_of`.
+        """
+
+        return self.aged_between(room.min_age_months, room.max_age_months, as_of)
+
+
 class Child(models.Model):
     household = models.ForeignKey(
         Household,
@@ -86,6 +98,9 @@ class Child(models.Model):
     first_name = models.CharField(max_length=100)
     last_name = models.CharField(max_length=100)
     birth_date = models.DateField()
+    # month_ordinal(birth_date), kept in step by save(); bulk writers
+    # set it themselves.
+    birth_month = models.PositiveIntegerField(editable=False, db_index=True)
     enrolled = models.BooleanField(default=True)
     notes = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -104,18 +119,26 @@ class Child(models.Model):
         blank=True,
     )
 
+    objects = ChildQuerySet.as_manager()
+
     class Meta:
         unique_together = ("first_name", "last_name", "birth_date")
         verbose_name_plural = "Children"
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
 
+    def save(self, *args, **kwargs):
+        self.birth_month = month_ordinal(self.birth_date)
+
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "birth_date" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "birth_month"}
+
+        super().save(*args, **kwargs)
+
     @property
     def age_months(self):
-        from datetime import date
-
-        today = date.today()
-        return (today.year - self.birth_date.year) * 12 + (today.month - self.birth_date.month)
+        return month_ordinal(date.today()) - month_ordinal(self.birth_date)
     
     @property
     def tuition(self):
@@ -135,10 +158,12 @@ class Child(models.Model):
         if not placement:
             return None
 
+        from apps.planning.tuition import rate_for
+
         household_type = self.household.household_type
         room = placement.room
-        
-        return TUITION_RATES.get((room.department, household_type))
+
+        return rate_for(room.department, household_type)
 
 class Staff(models.Model):
 
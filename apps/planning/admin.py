@@ -1,11 +1,38 @@
-from django.contrib import admin
-
-from .models import Placement, MoveUpPlan, WaitlistEntry
+from django import forms
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied
+from django.template.response import TemplateResponse
+from django.urls import path
+
+from .models import (
+    Placement,
+    MoveUpPlan,
+    WaitlistEntry,
+    TuitionRate,
+    RoomOccupancy,
+    AgeOutDate,
+)
+from . import ranking
+from .roster import RosterImporter
+from .spreadsheets import SpreadsheetError
+
+
+class RosterUploadForm(forms.Form):
+
+    roster = forms.FileField(help_text="Roster workbook (.ods or .xlsx)")
+
+    dry_run = forms.BooleanField(
+        required=False,
+        initial=True,
+        help_text="Only report what would change",
+    )
 
 
 @admin.register(Placement)
 class PlacementAdmin(admin.ModelAdmin):
 
+    change_list_template = "admin/planning/placement/change_list.html"
+
     list_display = (
         "child",
         "room",
@@ -23,6 +50,50 @@ class PlacementAdmin(admin.ModelAdmin):
         "child__last_name",
     )
 
+    def get_urls(self):
+        return [
+            path(
+                "import-roster/",
+                self.admin_site.admin_view(self.import_roster_view),
+                name="planning_placement_import_roster",
+            ),
+        ] + super().get_urls()
+
+    def import_roster_view(self, request):
+
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+
+        report = None
+        form = RosterUploadForm(request.POST or None, request.FILES or None)
+
+        if request.method == "POST" and form.is_valid():
+            dry_run = form.cleaned_data["dry_run"]
+
+            try:
+                report = RosterImporter().run(
+                    form.cleaned_data["roster"], dry_run=dry_run
+                )
+            except SpreadsheetError as exc:
+                form.add_error("roster", str(exc))
+            else:
+                if dry_run:
+                    messages.warning(request, "Dry run: nothing was written.")
+                else:
+                    messages.success(request, "Roster imported.")
+
+        return TemplateResponse(
+            request,
+            "admin/planning/placement/import_roster.html",
+            {
+                **self.admin_site.each_context(request),
+                "opts": self.model._meta,
+                "title": "Import roster",
+                "form": form,
+                "report": report,
+            },
+        )
+
 
 @admin.register(MoveUpPlan)
 class MoveUpPlanAdmin(admin.ModelAdmin):
@@ -35,6 +106,12 @@ class MoveUpPlanAdmin(admin.ModelAdmin):
         "status",
     )
 
+    list_select_related = (
+        "child",
+        "current_room",
+        "target_room",
+    )
+
     list_filter = (
         "status",
         "current_room",
@@ -58,10 +135,15 @@ class WaitlistEntryAdmin(admin.ModelAdmin):
         "child",
         "household_type",
         "requested_start",
-        "priority",
+        "priority_score",
+        "position",
         "status",
     )
 
+    list_select_related = (
+        "child__household",
+    )
+
     list_filter = (
         "status",
         "child__household__household_type",
@@ -74,17 +156,23 @@ class WaitlistEntryAdmin(admin.ModelAdmin):
         "child__household__name",
     )
 
+    # Served by waitlist_rank_idx, or waitlist_priority_idx when filtered
+    # by status; pages never need a full COUNT.
     ordering = (
-        "-child__household__household_type",
+        "-priority_score",
         "requested_start",
+        "id",
     )
 
+    show_full_result_count = False
+
     autocomplete_fields = (
         "child",
     )
 
     readonly_fields = (
-        "priority",
+        "priority_score",
+        "position",
     )
 
     def household_type(self, obj):
@@ -92,16 +180,102 @@ class WaitlistEntryAdmin(admin.ModelAdmin):
 
     household_type.short_description = "Household Type"
 
-    def priority(self, obj):
-        return obj.priority_score()
+    def position(self, obj):
+        return ranking.position(obj.pk) or "—"
 
-    priority.short_description = "Priority Score"
-    
+    position.short_description = "Waitlist Position"
 
 
 
+@admin.register(TuitionRate)
+class TuitionRateAdmin(admin.ModelAdmin):
+
+    list_display = (
+        "department",
+        "household_type",
+        "amount",
+        "effective_from",
+    )
+
+    list_filter = (
+        "department",
+        "household_type",
+    )
+
+    date_hierarchy = "effective_from"
 
 
+@admin.register(RoomOccupancy)
+class RoomOccupancyAdmin(admin.ModelAdmin):
+
+    list_display = (
+        "room",
+        "capacity",
+        "occupied",
+        "open_seats",
+        "incoming",
+        "outgoing",
+    )
+
+    list_select_related = (
+        "room",
+    )
+
+    ordering = (
+        "room__min_age_months",
+    )
+
+    # Maintained from placements and plans; see reconcile_occupancy.
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def capacity(self, obj):
+        return obj.room.capacity
+
+    def open_seats(self, obj):
+        return obj.room.capacity - obj.occupied
+
+    open_seats.short_description = "Open Seats"
+
+
+@admin.register(AgeOutDate)
+class AgeOutDateAdmin(admin.ModelAdmin):
+
+    list_display = (
+        "child",
+        "room",
+        "approaching_on",
+        "overdue_on",
+    )
+
+    list_filter = (
+        "room",
+    )
+
+    list_select_related = (
+        "child",
+        "room",
+    )
+
+    date_hierarchy = "overdue_on"
+
+    ordering = (
+        "overdue_on",
+    )
 
+    # Maintained from placements, birth dates and room limits; see
+    # refresh_age_outs.
+    def has_add_permission(self, request):
+        return False
 
+    def has_change_permission(self, request, obj=None):
+        return False
 
+    def has_delete_permission(self, request, obj=None):
+        return False
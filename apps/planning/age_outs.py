@@ -0,0 +1,79 @@
+"""
+Age-out calendar.
+
+AgeOutDate stores, for every open placement, the first day its child
+is classified as approaching and as overdue for the room. These are
+calendar dates, not statuses, so they do not change when the month
+rolls over. "Who ages out in the next 90 days" is then an indexed range
+query, and the status on any day is a comparison with that day.
+
+Rows are refreshed when a placement, a child's birth date or a room's
+age limits change (see signals.py). Bulk writers call refresh() with
+the placements they wrote.
+"""
+
+from datetime import timedelta
+
+from django.utils.timezone import now
+
+from .eligibility import age_out_date, approaching_date
+from .models import AgeOutDate, Placement
+
+
+BATCH_SIZE = 2000
+
+
+def refresh(placements=None):
+    """
+    Rewrites the rows of `placements` (a Placement queryset, default:
+    all of them): open placements get fresh dates, others none.
+    """
+
+    if placements is None:
+        placements = Placement.objects.all()
+
+    AgeOutDate.objects.filter(placement__in=placements).delete()
+
+    AgeOutDate.objects.bulk_create(
+        (
+            AgeOutDate(
+                placement_id=placement_id,
+                child_id=child_id,
+                room_id=room_id,
+                approaching_on=approaching_date(birth_date, max_age),
+                overdue_on=age_out_date(birth_date, max_age),
+            )
+            for placement_id, child_id, room_id, birth_date, max_age in (
+                placements
+                .filter(end_date__isnull=True)
+                .values_list(
+                    "id",
+                    "child_id",
+                    "room_id",
+                    "child__birth_date",
+                    "room__max_age_months",
+                )
+            )
+        ),
+        batch_size=BATCH_SIZE,
+    )
+
+
+def upcoming(days=90, as_of=None, room=None):
+    """
+    Children who become overdue for their room within `days` days of
+    `as_of` (default: today), soonest first.
+    """
+
+    as_of = as_of or now().date()
+
+    age_outs = (
+        AgeOutDate.objects
+        .select_related("child", "room")
+        .filter(overdue_on__gte=as_of, overdue_on__lte=as_of + timedelta(days=days))
+    )
+
+    if room is not None:
+        age_outs = age_outs.filter(room=room)
+
+    return age_outs.order_by("overdue_on", "child__last_name")
@@ -5,3 +5,11 @@ class PlanningConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.planning"
     verbose_name = "Planning"
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from . import signals  # noqa: F401
+        from .slow_queries import install
+
+        connection_created.connect(install, dispatch_uid="planning_slow_queries")
@@ -0,0 +1,254 @@
+"""
+Benchmarks for the planning hot paths.
+
+Each benchmark is a setup function that takes a BenchContext and
+returns the callable to measure. The callable runs `repeat` times for
+the wall time (the median is kept), and once each under a query
+counter and tracemalloc for the query count and peak memory. Queries
+are counted with an execute wrapper rather than connection.queries,
+which every request through the test client resets. Every call runs in a savepoint that is rolled back, so
+benchmarks that write, like implement_moveup, measure the same work
+on every call.
+
+Results are {name: {"seconds", "queries", "peak_kib"}}, written as
+JSON by the run_benchmarks command and compared with a stored
+baseline by compare().
+"""
+
+import statistics
+import time
+import tracemalloc
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import F
+from django.test import Client, RequestFactory
+from django.urls import reverse
+
+from apps.classrooms.models import Room
+from apps.people.models import Household, Child
+
+from . import perf, room_registry
+from .dashboard_cache import drop_all
+from .dashboard_logic import build_dashboard_data, build_global_stats
+from .models import Placement, MoveUpPlan, WaitlistEntry
+from .views import _refresh_room_card, _refresh_two_room_cards
+
+
+# Relative slowdown or memory growth flagged as a regression.
+DEFAULT_THRESHOLD = 0.25
+
+# Timing differences below this are noise, whatever the ratio.
+MIN_SECONDS_DELTA = 0.025
+
+# Transaction bookkeeping left out of query counts.
+SAVEPOINT_STATEMENTS = ("SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK TO SAVEPOINT")
+
+ADMIN_CHANGELISTS = [Placement, MoveUpPlan, WaitlistEntry, Child, Household, Room]
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+class BenchContext:
+    """
+    Shared fixtures: the largest rooms, a planned move-up, a logged-in
+    superuser client and a bare request for the card partials.
+    """
+
+    def __init__(self):
+        rooms = sorted(
+            room_registry.all_rooms(),
+            key=lambda room: room.capacity,
+            reverse=True,
+        )
+
+        if len(rooms) < 2:
+            raise ValueError("Benchmarks need at least two rooms.")
+
+        self.room_a, self.room_b = rooms[:2]
+        self.request = RequestFactory().get("/")
+
+        self.plan = (
+            MoveUpPlan.objects
+            .filter(status="planned", exit_type="moveup", target_room__isnull=False)
+            .filter(
+                child__placements__room=F("current_room"),
+                child__placements__end_date__isnull=True,
+            )
+            .first()
+        )
+
+        # A throwaway name: --existing runs against a database whose
+        # users are kept.
+        user = get_user_model().objects.create_superuser(
+            f"benchmark-{uuid.uuid4().hex[:12]}", None, None,
+        )
+        self.client = Client()
+        self.client.force_login(user)
+
+
+# -------------------------------------------------------
+# Hot paths
+# -------------------------------------------------------
+
+@benchmark("build_dashboard_data.full")
+def _dashboard_full(ctx):
+    return lambda: build_dashboard_data()
+
+
+@benchmark("build_dashboard_data.single_room")
+def _dashboard_single_room(ctx):
+    return lambda: build_dashboard_data(room_ids=[ctx.room_a.id])
+
+
+@benchmark("build_global_stats")
+def _global_stats(ctx):
+    return build_global_stats
+
+
+@benchmark("refresh_room_card")
+def _refresh_one(ctx):
+    # Cold: the card is rebuilt, as after any write to the room. Calls
+    # are rolled back, so an on-commit invalidation would never run.
+    def run():
+        drop_all()
+        return _refresh_room_card(ctx.request, ctx.room_a)
+    return run
+
+
+@benchmark("refresh_two_room_cards")
+def _refresh_two(ctx):
+    def run():
+        drop_all()
+        return _refresh_two_room_cards(ctx.request, ctx.room_a, ctx.room_b)
+    return run
+
+
+@benchmark("implement_moveup")
+def _implement_moveup(ctx):
+    if ctx.plan is None:
+        return None
+
+    url = reverse("implement-moveup", args=[ctx.plan.id])
+    return lambda: ctx.client.post(url)
+
+
+def _changelist(ctx, model):
+    url = reverse(f"admin:{model._meta.app_label}_{model._meta.model_name}_changelist")
+    return lambda: ctx.client.get(url)
+
+
+for _model in ADMIN_CHANGELISTS:
+    benchmark(f"admin.{_model._meta.model_name}_changelist")(
+        lambda ctx, model=_model: _changelist(ctx, model)
+    )
+
+
+# -------------------------------------------------------
+# Measuring
+# -------------------------------------------------------
+
+def _rolled_back(func):
+    with transaction.atomic():
+        func()
+        transaction.set_rollback(True)
+
+
+def measure(func, repeat=5):
+    """
+    {"seconds": median wall time, "queries": n, "peak_kib": n} for
+    one callable.
+    """
+
+    _rolled_back(func)  # warm-up
+
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        _rolled_back(func)
+        times.append(time.perf_counter() - started)
+
+    statements = []
+
+    def count(execute, sql, params, many, context):
+        statements.append(sql)
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(count):
+        _rolled_back(func)
+
+    tracemalloc.start()
+    try:
+        _rolled_back(func)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    queries = [sql for sql in statements if not sql.startswith(SAVEPOINT_STATEMENTS)]
+
+    return {
+        "seconds": round(statistics.median(times), 6),
+        "queries": len(queries),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def run_benchmarks(names=None, repeat=5):
+    """
+    Runs the named benchmarks (default: all) against the current
+    database; returns {name: result}. Benchmarks whose fixture is
+    missing (e.g. no planned move-up) are left out. Their requests
+    are not recorded in the perf histogram or the metrics.
+    """
+
+    with perf.paused():
+        ctx = BenchContext()
+        results = {}
+
+        for name, setup in BENCHMARKS.items():
+            if names and name not in names:
+                continue
+
+            func = setup(ctx)
+            if func is not None:
+                results[name] = measure(func, repeat)
+
+    return results
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Regressions of `results` against `baseline`, as
+    [(name, metric, baseline value, current value)]. Time and memory
+    regress when they grow by more than `threshold`; query counts when
+    they grow at all.
+    """
+
+    regressions = []
+
+    for name, current in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+
+        if current["queries"] > base["queries"]:
+            regressions.append((name, "queries", base["queries"], current["queries"]))
+
+        if (
+            current["seconds"] > base["seconds"] * (1 + threshold)
+            and current["seconds"] - base["seconds"] > MIN_SECONDS_DELTA
+        ):
+            regressions.append((name, "seconds", base["seconds"], current["seconds"]))
+
+        if current["peak_kib"] > base["peak_kib"] * (1 + threshold):
+            regressions.append((name, "peak_kib", base["peak_kib"], current["peak_kib"]))
+
+    return regressions
@@ -0,0 +1,170 @@
+"""
+Monthly tuition billing.
+
+Tuition for every billed child comes from one annotated query: the
+department of the room the child is placed in during the month and the
+household type are read by the database, and the rate in effect on the
+first of the month is a dict lookup (see tuition.py). A child's
+tuition_override always wins.
+"""
+
+import csv
+from datetime import date, timedelta
+
+from django.db.models import F, OuterRef, Q, Subquery
+
+from apps.people.models import Child
+
+from .forecasting import add_months
+from .models import Placement
+from .tuition import rates_as_of
+
+
+CSV_HEADER = [
+    "household",
+    "household_type",
+    "child_id",
+    "child",
+    "room",
+    "department",
+    "tuition",
+    "override",
+]
+
+
+def month_bounds(month):
+    """
+    First and last day of the month containing `month`.
+    """
+
+    first = month.replace(day=1)
+    return first, add_months(first, 1) - timedelta(days=1)
+
+
+def billed_children(month=None):
+    """
+    Children with a placement during `month` (default: this month),
+    annotated with the room and department they are billed for and
+    their household type. Ordered by household for grouping.
+    """
+
+    first, last = month_bounds(month or date.today())
+
+    placement = (
+        Placement.objects
+        .filter(child=OuterRef("pk"), start_date__lte=last)
+        .filter(Q(end_date__isnull=True) | Q(end_date__gte=first))
+        .order_by("-start_date")
+    )
+
+    return (
+        Child.objects
+        .annotate(
+            room_name=Subquery(placement.values("room__name")[:1]),
+            department=Subquery(placement.values("room__department")[:1]),
+            household_name=F("household__name"),
+            household_type=F("household__household_type"),
+        )
+        .filter(department__isnull=False)
+        .order_by("household__name", "household_id", "last_name", "first_name")
+        .values(
+            "id",
+            "first_name",
+            "last_name",
+            "household_id",
+            "household_name",
+            "household_type",
+            "room_name",
+            "department",
+            "tuition_override",
+        )
+    )
+
+
+def tuition_for(row, rates):
+    """
+    Tuition for one billed_children() row, given rates_as_of() output.
+    """
+
+    if row["tuition_override"] is not None:
+        return row["tuition_override"]
+
+    return rates.get((row["department"], row["household_type"]))
+
+
+def billing_lines(month=None):
+    """
+    Yields one line per billed child, each followed, at the end of its
+    household, by a household total line (child_id None). Streams: only
+    one household is held in memory at a time.
+    """
+
+    month = month_bounds(month or date.today())[0]
+    rates = rates_as_of(month)
+
+    household = None
+    total = 0
+
+    def household_total():
+        return {
+            "household": household[1],
+            "household_type": household[2],
+            "child_id": None,
+            "child": "TOTAL",
+            "room": "",
+            "department": "",
+            "tuition": total,
+            "override": "",
+        }
+
+    for row in billed_children(month).iterator(chunk_size=2000):
+
+        key = (row["household_id"], row["household_name"], row["household_type"])
+
+        if household is not None and key != household:
+            yield household_total()
+            total = 0
+
+        household = key
+        tuition = tuition_for(row, rates)
+        total += tuition or 0
+
+        yield {
+            "household": row["household_name"],
+            "household_type": row["household_type"],
+            "child_id": row["id"],
+            "child": f"{row['first_name']} {row['last_name']}",
+            "room": row["room_name"],
+            "department": row["department"],
+            "tuition": tuition,
+            "override": "yes" if row["tuition_override"] is not None else "",
+        }
+
+    if household is not None:
+        yield household_total()
+
+
+class Echo:
+    """
+    File-like object whose write() returns the value, so csv.writer
+    rows can be streamed without buffering.
+    """
+
+    def write(self, value):
+        return value
+
+
+def billing_csv_rows(month=None):
+    """
+    Yields the billing run as CSV-encoded lines.
+    """
+
+    writer = csv.writer(Echo())
+
+    yield writer.writerow(CSV_HEADER)
+
+    for line in billing_lines(month):
+        yield writer.writerow([
+            "" if line[column] is None else line[column]
+            for column in CSV_HEADER
+        ])
@@ -0,0 +1,181 @@
+"""
+Versioned cache for dashboard room cards and global stats.
+
+Every room has a version counter in the cache, and a global generation
+counter covers the room list itself. Cached entries embed the versions
+they were built from in their key, so invalidation is a counter bump:
+stale entries are never read again and simply expire. Writes to
+Placement, MoveUpPlan, Child, Household and Room bump the affected
+counters (see signals.py), once the surrounding transaction commits:
+a bump before the commit would let a concurrent request rebuild a card
+from the old rows and cache it under the new version.
+
+Counters start from a time-based value rather than 1, so a counter
+evicted from the cache can never come back at a version whose entries
+are still cached. Only get/set/get_many/incr are used, which the
+local-memory, file and memcached/redis backends all support.
+"""
+
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+from django.utils.timezone import now
+
+from . import metrics, room_registry
+from .dashboard_logic import build_dashboard_data, build_global_stats
+
+
+CACHE_TIMEOUT = 60 * 60 * 24
+
+GENERATION_KEY = "planning:generation"
+STATS_VERSION_KEY = "planning:stats:version"
+
+
+def _room_version_key(room_id):
+    return f"planning:room:{room_id}:version"
+
+
+def _fresh_version():
+    return time.time_ns()
+
+
+def _versions(keys):
+    """
+    Current value of each version counter, initializing missing ones.
+    """
+
+    versions = cache.get_many(keys)
+    missing = {key: _fresh_version() for key in keys if key not in versions}
+
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+
+    return versions
+
+
+def _bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _fresh_version(), None)
+
+
+# -------------------------------------------------------
+# Invalidation
+# -------------------------------------------------------
+
+def invalidate_rooms(room_ids):
+    """
+    Drops the cached cards of the given rooms and the global stats,
+    on commit.
+    """
+
+    room_ids = {room_id for room_id in room_ids if room_id is not None}
+
+    def bump():
+        for room_id in room_ids:
+            _bump(_room_version_key(room_id))
+
+        _bump(STATS_VERSION_KEY)
+
+    transaction.on_commit(bump)
+
+
+def drop_all():
+    """
+    Drops every cached card, the room list and the global stats, now.
+    """
+
+    _bump(GENERATION_KEY)
+    _bump(STATS_VERSION_KEY)
+
+
+def invalidate_all():
+    """
+    drop_all() on commit, for bulk writes that bypass model signals.
+    """
+
+    transaction.on_commit(drop_all)
+
+
+# -------------------------------------------------------
+# Cached reads
+# -------------------------------------------------------
+
+def cached_rooms():
+    """
+    All rooms ordered by age, from the room registry, and the current
+    generation.
+    """
+
+    generation = _versions([GENERATION_KEY])[GENERATION_KEY]
+
+    return room_registry.all_rooms(), generation
+
+
+def room_cards(room_ids=None):
+    """
+    Rendered room cards, ordered by age: [{"room": room, "html": html}].
+
+    Only rooms whose card is not cached are rebuilt, all in one
+    build_dashboard_data call.
+    """
+
+    rooms, generation = cached_rooms()
+
+    if room_ids is not None:
+        rooms = [room for room in rooms if room.id in room_ids]
+
+    today = now().date().isoformat()
+    versions = _versions([_room_version_key(room.id) for room in rooms])
+
+    keys = {
+        room.id: (
+            f"planning:card:{generation}:{room.id}:"
+            f"{versions[_room_version_key(room.id)]}:{today}"
+        )
+        for room in rooms
+    }
+
+    html = cache.get_many(list(keys.values()))
+    html = {room_id: html[key] for room_id, key in keys.items() if key in html}
+
+    missing = [room for room in rooms if room.id not in html]
+    metrics.cache_lookup("room_card", hits=len(html), misses=len(missing))
+
+    if missing:
+        fresh = {}
+
+        for data in build_dashboard_data(rooms=missing):
+            room_id = data["room"].id
+            html[room_id] = render_to_string(
+                "planning/partials/room_card.html",
+                {"data": data},
+            )
+            fresh[keys[room_id]] = html[room_id]
+
+        cache.set_many(fresh, CACHE_TIMEOUT)
+
+    return [
+        {"room": room, "html": mark_safe(html[room.id])}
+        for room in rooms
+    ]
+
+
+def cached_global_stats():
+
+    version = _versions([STATS_VERSION_KEY])[STATS_VERSION_KEY]
+    key = f"planning:stats:{version}"
+
+    stats = cache.get(key)
+    metrics.cache_lookup("global_stats", hits=stats is not None, misses=stats is None)
+
+    if stats is None:
+        stats = build_global_stats()
+        cache.set(key, stats, CACHE_TIMEOUT)
+
+    return stats
@@ -1,48 +1,73 @@
+from django.db.models import Count, Sum
 from django.utils.timezone import now
 
-from apps.classrooms.models import Room
-from .models import Placement, MoveUpPlan
-from .eligibility import child_moveup_status
+from . import room_registry
+from .models import Placement, MoveUpPlan, RoomOccupancy
+from .eligibility import ages_in_months, classify_ages, STATUS_LABELS
 
 from datetime import timedelta
 
-def build_dashboard_data(room_ids=None):
+def build_dashboard_data(room_ids=None, rooms=None, as_of=None):
+    """
+    Room card data for the given rooms (default: all, ordered by age,
+    from the room registry).
 
-    today = now().date()
+    With `as_of`, the cards show the rooms as they were or will be on
+    that date: the children placed then, their ages on that date, and
+    no actions. Planned move-ups are only shown for today or later.
+    """
 
-    rooms_qs = Room.objects.all().order_by("min_age_months")
+    today = now().date()
+    read_only = as_of is not None and as_of != today
+    as_of = as_of or today
 
-    if room_ids:
-        rooms_qs = rooms_qs.filter(id__in=room_ids)
+    if rooms is None:
+        rooms = room_registry.all_rooms()
 
-    rooms = list(rooms_qs)
+        if room_ids:
+            rooms = [room for room in rooms if room.id in room_ids]
 
     room_ids = [r.id for r in rooms]
 
     placements = (
         Placement.objects
-        .select_related("child", "room")
-        .filter(
-            room_id__in=room_ids,
-            end_date__isnull=True
-        ).order_by("child__birth_date")
+        .select_related("child__household", "room")
+        .filter(room_id__in=room_ids)
+    )
+
+    if read_only:
+        placements = placements.on(as_of)
+    else:
+        placements = placements.filter(end_date__isnull=True)
+
+    placements = list(placements.order_by("child__birth_date"))
+
+    # Classify every placed child against one clock in a single pass.
+    ages = ages_in_months([p.child.birth_date for p in placements], as_of=as_of)
+    status_codes = classify_ages(
+        ages,
+        [p.room.min_age_months for p in placements],
+        [p.room.max_age_months for p in placements],
     )
 
     placements_by_room = {}
 
-    for p in placements:
-        placements_by_room.setdefault(p.room_id, []).append(p)
+    for p, age, code in zip(placements, ages, status_codes):
+        placements_by_room.setdefault(p.room_id, []).append((p, age, code))
 
     child_ids = [p.child_id for p in placements]
 
     plans = (
         MoveUpPlan.objects
-        .select_related("target_room")
+        .select_related("child", "target_room")
         .filter(
             child_id__in=child_ids,
             status="planned"
         )
     )
+
+    if as_of < today:
+        plans = []
     plans_by_child = {p.child_id: p for p in plans}
 
     plans_by_room = {}
@@ -57,15 +82,14 @@ def build_dashboard_data(room_ids=None):
 
         items = []
 
-        for placement in placements:
+        for placement, age_months, status_code in placements:
 
             child = placement.child
             active_plan = plans_by_child.get(child.id)
-            status_code, status_label = child_moveup_status(child, room)
 
             ready_to_implement = False
 
-            if active_plan and active_plan.planned_date:
+            if active_plan and active_plan.planned_date and not read_only:
                 ready_to_implement = (
                     active_plan.status == "planned"
                     and active_plan.planned_date <= today + timedelta(days=3)
@@ -73,8 +97,9 @@ def build_dashboard_data(room_ids=None):
 
             items.append({
                 "child": child,
+                "age_months": age_months,
                 "status_code": status_code,
-                "status_label": status_label,
+                "status_label": STATUS_LABELS[status_code],
                 "moveup_plan": active_plan,
                 "has_moveup_plan": active_plan is not None,
                 "ready_to_implement": ready_to_implement,
@@ -90,35 +115,47 @@ def build_dashboard_data(room_ids=None):
             "occupancy": occupancy,
             "open_seats": room.capacity - occupancy,
             "upcoming_moveups": plans_by_room.get(room.id, []),
+            "as_of": as_of,
+            "read_only": read_only,
         })
 
     return room_data
 
-def build_global_stats():
-    rooms = Room.objects.all()
-    
-    placements = (
-        Placement.objects
-        .select_related("child__household", "room")
-        .filter(end_date__isnull=True)
+def build_global_stats(as_of=None):
+    """
+    Center-wide occupancy and household mix, computed with database
+    aggregates so the cost does not grow with the number of children.
+    The headcount comes from the room occupancy counters, or, for an
+    `as_of` date, from the placements in effect on it.
+    """
+
+    placements = Placement.objects.filter(end_date__isnull=True)
+
+    if as_of is not None:
+        placements = Placement.objects.on(as_of)
+
+    counts = dict(
+        placements
+        .values_list("child__household__household_type")
+        .annotate(n=Count("id"))
+        .order_by()
     )
 
-    total_capacity = sum(r.capacity for r in rooms)
-    total_children = placements.count()
+    if as_of is None:
+        total_children = (
+            RoomOccupancy.objects.aggregate(n=Sum("occupied"))["n"] or 0
+        )
+    else:
+        total_children = sum(counts.values())
+
+    total_capacity = room_registry.total_capacity()
 
     occupancy_pct = (
         (total_children / total_capacity) * 100
         if total_capacity else 0
     )
 
-    from collections import Counter
-
-    counts = Counter(
-        p.child.household.household_type
-        for p in placements
-    )
-
-    total = sum(counts.values()) or 1
+    total = total_children or 1
 
     household_pct = {
         k: (v / total) * 100
@@ -131,5 +168,3 @@ def build_global_stats():
         "total_children": total_children,
         "total_capacity": total_capacity,
     }
-
-
@@ -1,7 +1,58 @@
 from datetime import date
 
+from apps.people.models import month_ordinal
 
-def child_moveup_status(child, room):
+
+STATUS_LABELS = {
+    "overdue": "Overdue",
+    "approaching": "Approaching",
+    "ready": "Eligible",
+    "early": "Too Young",
+}
+
+
+def ages_in_months(birth_dates, as_of=None):
+    """
+    Age in whole calendar months for every birth date, as of one date.
+    """
+
+    as_of_month = month_ordinal(as_of or date.today())
+
+    return [as_of_month - month_ordinal(b) for b in birth_dates]
+
+
+def classify_ages(ages, min_ages, max_ages):
+    """
+    Move-up status code for each (age, room min, room max) triple.
+    """
+
+    return [
+        "overdue" if age > max_age
+        else "approaching" if age >= max_age - 2
+        else "ready" if age >= min_age
+        else "early"
+        for age, min_age, max_age in zip(ages, min_ages, max_ages)
+    ]
+
+
+def batch_moveup_status(birth_dates, min_ages, max_ages, as_of=None):
+    """
+    Determine move-up readiness for many children at once.
+
+    Takes parallel sequences of birth dates and room age limits and
+    returns (status_code, label) pairs aligned with the input. Every
+    row is evaluated against the same `as_of` date (default: today).
+    """
+
+    ages = ages_in_months(birth_dates, as_of)
+
+    return [
+        (code, STATUS_LABELS[code])
+        for code in classify_ages(ages, min_ages, max_ages)
+    ]
+
+
+def child_moveup_status(child, room, as_of=None):
     """
     Determine move-up readiness relative to the room age limits.
 
@@ -9,23 +60,33 @@ def child_moveup_status(child, room):
         status_code, label
     """
 
-    today = date.today()
+    return batch_moveup_status(
+        [child.birth_date],
+        [room.min_age_months],
+        [room.max_age_months],
+        as_of,
+    )[0]
 
-    age_months = (
-        (today.year - child.birth_date.year) * 12
-        + (today.month - child.birth_date.month)
-    )
 
-    max_age = room.max_age_months
-    min_age = room.min_age_months
+def _first_of_month(ordinal):
+    year, month = divmod(ordinal - 1, 12)
 
-    if age_months > max_age:
-        return "overdue", "Overdue"
+    return date(year, month + 1, 1)
 
-    if age_months >= max_age - 2:
-        return "approaching", "Approaching"
 
-    if age_months >= min_age:
-        return "ready", "Eligible"
+def age_out_date(birth_date, max_age_months):
+    """
+    First day on which a child is older than `max_age_months`, i.e. the
+    first day they would be classified as overdue for the room.
+    """
+
+    return _first_of_month(month_ordinal(birth_date) + max_age_months + 1)
+
+
+def approaching_date(birth_date, max_age_months):
+    """
+    First day on which a child would be classified as approaching the
+    room's maximum age.
+    """
 
-    return "early", "Too Young"
+    return _first_of_month(month_ordinal(birth_date) + max_age_months - 2)
@@ -0,0 +1,163 @@
+"""
+Room occupancy forecasting.
+
+Every known or planned stay in a room is turned into a day interval
+[arrival, departure) and added to a per-room difference array. A
+running sum over each array then gives the headcount for every day of
+the horizon, so the whole rooms × days matrix costs one pass over the
+intervals plus one pass over the days, and a fixed number of queries.
+
+A child's stay ends at whichever comes first: the end of their
+placement, their planned move-up or withdrawal, or the day they age
+out of the room. Children who are already overdue and have no plan
+keep their seat for the whole horizon: the forecast never promises a
+seat nobody has planned to free.
+"""
+
+from datetime import date, timedelta
+from itertools import accumulate
+
+from django.db.models import Q
+from django.utils.timezone import now
+
+from apps.classrooms.models import Room
+
+from .eligibility import age_out_date, month_ordinal
+from .models import Placement, MoveUpPlan, AdmissionPlan
+
+
+DEFAULT_HORIZON_MONTHS = 24
+
+
+def add_months(d, months):
+    """
+    First day of the month `months` after the month of `d`.
+    """
+
+    year, month = divmod(month_ordinal(d) + months - 1, 12)
+    return date(year, month + 1, 1)
+
+
+def forecast_occupancy(start=None, months=DEFAULT_HORIZON_MONTHS):
+    """
+    Projects daily headcount per room from `start` for `months` months.
+
+    Returns a dict with the horizon `start` date, the number of `days`,
+    the `rooms` (ordered by age) and the `occupancy` matrix:
+    occupancy[i][d] is the headcount of rooms[i] on start + d days.
+    """
+
+    start = start or now().date()
+    days = (add_months(start, months) - start).days
+
+    rooms = list(Room.objects.order_by("min_age_months"))
+    room_index = {room.id: i for i, room in enumerate(rooms)}
+
+    diff = [[0] * (days + 1) for _ in rooms]
+
+    def day(d):
+        return min(max((d - start).days, 0), days)
+
+    def stay(room_id, arrival, departure):
+        i = room_index.get(room_id)
+        if i is None:
+            return
+
+        first = day(arrival)
+        last = day(departure) if departure else days
+
+        if first < last:
+            diff[i][first] += 1
+            diff[i][last] -= 1
+
+    def age_out(child, room_id):
+        i = room_index.get(room_id)
+        return age_out_date(child.birth_date, rooms[i].max_age_months)
+
+    # Planned exits, keyed by (child, room they leave).
+    plans = list(
+        MoveUpPlan.objects
+        .select_related("child")
+        .filter(status="planned", planned_date__isnull=False)
+    )
+    exits = {(p.child_id, p.current_room_id): p.planned_date for p in plans}
+
+    placements = (
+        Placement.objects
+        .select_related("child")
+        .filter(start_date__lt=start + timedelta(days=days))
+        .filter(Q(end_date__isnull=True) | Q(end_date__gt=start))
+    )
+
+    for placement in placements:
+        if placement.room_id not in room_index:
+            continue
+
+        departure = placement.end_date or exits.get(
+            (placement.child_id, placement.room_id)
+        )
+
+        if departure is None:
+            aged_out = age_out(placement.child, placement.room_id)
+            departure = aged_out if aged_out > start else None
+
+        stay(placement.room_id, placement.start_date, departure)
+
+    for plan in plans:
+        if plan.exit_type == "moveup" and plan.target_room_id in room_index:
+            stay(
+                plan.target_room_id,
+                plan.planned_date,
+                age_out(plan.child, plan.target_room_id),
+            )
+
+    admissions = (
+        AdmissionPlan.objects
+        .select_related("child")
+        .filter(status="planned")
+    )
+
+    for admission in admissions:
+        if admission.target_room_id in room_index:
+            stay(
+                admission.target_room_id,
+                admission.planned_date,
+                age_out(admission.child, admission.target_room_id),
+            )
+
+    return {
+        "start": start,
+        "days": days,
+        "rooms": rooms,
+        "occupancy": [list(accumulate(row[:days])) for row in diff],
+    }
+
+
+def monthly_open_seats(forecast):
+    """
+    Open seats per room on the first day of every month in the horizon
+    (the horizon start stands in for the current month).
+
+    Returns (month dates, [{"room": room, "open_seats": [...]}, ...]).
+    """
+
+    start = forecast["start"]
+
+    months = [start]
+    while True:
+        month = add_months(months[-1], 1)
+        if (month - start).days >= forecast["days"]:
+            break
+        months.append(month)
+
+    offsets = [(m - start).days for m in months]
+
+    rows = [
+        {
+            "room": room,
+            "open_seats": [room.capacity - occupancy[d] for d in offsets],
+        }
+        for room, occupancy in zip(forecast["rooms"], forecast["occupancy"])
+    ]
+
+    return months, rows
@@ -0,0 +1,37 @@
+from datetime import date, datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.planning.billing import billing_csv_rows
+
+
+class Command(BaseCommand):
+    help = "Export the monthly tuition billing run as CSV"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--month",
+            help="Billing month as YYYY-MM (default: current month)",
+        )
+        parser.add_argument(
+            "--output",
+            help="CSV file to write (default: stdout)",
+        )
+
+    def handle(self, *args, **options):
+
+        month = date.today()
+
+        if options["month"]:
+            try:
+                month = datetime.strptime(options["month"], "%Y-%m").date()
+            except ValueError:
+                raise CommandError("--month must look like YYYY-MM.")
+
+        if options["output"]:
+            with open(options["output"], "w", newline="") as f:
+                f.writelines(billing_csv_rows(month))
+        else:
+            self.stdout.ending = ""
+            for line in billing_csv_rows(month):
+                self.stdout.write(line)
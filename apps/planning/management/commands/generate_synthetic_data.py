@@ -0,0 +1,84 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.planning.synthetic import SyntheticDataGenerator, DEFAULT_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a deterministic synthetic dataset (rooms, households, "
+        "children, placement histories, plans and a waitlist) for load testing"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--centers",
+            type=int,
+            default=1,
+            help="Centers to generate, each with its own ladder of rooms (default 1)",
+        )
+        parser.add_argument(
+            "--children",
+            type=int,
+            default=10000,
+            help=(
+                "Children in total; those beyond the filled seats become "
+                "waitlisted children and alumni (default 10000)"
+            ),
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Random seed; the same seed and --as-of give the same data",
+        )
+        parser.add_argument(
+            "--as-of",
+            type=date.fromisoformat,
+            default=None,
+            help="Date the data is generated relative to, YYYY-MM-DD (default: today)",
+        )
+        parser.add_argument(
+            "--prefix",
+            default="Synthetic",
+            help="Prefix of generated room and household names (default: Synthetic)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f"Rows per bulk write (default: {DEFAULT_BATCH_SIZE})",
+        )
+
+    def handle(self, *args, **options):
+
+        if options["centers"] < 1 or options["batch_size"] < 1:
+            raise CommandError("--centers and --batch-size must be positive integers.")
+
+        generator = SyntheticDataGenerator(
+            centers=options["centers"],
+            children=options["children"],
+            seed=options["seed"],
+            as_of=options["as_of"],
+            prefix=options["prefix"],
+            batch_size=options["batch_size"],
+        )
+
+        if generator.exists():
+            raise CommandError(
+                f"Rooms named \"{options['prefix']} ...\" already exist; "
+                f"pass another --prefix."
+            )
+
+        started = time.perf_counter()
+        counts = generator.run()
+        elapsed = time.perf_counter() - started
+
+        for name, count in counts.items():
+            self.stdout.write(f"{name}: {count}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Synthetic data generated in {elapsed:.1f}s."
+        ))
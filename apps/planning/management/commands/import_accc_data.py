@@ -1,132 +1,666 @@
+import hashlib
 import sqlite3
-from django.core.management.base import BaseCommand
-
-from apps.people.models import Household, Parent, Child, Staff
-from apps.classrooms.models import Room
-from apps.planning.models import Placement, MoveUpPlan, WaitlistEntry
-
-from django.conf import settings
+import time
+from collections import defaultdict, namedtuple
 from datetime import date
 
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Min, Q
 
-OLD_DB = "_db.sqlite3"  # rename your uploaded DB file
-
-
-class Command(BaseCommand):
-    help = "Import data from old ACCC schema into new schema"
-
-    def handle(self, *args, **kwargs):
-
-        conn = sqlite3.connect(OLD_DB)
-        cursor = conn.cursor()
-
-        self.stdout.write("Importing households...")
-
-        for row in cursor.execute("SELECT id, name, address, phone_number, household_type FROM accc_household"):
-            old_id, name, address, phone, htype = row
-
-            Household.objects.create(
-                id=old_id,
-                name=name,
-                address=address or "",
-                phone_number=phone or "",
-                household_type=htype or "P",
-            )
-
-        self.stdout.write("Importing parents...")
-
-        for row in cursor.execute("""
-            SELECT id, first_name, last_name, email, phone_number, household_id
-            FROM accc_parent
-        """):
+from apps.people.models import Household, Parent, Child, month_ordinal
+from apps.classrooms.models import Room
+from apps.planning.dashboard_cache import invalidate_all
+from apps.planning.models import (
+    Placement,
+    MoveUpPlan,
+    WaitlistEntry,
+    LegacySyncRecord,
+)
+from apps.planning.occupancy import reconcile as reconcile_occupancy
+from apps.planning.priority import recompute_priorities
+from apps.planning import age_outs, rollup, room_registry
 
-            Parent.objects.create(
-                id=row[0],
-                first_name=row[1],
-                last_name=row[2],
-                email=row[3],
-                phone_number=row[4] or "",
-                household_id=row[5],
-            )
 
-        self.stdout.write("Importing children...")
-
-        for row in cursor.execute("""
-            SELECT id, first_name, last_name, birth_date, household_id, enrolled, notes
-            FROM accc_child
-        """):
-
-            Child.objects.create(
-                id=row[0],
-                first_name=row[1],
-                last_name=row[2],
-                birth_date=row[3],
-                household_id=row[4],
-                enrolled=row[5],
-                notes=row[6] or "",
-            )
+OLD_DB = "_db.sqlite3"  # rename your uploaded DB file
 
-        self.stdout.write("Importing rooms...")
+DEFAULT_BATCH_SIZE = 2000
+
+# Above this many touched objects (an initial import, say) the derived
+# tables are repaired in one pass over everything rather than filtered
+# on long id lists.
+SCOPED_REPAIR_LIMIT = 5000
+
+
+# -------------------------------------------------------
+# Row mappers (legacy row -> new model instance)
+# -------------------------------------------------------
+
+def _household(row):
+    old_id, name, address, phone, htype = row
+
+    return Household(
+        id=old_id,
+        name=name,
+        address=address or "",
+        phone_number=phone or "",
+        household_type=htype or "P",
+    )
+
+
+def _parent(row):
+    return Parent(
+        id=row[0],
+        first_name=row[1],
+        last_name=row[2],
+        email=row[3],
+        phone_number=row[4] or "",
+        household_id=row[5],
+    )
+
+
+def _child(row):
+    # sqlite3 hands dates back as ISO strings.
+    birth_date = date.fromisoformat(str(row[3])[:10])
+
+    return Child(
+        id=row[0],
+        first_name=row[1],
+        last_name=row[2],
+        birth_date=birth_date,
+        birth_month=month_ordinal(birth_date),
+        household_id=row[4],
+        enrolled=row[5],
+        notes=row[6] or "",
+    )
+
+
+def _room(row):
+    return Room(
+        id=row[0],
+        name=row[1],
+        capacity=row[2],
+        min_age_months=row[3],
+        max_age_months=row[4],
+    )
+
+
+def _placement(row):
+    return Placement(
+        child_id=row[0],
+        room_id=row[1],
+        start_date=row[2] or date.today(),
+    )
+
+
+def _waitlist_entry(row):
+    # The legacy priority column is not carried over: priority_score is
+    # recomputed from the household after the sync.
+    return WaitlistEntry(
+        child_id=row[1],
+        requested_start=date.today(),
+    )
+
+
+def _moveup_plan(row):
+    return MoveUpPlan(
+        child_id=row[1],
+        current_room_id=row[2],
+        target_room_id=row[3],
+        planned_date=row[4],
+        status="planned",
+    )
+
+
+ImportStep = namedtuple(
+    "ImportStep",
+    [
+        "label",
+        "model",
+        "sql",
+        "to_instance",
+        "update_fields",
+        "related",
+        "keeps_history",
+        "adopt_by",
+    ],
+    defaults=[(), False, ("id",)],
+)
+
+
+# Import order matters: referenced rows must exist before the rows
+# pointing at them. The first column of every query is the legacy key
+# the row is tracked under between syncs; tables without an id column
+# use their sqlite rowid. `related` names the (attribute, kind) pairs
+# whose old and new values a write can affect derived tables through
+# (see Command.repair()). Steps that keep history never rewrite or
+# delete a stay (see Command.move_stays() and Command.delete_removed()).
+# `adopt_by` names the attributes an untracked legacy row is matched to
+# an existing object on, in databases loaded before tracking records
+# existed (see Command.adopt()).
+IMPORT_STEPS = [
+    ImportStep(
+        "households",
+        Household,
+        "SELECT id, name, address, phone_number, household_type FROM accc_household",
+        _household,
+        ["name", "address", "phone_number", "household_type"],
+    ),
+    ImportStep(
+        "parents",
+        Parent,
+        """
+        SELECT id, first_name, last_name, email, phone_number, household_id
+        FROM accc_parent
+        """,
+        _parent,
+        ["first_name", "last_name", "email", "phone_number", "household"],
+    ),
+    ImportStep(
+        "children",
+        Child,
+        """
+        SELECT id, first_name, last_name, birth_date, household_id, enrolled, notes
+        FROM accc_child
+        """,
+        _child,
+        [
+            "first_name",
+            "last_name",
+            "birth_date",
+            "birth_month",
+            "household",
+            "enrolled",
+            "notes",
+        ],
+        related=[("household_id", "households")],
+    ),
+    ImportStep(
+        "rooms",
+        Room,
+        """
+        SELECT id, name, capacity, min_age, max_age
+        FROM accc_room
+        """,
+        _room,
+        ["name", "capacity", "min_age_months", "max_age_months"],
+    ),
+    ImportStep(
+        "placements",
+        Placement,
+        """
+        SELECT id, room_id, accc_enroll_date
+        FROM accc_child
+        WHERE room_id IS NOT NULL
+        """,
+        _placement,
+        ["start_date"],
+        related=[("child_id", "children"), ("room_id", "rooms")],
+        keeps_history=True,
+        adopt_by=("child_id", "room_id"),
+    ),
+    ImportStep(
+        "waitlist",
+        WaitlistEntry,
+        """
+        SELECT rowid, child_id
+        FROM accc_waitlist
+        """,
+        _waitlist_entry,
+        ["child"],
+        related=[("child_id", "children")],
+        adopt_by=("child_id",),
+    ),
+    # status is left alone on update so that plans completed or
+    # cancelled in comet are not reopened by the next sync.
+    ImportStep(
+        "move-up plans",
+        MoveUpPlan,
+        """
+        SELECT rowid, child_id, current_room_id, new_room_id, start_date
+        FROM accc_roomtransition
+        """,
+        _moveup_plan,
+        ["child", "current_room", "target_room", "planned_date"],
+        related=[("current_room_id", "rooms"), ("target_room_id", "rooms")],
+        adopt_by=("child_id", "current_room_id", "target_room_id"),
+    ),
+]
+
+
+def stream_rows(conn, sql, batch_size):
+    """
+    Yields lists of legacy rows without loading the whole table.
+    """
+
+    cursor = conn.cursor()
+    cursor.execute(sql)
+
+    try:
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            yield rows
+    finally:
+        cursor.close()
+
+
+def fingerprint(row):
+    """
+    Stable hash of a legacy row's column values.
+    """
+
+    return hashlib.sha1(repr(tuple(row)).encode()).hexdigest()
 
-        for row in cursor.execute("""
-            SELECT id, name, capacity, min_age, max_age
-            FROM accc_room
-        """):
 
-            Room.objects.create(
-                id=row[0],
-                name=row[1],
-                capacity=row[2],
-                min_age_months=row[3],
-                max_age_months=row[4],
+class Command(BaseCommand):
+    help = (
+        "Sync data from the old ACCC schema into the new schema. "
+        "Safe to re-run: only inserted, changed or deleted legacy "
+        "rows are written."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--source",
+            default=OLD_DB,
+            help=f"Path to the legacy ACCC database (default: {OLD_DB})",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f"Rows per bulk write (default: {DEFAULT_BATCH_SIZE})",
+        )
+
+    def handle(self, *args, **options):
+
+        self.verbosity = options["verbosity"]
+        batch_size = options["batch_size"]
+
+        if batch_size < 1:
+            raise CommandError("--batch-size must be a positive integer.")
+
+        conn = sqlite3.connect(options["source"])
+
+        started = time.perf_counter()
+        total = 0
+        deletions = []
+
+        # Ids of the objects each step wrote, by step label, and of the
+        # children, households and rooms they referred to before and
+        # after, by kind.
+        self.written = defaultdict(set)
+        self.referenced = defaultdict(set)
+        self.deleted = 0
+
+        try:
+            # All or nothing: a failure in any step rolls back the
+            # whole sync instead of leaving a partial copy behind.
+            with transaction.atomic():
+                for step in IMPORT_STEPS:
+                    rows, removed = self.sync_step(conn, step, batch_size)
+                    total += rows
+                    deletions.append((step, removed))
+
+                # Deletes run last and in reverse order, so a row that
+                # moved to a new parent is updated before its old
+                # parent (and any cascade) goes away.
+                for step, removed in reversed(deletions):
+                    self.delete_removed(step, removed, batch_size)
+
+                if any(self.written.values()):
+                    self.repair()
+        finally:
+            conn.close()
+
+        # Bulk writes bypass the signals that keep the dashboard
+        # cache and the room registry current.
+        if any(self.written.values()) or self.deleted:
+            invalidate_all()
+            room_registry.invalidate()
+
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Sync completed: {total} rows in {elapsed:.1f}s "
+            f"({_rate(total, elapsed)} rows/s)."
+        ))
+
+    def sync_step(self, conn, step, batch_size):
+        """
+        Inserts new and updates changed legacy rows for one step.
+
+        Returns the number of legacy rows read and the tracking
+        records of rows that no longer exist in the legacy database.
+        """
+
+        self.stdout.write(f"Syncing {step.label}...")
+
+        started = time.perf_counter()
+        count = inserted = updated = 0
+
+        # legacy_id -> (record pk, object_id, fingerprint)
+        known = {
+            legacy_id: (pk, object_id, digest)
+            for pk, legacy_id, object_id, digest in (
+                LegacySyncRecord.objects
+                .filter(source=step.label)
+                .values_list("pk", "legacy_id", "object_id", "fingerprint")
+                .iterator(chunk_size=batch_size)
             )
-
-        self.stdout.write("Creating placements...")
-
-        for row in cursor.execute("""
-            SELECT id, room_id, accc_enroll_date
-            FROM accc_child
-            WHERE room_id IS NOT NULL
-        """):
-
-            child_id = row[0]
-            room_id = row[1]
-            start = row[2] or date.today()
-
-            Placement.objects.create(
-                child_id=child_id,
-                room_id=room_id,
-                start_date=start,
+        }
+        tracked = {object_id for _, object_id, _ in known.values()}
+
+        for rows in stream_rows(conn, step.sql, batch_size):
+
+            new_rows = []
+            changed = []
+
+            for row in rows:
+                digest = fingerprint(row)
+                record = known.pop(row[0], None)
+
+                if record is None:
+                    new_rows.append((row, digest))
+
+                elif record[2] != digest:
+                    changed.append((
+                        row,
+                        LegacySyncRecord(
+                            pk=record[0], object_id=record[1], fingerprint=digest,
+                        ),
+                        record[1],
+                    ))
+
+            if new_rows:
+                adopted, new_rows = self.adopt(step, new_rows, tracked)
+
+                if adopted:
+                    objs = [obj for _, _, obj in adopted]
+                    self.touch_previous(step, [obj.pk for obj in objs])
+                    step.model.objects.bulk_update(
+                        objs, step.update_fields, batch_size=batch_size
+                    )
+                    self.touch(step, objs)
+                    updated += len(adopted)
+
+                objs = step.model.objects.bulk_create(
+                    [obj for _, _, obj in new_rows], batch_size=batch_size
+                )
+                self.touch(step, objs)
+                inserted += len(new_rows)
+
+                LegacySyncRecord.objects.bulk_create(
+                    [
+                        LegacySyncRecord(
+                            source=step.label,
+                            legacy_id=row[0],
+                            object_id=obj.pk,
+                            fingerprint=digest,
+                        )
+                        for row, digest, obj in adopted + new_rows
+                    ],
+                    batch_size=batch_size,
+                )
+
+            if changed:
+                if step.keeps_history:
+                    self.move_stays(step, changed, batch_size)
+                else:
+                    objs = []
+                    for row, _, object_id in changed:
+                        obj = step.to_instance(row)
+                        obj.pk = object_id
+                        objs.append(obj)
+
+                    self.touch_previous(step, [obj.pk for obj in objs])
+                    step.model.objects.bulk_update(
+                        objs, step.update_fields, batch_size=batch_size
+                    )
+                    self.touch(step, objs)
+
+                LegacySyncRecord.objects.bulk_update(
+                    [record for _, record, _ in changed],
+                    ["fingerprint", "object_id"],
+                    batch_size=batch_size,
+                )
+                updated += len(changed)
+
+            count += len(rows)
+
+            if self.verbosity > 1:
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f"  {count} {step.label} ({_rate(count, elapsed)} rows/s)"
+                )
+
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            f"  {count} {step.label} in {elapsed:.1f}s "
+            f"({_rate(count, elapsed)} rows/s): "
+            f"{inserted} inserted, {updated} updated, "
+            f"{len(known)} to delete"
+        )
+
+        return count, list(known.values())
+
+    def adopt(self, step, new_rows, tracked):
+        """
+        Splits legacy rows without a tracking record into those whose
+        object already exists, as in a database loaded by the one-shot
+        import this command replaced, and those to insert. Rows are
+        matched on the step's `adopt_by` attributes, and an object is
+        claimed by one row at most.
+
+        Returns (row, fingerprint, instance) triples for both; adopted
+        instances carry the existing object's pk.
+        """
+
+        instances = [
+            (row, digest, step.to_instance(row)) for row, digest in new_rows
+        ]
+
+        first = step.adopt_by[0]
+        existing = defaultdict(list)
+
+        for pk, *key in (
+            step.model.objects
+            .filter(**{
+                f"{first}__in": {getattr(obj, first) for _, _, obj in instances}
+            })
+            .order_by("pk")
+            .values_list("pk", *step.adopt_by)
+        ):
+            if pk not in tracked:
+                existing[tuple(key)].append(pk)
+
+        adopted = []
+        remaining = []
+
+        for row, digest, obj in instances:
+            matches = existing.get(
+                tuple(getattr(obj, attname) for attname in step.adopt_by)
             )
 
-        self.stdout.write("Importing waitlist...")
-
-        for row in cursor.execute("""
-            SELECT child_id, priority
-            FROM accc_waitlist
-        """):
-
-            WaitlistEntry.objects.create(
-                child_id=row[0],
-                priority=row[1],
+            if matches:
+                obj.pk = matches.pop(0)
+                tracked.add(obj.pk)
+                adopted.append((row, digest, obj))
+            else:
+                remaining.append((row, digest, obj))
+
+        return adopted, remaining
+
+    def move_stays(self, step, changed, batch_size):
+        """
+        Applies changed legacy rows of a step that keeps history. A new
+        start date corrects the stay in place; a new room ends the stay
+        today and starts one in the new room, which the tracking record
+        then points at.
+        """
+
+        today = date.today()
+        current = step.model.objects.in_bulk(
+            [object_id for _, _, object_id in changed]
+        )
+
+        corrected = []
+        ended = []
+        started = []
+
+        for row, record, object_id in changed:
+            stay = step.to_instance(row)
+            previous = current.get(object_id)
+
+            if previous is not None and previous.end_date is None:
+                if previous.room_id == stay.room_id:
+                    previous.start_date = stay.start_date
+                    corrected.append(previous)
+                    continue
+
+                previous.end_date = max(today, previous.start_date)
+                stay.start_date = previous.end_date
+                ended.append(previous)
+
+            started.append((stay, record))
+
+        step.model.objects.bulk_update(
+            corrected, ["start_date"], batch_size=batch_size
+        )
+        step.model.objects.bulk_update(ended, ["end_date"], batch_size=batch_size)
+
+        objs = step.model.objects.bulk_create(
+            [stay for stay, _ in started], batch_size=batch_size
+        )
+        for obj, (_, record) in zip(objs, started):
+            record.object_id = obj.pk
+
+        self.touch(step, corrected + ended + objs)
+
+    def delete_removed(self, step, records, batch_size):
+        """
+        Deletes the objects of legacy rows that are gone. Steps that
+        keep history end the open stays instead.
+        """
+
+        today = date.today()
+
+        for i in range(0, len(records), batch_size):
+            chunk = records[i:i + batch_size]
+            objects = step.model.objects.filter(
+                pk__in=[object_id for _, object_id, _ in chunk]
             )
 
-        self.stdout.write("Importing move-up plans...")
-
-        for row in cursor.execute("""
-            SELECT child_id, current_room_id, new_room_id, start_date
-            FROM accc_roomtransition
-        """):
-
-            MoveUpPlan.objects.create(
-                child_id=row[0],
-                current_room_id=row[1],
-                target_room_id=row[2],
-                planned_date=row[3],
-                status="planned",
+            if step.keeps_history:
+                ended = list(objects.filter(end_date__isnull=True))
+                for stay in ended:
+                    stay.end_date = max(today, stay.start_date)
+                step.model.objects.bulk_update(ended, ["end_date"])
+                self.touch(step, ended)
+            else:
+                # Deletes send signals, which repair the derived tables.
+                self.deleted += objects.delete()[0]
+
+            LegacySyncRecord.objects.filter(
+                pk__in=[pk for pk, _, _ in chunk]
+            ).delete()
+
+
+    # ---------------------------------------------------
+    # Derived tables
+    # ---------------------------------------------------
+
+    def touch(self, step, objs):
+        """
+        Records objects a step inserted or updated, and what they
+        refer to.
+        """
+
+        self.written[step.label].update(obj.pk for obj in objs)
+
+        for attname, kind in step.related:
+            self.referenced[kind].update(getattr(obj, attname) for obj in objs)
+
+    def touch_previous(self, step, pks):
+        """
+        Records what objects referred to before an update.
+        """
+
+        if not step.related:
+            return
+
+        for values in (
+            step.model.objects
+            .filter(pk__in=pks)
+            .values_list(*[attname for attname, _ in step.related])
+        ):
+            for value, (_, kind) in zip(values, step.related):
+                self.referenced[kind].add(value)
+
+    def repair(self):
+        """
+        Brings waitlist priorities, room occupancy counters, the daily
+        occupancy rollup and the age-out calendar in line with the
+        bulk writes of this sync, which bypassed their signals. Only
+        the entries, rooms and placements the writes can affect are
+        recomputed.
+        """
+
+        touched = sum(map(len, self.written.values())) + sum(
+            map(len, self.referenced.values())
+        )
+
+        if touched > SCOPED_REPAIR_LIMIT:
+            recompute_priorities()
+            reconcile_occupancy()
+            rollup.invalidate()
+            age_outs.refresh()
+            return
+
+        written = self.written
+        referenced = {
+            kind: ids - {None} for kind, ids in self.referenced.items()
+        }
+
+        children = written["children"] | referenced.get("children", set())
+
+        # A household's type and its placed children count for every
+        # child in it: their priorities and their stays in the rollup.
+        households = (
+            written["households"]
+            | referenced.get("households", set())
+            | set(
+                Child.objects
+                .filter(pk__in=children)
+                .values_list("household_id", flat=True)
             )
-
-        self.stdout.write(self.style.SUCCESS("Import completed."))
-
-
-
+        )
+
+        stays = Placement.objects.filter(
+            Q(pk__in=written["placements"])
+            | Q(child__household_id__in=households)
+        )
+
+        rooms = (
+            written["rooms"]
+            | referenced.get("rooms", set())
+            | set(stays.values_list("room_id", flat=True))
+        )
+
+        recompute_priorities(WaitlistEntry.objects.filter(
+            Q(pk__in=written["waitlist"])
+            | Q(child__household_id__in=households)
+            | Q(preferred_rooms__in=written["rooms"])
+        ))
+        reconcile_occupancy(room_ids=rooms)
+        rollup.refresh_rooms(rooms, stays.aggregate(since=Min("start_date"))["since"])
+        age_outs.refresh(Placement.objects.filter(
+            Q(pk__in=stays.values("pk")) | Q(room_id__in=written["rooms"])
+        ))
+
+
+def _rate(count, elapsed):
+    return int(count / elapsed) if elapsed else count
@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.planning.roster import RosterImporter, DEFAULT_BATCH_SIZE
+from apps.planning.spreadsheets import SpreadsheetError
+
+
+class Command(BaseCommand):
+    help = "Import rooms, children and placements from a roster spreadsheet (ODS or XLSX)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Roster workbook (.ods or .xlsx)")
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report what would change without writing anything",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f"Children per batch (default: {DEFAULT_BATCH_SIZE})",
+        )
+
+    def handle(self, *args, **options):
+
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be a positive integer.")
+
+        importer = RosterImporter(batch_size=options["batch_size"])
+
+        try:
+            report = importer.run(options["path"], dry_run=options["dry_run"])
+        except (OSError, SpreadsheetError) as exc:
+            raise CommandError(str(exc))
+
+        if options["dry_run"] or options["verbosity"] > 1:
+            for line in report.changes:
+                self.stdout.write(line)
+
+        for line in report.skipped:
+            self.stdout.write(self.style.WARNING(f"Skipped {line}"))
+
+        for line in report.conflicts:
+            self.stdout.write(self.style.ERROR(f"Not applied {line}"))
+
+        for line in report.summary():
+            self.stdout.write(line)
+
+        if options["dry_run"]:
+            self.stdout.write(self.style.WARNING("Dry run: nothing was written."))
+        else:
+            self.stdout.write(self.style.SUCCESS("Roster import completed."))
@@ -0,0 +1,54 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.planning.forecasting import DEFAULT_HORIZON_MONTHS
+from apps.planning.matching import match_waitlist
+from apps.planning.models import AdmissionPlan
+
+
+class Command(BaseCommand):
+    help = "Match waiting waitlist entries to projected open seats"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--months",
+            type=int,
+            default=DEFAULT_HORIZON_MONTHS,
+            help=f"Forecast horizon in months (default: {DEFAULT_HORIZON_MONTHS})",
+        )
+        parser.add_argument(
+            "--save",
+            action="store_true",
+            help="Replace existing draft admission plans with the new matches",
+        )
+
+    def handle(self, *args, **options):
+
+        if options["months"] < 1:
+            raise CommandError("--months must be a positive integer.")
+
+        started = time.perf_counter()
+        plans = match_waitlist(months=options["months"])
+        elapsed = time.perf_counter() - started
+
+        for plan in plans:
+            self.stdout.write(
+                f"Waitlist entry {plan.waitlist_entry_id} → "
+                f"{plan.target_room.name} on {plan.planned_date}"
+            )
+
+        if options["save"]:
+            with transaction.atomic():
+                AdmissionPlan.objects.filter(status="draft").delete()
+                AdmissionPlan.objects.bulk_create(plans)
+
+            self.stdout.write(self.style.SUCCESS(
+                f"Saved {len(plans)} draft admission plans ({elapsed:.2f}s)."
+            ))
+        else:
+            self.stdout.write(
+                f"{len(plans)} matches in {elapsed:.2f}s. "
+                "Use --save to store them as draft admission plans."
+            )
@@ -0,0 +1,44 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.planning import rollup
+
+
+class Command(BaseCommand):
+    help = "Average occupancy and household mix per room over a date range"
+
+    def add_arguments(self, parser):
+        parser.add_argument("start", help="First day (YYYY-MM-DD)")
+        parser.add_argument("end", help="Last day (YYYY-MM-DD), clipped to today")
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Recount the daily rollup from placements first",
+        )
+
+    def handle(self, *args, **options):
+
+        try:
+            start = date.fromisoformat(options["start"])
+            end = date.fromisoformat(options["end"])
+        except ValueError:
+            raise CommandError("Dates must look like YYYY-MM-DD.")
+
+        if options["rebuild"]:
+            rollup.rebuild()
+
+        start, end, rows = rollup.occupancy_between(start, end)
+
+        self.stdout.write(f"Occupancy {start} to {end}")
+
+        for row in rows:
+            mix = ", ".join(
+                f"{household_type} {pct}%"
+                for household_type, pct in row["household_pct"].items()
+            )
+            self.stdout.write(
+                f"{row['room'].name}: average {row['average']} "
+                f"({row['occupancy_pct']}% of {row['room'].capacity})"
+                + (f" — {mix}" if mix else "")
+            )
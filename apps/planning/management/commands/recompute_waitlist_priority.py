@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from apps.planning.priority import recompute_priorities
+
+
+class Command(BaseCommand):
+    help = "Recompute the stored priority of every waitlist entry"
+
+    def handle(self, *args, **options):
+
+        count = recompute_priorities()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Recomputed priority for {count} waitlist entries."
+        ))
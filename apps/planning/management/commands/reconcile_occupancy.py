@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.classrooms.models import Room
+from apps.planning.occupancy import reconcile
+
+
+class Command(BaseCommand):
+    help = "Detect and repair drift in the room occupancy counters"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only report drift; exit with an error if any is found",
+        )
+
+    def handle(self, *args, **options):
+
+        with transaction.atomic():
+            drift = reconcile(repair=not options["check"])
+
+        names = dict(Room.objects.values_list("id", "name"))
+
+        for room_id, field, stored, actual in drift:
+            self.stdout.write(
+                f"{names.get(room_id, room_id)}: {field} "
+                f"{'missing' if stored is None else stored} → {actual}"
+            )
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS("Occupancy counters are in sync."))
+        elif options["check"]:
+            raise CommandError(f"{len(drift)} occupancy counters have drifted.")
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"Repaired {len(drift)} occupancy counters."
+            ))
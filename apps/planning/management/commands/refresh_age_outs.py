@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.planning.age_outs import refresh, upcoming
+
+
+class Command(BaseCommand):
+    help = "Rebuild the age-out calendar and list upcoming age-outs"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=90,
+            help="List children aging out within this many days (default 90)",
+        )
+        parser.add_argument(
+            "--no-refresh",
+            action="store_true",
+            help="Only list; do not rebuild the calendar first",
+        )
+
+    def handle(self, *args, **options):
+
+        if not options["no_refresh"]:
+            with transaction.atomic():
+                refresh()
+
+        age_outs = list(upcoming(days=options["days"]))
+
+        for age_out in age_outs:
+            self.stdout.write(
+                f"{age_out.overdue_on}  {age_out.room.name}: "
+                f"{age_out.child.first_name} {age_out.child.last_name}"
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(age_outs)} children age out in the next {options['days']} days."
+        ))
@@ -0,0 +1,132 @@
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.planning import ranking, room_registry
+from apps.planning.benchmarks import (
+    BENCHMARKS,
+    DEFAULT_THRESHOLD,
+    compare,
+    run_benchmarks,
+)
+from apps.planning.dashboard_cache import invalidate_all
+from apps.planning.synthetic import SyntheticDataGenerator
+
+
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / "tests" / "benchmarks" / "baseline.json"
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the planning hot paths against a seeded synthetic "
+        "database and compare with a stored baseline. Nothing is kept: "
+        "all writes are rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--centers", type=int, default=2,
+            help="Synthetic centers to seed (default 2)",
+        )
+        parser.add_argument(
+            "--children", type=int, default=5000,
+            help="Synthetic children to seed (default 5000)",
+        )
+        parser.add_argument(
+            "--seed", type=int, default=0,
+            help="Seed of the synthetic data (default 0)",
+        )
+        parser.add_argument(
+            "--existing", action="store_true",
+            help="Benchmark the current database instead of seeding one",
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=5,
+            help="Timed runs per benchmark; the median is kept (default 5)",
+        )
+        parser.add_argument(
+            "--only", nargs="+", choices=sorted(BENCHMARKS), metavar="NAME",
+            help="Run only these benchmarks",
+        )
+        parser.add_argument(
+            "--output",
+            help="Write the results as JSON to this file (default: stdout)",
+        )
+        parser.add_argument(
+            "--baseline", default=str(DEFAULT_BASELINE),
+            help="Baseline JSON to compare with (default: tests/benchmarks/baseline.json)",
+        )
+        parser.add_argument(
+            "--threshold", type=float, default=DEFAULT_THRESHOLD,
+            help=(
+                "Relative time or memory growth flagged as a regression "
+                f"(default {DEFAULT_THRESHOLD})"
+            ),
+        )
+        parser.add_argument(
+            "--write-baseline", action="store_true",
+            help="Store these results as the new baseline instead of comparing",
+        )
+
+    def handle(self, *args, **options):
+
+        if options["repeat"] < 1:
+            raise CommandError("--repeat must be a positive integer.")
+
+        try:
+            with transaction.atomic():
+                if not options["existing"]:
+                    SyntheticDataGenerator(
+                        centers=options["centers"],
+                        children=options["children"],
+                        seed=options["seed"],
+                        prefix="Benchmark",
+                    ).run()
+
+                results = run_benchmarks(options["only"], options["repeat"])
+                transaction.set_rollback(True)
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        finally:
+            # In-process and cached state built from the rolled-back data.
+            invalidate_all()
+            room_registry.invalidate()
+            ranking.invalidate()
+
+        output = json.dumps(results, indent=2, sort_keys=True)
+
+        if options["output"]:
+            Path(options["output"]).write_text(output + "\n")
+        else:
+            self.stdout.write(output)
+
+        baseline_path = Path(options["baseline"])
+
+        if options["write_baseline"]:
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            baseline_path.write_text(output + "\n")
+            self.stdout.write(self.style.SUCCESS(f"Baseline written to {baseline_path}."))
+            return
+
+        if not baseline_path.exists():
+            self.stdout.write(self.style.WARNING(
+                f"No baseline at {baseline_path}; pass --write-baseline to create one."
+            ))
+            return
+
+        regressions = compare(
+            results, json.loads(baseline_path.read_text()), options["threshold"],
+        )
+
+        for name, metric, base, current in regressions:
+            self.stdout.write(self.style.ERROR(
+                f"{name}: {metric} {base} → {current}"
+            ))
+
+        if regressions:
+            raise CommandError(f"{len(regressions)} benchmark regressions.")
+
+        self.stdout.write(self.style.SUCCESS("No regressions against the baseline."))
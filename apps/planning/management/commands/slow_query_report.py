@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.planning.slow_queries import log_path, read_log, summarize
+
+
+class Command(BaseCommand):
+    help = "Rank the slow-query log's fingerprints by total time"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--log",
+            help="Slow-query log to read (default: PLANNING_SLOW_QUERY_LOG)",
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=10,
+            help="Fingerprints to show (default 10)",
+        )
+        parser.add_argument(
+            "--details",
+            action="store_true",
+            help="Also show each fingerprint's latest call stack and query plan",
+        )
+
+    def handle(self, *args, **options):
+
+        path = options["log"] or log_path()
+
+        try:
+            groups = summarize(read_log(path))
+        except FileNotFoundError:
+            raise CommandError(f"No slow-query log at {path}.")
+
+        if not groups:
+            self.stdout.write(self.style.SUCCESS("No slow queries logged."))
+            return
+
+        for group in groups[:options["limit"]]:
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"{group['fingerprint']}  total {group['total_ms']:.1f} ms  "
+                f"count {group['count']}  avg {group['avg_ms']:.1f} ms  "
+                f"max {group['max_ms']:.1f} ms"
+            ))
+            self.stdout.write(f"  from: {', '.join(group['origins'])}")
+            self.stdout.write(f"  {group['sql']}")
+
+            if options["details"]:
+                if group["plan"]:
+                    self.stdout.write("  plan:")
+                    for line in group["plan"]:
+                        self.stdout.write(f"    {line}")
+
+                self.stdout.write("  stack:")
+                for frame in group["stack"]:
+                    self.stdout.write(f"    {frame}")
+
+            self.stdout.write("")
+
+        self.stdout.write(
+            f"{len(groups)} fingerprints, "
+            f"{sum(g['count'] for g in groups)} slow queries."
+        )
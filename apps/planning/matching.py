@@ -0,0 +1,194 @@
+"""
+Waitlist-to-seat matching.
+
+Waiting entries are served in priority order (stored priority score,
+then requested start). Each entry gets the earliest day, on or after its
+requested start, on which the child is old enough for one of its
+candidate rooms and that room has a free seat for the whole stay, up
+to the child's age-out date.
+
+Open seats per room come from the occupancy forecast and are kept in a
+segment tree per room. "Latest full day in the stay" and "take a seat
+for the stay" are both O(log days), so matching costs
+O(entries × candidate rooms × log days) instead of a scan over
+entries and dates.
+"""
+
+from datetime import timedelta
+
+from .eligibility import age_out_date
+from .forecasting import DEFAULT_HORIZON_MONTHS, add_months, forecast_occupancy
+from .models import AdmissionPlan, WaitlistEntry
+
+
+class SeatTimeline:
+    """
+    Free seats per day for one room: range add and "last day in a
+    range with no free seat" in O(log n), via a lazy segment tree of
+    range minima.
+    """
+
+    def __init__(self, free_seats):
+        self.n = len(free_seats)
+        self.min = [0] * (4 * max(self.n, 1))
+        self.lazy = [0] * (4 * max(self.n, 1))
+        if self.n:
+            self._build(1, 0, self.n - 1, free_seats)
+
+    def _build(self, node, lo, hi, values):
+        if lo == hi:
+            self.min[node] = values[lo]
+            return
+        mid = (lo + hi) // 2
+        self._build(2 * node, lo, mid, values)
+        self._build(2 * node + 1, mid + 1, hi, values)
+        self.min[node] = min(self.min[2 * node], self.min[2 * node + 1])
+
+    def _push(self, node):
+        if self.lazy[node]:
+            for child in (2 * node, 2 * node + 1):
+                self.min[child] += self.lazy[node]
+                self.lazy[child] += self.lazy[node]
+            self.lazy[node] = 0
+
+    def add(self, start, end, value):
+        """
+        Adds `value` to every day in [start, end).
+        """
+
+        if start < end:
+            self._add(1, 0, self.n - 1, start, end - 1, value)
+
+    def _add(self, node, lo, hi, start, end, value):
+        if end < lo or hi < start:
+            return
+        if start <= lo and hi <= end:
+            self.min[node] += value
+            self.lazy[node] += value
+            return
+        self._push(node)
+        mid = (lo + hi) // 2
+        self._add(2 * node, lo, mid, start, end, value)
+        self._add(2 * node + 1, mid + 1, hi, start, end, value)
+        self.min[node] = min(self.min[2 * node], self.min[2 * node + 1])
+
+    def last_full_day(self, start, end):
+        """
+        Last day in [start, end) with no free seat, or None.
+        """
+
+        if start >= end:
+            return None
+        return self._last_full(1, 0, self.n - 1, start, end - 1)
+
+    def _last_full(self, node, lo, hi, start, end):
+        if end < lo or hi < start or self.min[node] > 0:
+            return None
+        if lo == hi:
+            return lo
+        self._push(node)
+        mid = (lo + hi) // 2
+        found = self._last_full(2 * node + 1, mid + 1, hi, start, end)
+        if found is None:
+            found = self._last_full(2 * node, lo, mid, start, end)
+        return found
+
+
+def match_waitlist(start=None, months=DEFAULT_HORIZON_MONTHS):
+    """
+    Matches waiting entries to projected open seats.
+
+    Returns unsaved draft AdmissionPlans, in the order they were
+    matched. Entries that cannot be seated within the horizon are left
+    out.
+    """
+
+    forecast = forecast_occupancy(start=start, months=months)
+    start = forecast["start"]
+    days = forecast["days"]
+
+    rooms = forecast["rooms"]
+    timelines = {
+        room.id: SeatTimeline([room.capacity - n for n in occupancy])
+        for room, occupancy in zip(rooms, forecast["occupancy"])
+    }
+
+    # Plain tuples rather than model instances: building thousands of
+    # instances (and a related manager each) costs more than matching.
+    entries = (
+        WaitlistEntry.objects
+        .filter(status="waiting")
+        .exclude(admission_plans__status="planned")
+        .order_by("-priority_score", "requested_start", "id")
+        .values_list(
+            "id",
+            "child_id",
+            "requested_start",
+            "child__birth_date",
+        )
+    )
+
+    preferences = {}
+    for entry_id, room_id in (
+        WaitlistEntry.preferred_rooms.through.objects
+        .filter(waitlistentry__status="waiting")
+        .values_list("waitlistentry_id", "room_id")
+    ):
+        preferences.setdefault(entry_id, []).append(room_id)
+
+    room_by_id = {room.id: room for room in rooms}
+
+    def day(d):
+        return min(max((d - start).days, 0), days)
+
+    plans = []
+
+    for entry_id, child_id, requested_start, birth_date in entries:
+        candidates = [
+            room_by_id[room_id]
+            for room_id in preferences.get(entry_id, [])
+            if room_id in room_by_id
+        ] or rooms
+        best = None
+
+        for room in candidates:
+            timeline = timelines[room.id]
+
+            # Old enough from the first of the month they reach the
+            # room's minimum age.
+            first = day(max(
+                requested_start,
+                add_months(birth_date, room.min_age_months),
+            ))
+            last = day(age_out_date(birth_date, room.max_age_months))
+
+            # Move past the latest full day until the rest of the stay
+            # is free. One lookup suffices: after it, [first, last) has
+            # no full day left.
+            blocked = timeline.last_full_day(first, last)
+            if blocked is not None:
+                first = blocked + 1
+
+            if first >= last:
+                continue
+
+            if best is None or first < best[0]:
+                best = (first, last, room)
+
+        if best is None:
+            continue
+
+        first, last, room = best
+        timelines[room.id].add(first, last, -1)
+
+        plans.append(AdmissionPlan(
+            waitlist_entry_id=entry_id,
+            child_id=child_id,
+            target_room=room,
+            planned_date=start + timedelta(days=first),
+            status="draft",
+            notes="Matched from waitlist",
+        ))
+
+    return plans
+
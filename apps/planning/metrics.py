@@ -0,0 +1,277 @@
+"""
+Prometheus metrics.
+
+Request latency histograms and database query counts per view (fed by
+ServerTimingMiddleware), and cache hit/miss counters, are kept per
+process and written to one file per process in PLANNING_METRICS_DIR
+(default: comet-metrics in the system temp directory).
+Files are written at most every FLUSH_INTERVAL seconds and replaced
+atomically, so readers never see a partial file. /metrics sums every
+process's file with this process's live values; counters of workers
+that have exited keep counting towards the totals, as Prometheus
+expects of counters. Empty the directory when the server starts, as
+for any multiprocess Prometheus setup.
+
+Domain gauges (room occupancy, open seats, overdue children, waitlist
+length) are read from the database at scrape time, from the occupancy
+counters, the age-out calendar and the waitlist index: three indexed
+aggregate queries.
+
+The text format is written directly; no client library is needed.
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.db.models import Count
+from django.utils.timezone import now
+
+from .models import AgeOutDate, RoomOccupancy, WaitlistEntry
+from .perf import BUCKETS_MS, recording
+
+
+FLUSH_INTERVAL = 1.0
+
+LATENCY_BUCKETS = tuple(bound / 1000 for bound in BUCKETS_MS)
+
+HELP = {
+    "comet_request_duration_seconds": ("histogram", "Request latency by view."),
+    "comet_request_db_queries_total": ("counter", "Database queries run by view."),
+    "comet_cache_requests_total": ("counter", "Cache lookups by cache and result."),
+    "comet_room_capacity": ("gauge", "Seats per room."),
+    "comet_room_occupied": ("gauge", "Children placed per room."),
+    "comet_room_open_seats": ("gauge", "Capacity less placed children, per room."),
+    "comet_room_overdue_children": ("gauge", "Placed children older than the room's maximum age."),
+    "comet_waitlist_length": ("gauge", "Waitlist entries still waiting."),
+}
+
+_lock = threading.Lock()
+_state = {"pid": None, "values": {}, "flushed": 0.0}
+
+
+def metrics_dir():
+    return Path(
+        getattr(settings, "PLANNING_METRICS_DIR", None)
+        or Path(tempfile.gettempdir()) / "comet-metrics"
+    )
+
+
+def _values():
+    """
+    This process's {(name, labels): value}; caller holds _lock. A
+    forked worker starts from zero rather than its parent's copy.
+    """
+
+    if _state["pid"] != os.getpid():
+        _state.update(pid=os.getpid(), values={}, flushed=0.0)
+
+    return _state["values"]
+
+
+def _inc(values, name, labels, amount=1):
+    key = (name, labels)
+    values[key] = values.get(key, 0) + amount
+
+
+def _flush(values, force=False):
+    """
+    Writes this process's values to its file; caller holds _lock.
+    """
+
+    if not force and time.monotonic() - _state["flushed"] < FLUSH_INTERVAL:
+        return
+
+    directory = metrics_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+
+    path = directory / f"{os.getpid()}.json"
+    tmp = path.with_suffix(".tmp")
+
+    tmp.write_text(json.dumps([
+        [name, list(labels), value] for (name, labels), value in values.items()
+    ]))
+    os.replace(tmp, path)
+
+    _state["flushed"] = time.monotonic()
+
+
+# -------------------------------------------------------
+# Recording
+# -------------------------------------------------------
+
+def observe_request(view, timings):
+    """
+    Records one request's total time and query count (perf.Timings).
+    """
+
+    if not recording():
+        return
+
+    seconds = timings.total_ms / 1000
+    labels = (("view", view),)
+
+    with _lock:
+        values = _values()
+
+        for bound in LATENCY_BUCKETS:
+            _inc(values, "comet_request_duration_seconds_bucket",
+                 labels + (("le", _format_bound(bound)),), int(seconds <= bound))
+
+        _inc(values, "comet_request_duration_seconds_sum", labels, seconds)
+        _inc(values, "comet_request_duration_seconds_count", labels)
+        _inc(values, "comet_request_db_queries_total", labels, timings.queries)
+
+        _flush(values)
+
+
+def cache_lookup(cache_name, hits=0, misses=0):
+
+    if not recording():
+        return
+
+    with _lock:
+        values = _values()
+
+        if hits:
+            _inc(values, "comet_cache_requests_total",
+                 (("cache", cache_name), ("result", "hit")), hits)
+        if misses:
+            _inc(values, "comet_cache_requests_total",
+                 (("cache", cache_name), ("result", "miss")), misses)
+
+        _flush(values)
+
+
+def reset():
+    """
+    Forgets this process's values and every process's file.
+    """
+
+    with _lock:
+        _values().clear()
+
+        for path in metrics_dir().glob("*.json"):
+            path.unlink(missing_ok=True)
+
+
+# -------------------------------------------------------
+# Exposition
+# -------------------------------------------------------
+
+def _format_bound(bound):
+    return "+Inf" if bound == float("inf") else repr(bound)
+
+
+def _collected():
+    """
+    Every process's values summed: {(name, labels): value}.
+    """
+
+    with _lock:
+        values = _values()
+        _flush(values, force=True)
+
+    totals = {}
+
+    for path in metrics_dir().glob("*.json"):
+        try:
+            entries = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue
+
+        for name, labels, value in entries:
+            _inc(totals, name, tuple(tuple(pair) for pair in labels), value)
+
+    return totals
+
+
+def _gauges():
+    """
+    Domain gauges from aggregates: {(name, labels): value}.
+    """
+
+    gauges = {}
+    today = now().date()
+
+    overdue = dict(
+        AgeOutDate.objects
+        .filter(overdue_on__lte=today)
+        .values_list("room_id")
+        .annotate(n=Count("pk"))
+        .order_by()
+    )
+
+    for room_id, room, capacity, occupied in (
+        RoomOccupancy.objects
+        .values_list("room_id", "room__name", "room__capacity", "occupied")
+    ):
+        labels = (("room", room),)
+        gauges[("comet_room_capacity", labels)] = capacity
+        gauges[("comet_room_occupied", labels)] = occupied
+        gauges[("comet_room_open_seats", labels)] = capacity - occupied
+        gauges[("comet_room_overdue_children", labels)] = overdue.get(room_id, 0)
+
+    gauges[("comet_waitlist_length", ())] = (
+        WaitlistEntry.objects.filter(status="waiting").count()
+    )
+
+    return gauges
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _family(name):
+    for suffix in ("_bucket", "_sum", "_count"):
+        if name.endswith(suffix) and name[: -len(suffix)] in HELP:
+            return name[: -len(suffix)]
+    return name
+
+
+def render():
+    """
+    All metrics in the Prometheus text exposition format.
+    """
+
+    samples = _collected()
+    samples.update(_gauges())
+
+    families = {}
+    for (name, labels), value in samples.items():
+        families.setdefault(_family(name), []).append((name, labels, value))
+
+    lines = []
+
+    for family in sorted(families):
+        kind, text = HELP.get(family, ("untyped", ""))
+        lines.append(f"# HELP {family} {text}")
+        lines.append(f"# TYPE {family} {kind}")
+
+        for name, labels, value in sorted(families[family], key=_sample_order):
+            label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+            lines.append(
+                f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}"
+            )
+
+    return "\n".join(lines) + "\n"
+
+
+def _sample_order(sample):
+    """
+    Series grouped by their non-bucket labels, buckets in bound order.
+    """
+
+    name, labels, _ = sample
+    le = dict(labels).get("le")
+
+    return (
+        [pair for pair in labels if pair[0] != "le"],
+        name,
+        float("inf") if le == "+Inf" else float(le or 0),
+    )
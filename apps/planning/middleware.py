@@ -0,0 +1,76 @@
+"""
+Request instrumentation middleware.
+"""
+
+import time
+from contextlib import ExitStack
+
+from django.db import connections
+
+from . import metrics, perf, slow_queries
+
+
+UNRESOLVED = "<unresolved>"
+
+
+class ServerTimingMiddleware:
+    """
+    Times SQL, template rendering and the whole request, adds a
+    Server-Timing header and records the request under its URL name
+    (see perf.py and metrics.py). Place it near the top of MIDDLEWARE so the total
+    covers the other middleware. For streaming responses the total
+    stops when the response starts streaming.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        perf.install()
+
+    def __call__(self, request):
+
+        timings, token = perf.start_request()
+        started = time.perf_counter()
+
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(perf.count_query(timings))
+                    )
+
+                response = self.get_response(request)
+        finally:
+            perf.end_request(token)
+
+        timings.total_ms = (time.perf_counter() - started) * 1000
+
+        response["Server-Timing"] = timings.server_timing()
+
+        match = getattr(request, "resolver_match", None)
+        view_name = match.view_name if match else UNRESOLVED
+
+        perf.record(view_name, timings)
+        metrics.observe_request(view_name, timings)
+
+        return response
+
+
+class QueryOriginMiddleware:
+    """
+    Labels the request's queries in the slow-query log with the URL
+    name of its view, or its path until the view is resolved.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+
+        token = slow_queries.set_origin(request.path)
+        try:
+            return self.get_response(request)
+        finally:
+            slow_queries.reset_origin(token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        slow_queries.set_origin(request.resolver_match.view_name)
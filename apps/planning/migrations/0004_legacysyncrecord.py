@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('planning', '0003_alter_moveupplan_exit_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LegacySyncRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=50)),
+                ('legacy_id', models.BigIntegerField()),
+                ('object_id', models.BigIntegerField()),
+                ('fingerprint', models.CharField(max_length=40)),
+            ],
+            options={
+                'unique_together': {('source', 'legacy_id')},
+            },
+        ),
+    ]
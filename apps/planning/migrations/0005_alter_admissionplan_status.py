@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('planning', '0004_legacysyncrecord'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='admissionplan',
+            name='status',
+            field=models.CharField(choices=[('draft', 'Draft'), ('planned', 'Planned'), ('implemented', 'Implemented'), ('cancelled', 'Cancelled')], default='planned', max_length=20),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('planning', '0005_alter_admissionplan_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TuitionRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('department', models.CharField(choices=[('IN', 'Infant'), ('TL', 'Toddler'), ('TR', 'Preschool Transition'), ('PS', 'Preschool')], max_length=2)),
+                ('household_type', models.CharField(choices=[('CV', 'Civil Servant'), ('P', 'Public'), ('S', 'Staff'), ('M', 'Military')], max_length=2)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=8)),
+                ('effective_from', models.DateField()),
+            ],
+            options={
+                'ordering': ['department', 'household_type', 'effective_from'],
+                'unique_together': {('department', 'household_type', 'effective_from')},
+            },
+        ),
+    ]
@@ -0,0 +1,61 @@
+from datetime import date
+from decimal import Decimal
+
+from django.db import migrations
+
+
+# The rates that were hard-coded in apps/people/models.py, in effect
+# from before any data this app holds.
+INITIAL_EFFECTIVE_FROM = date(2000, 1, 1)
+
+INITIAL_RATES = {
+    ("IN", "CV"): Decimal("1380.12"),
+    ("TL", "CV"): Decimal("1341.17"),
+    ("TR", "CV"): Decimal("1213.17"),
+    ("PS", "CV"): Decimal("978.33"),
+
+    ("IN", "M"): Decimal("1380.12"),
+    ("TL", "M"): Decimal("1341.17"),
+    ("TR", "M"): Decimal("1213.17"),
+    ("PS", "M"): Decimal("978.33"),
+
+    ("IN", "S"): Decimal("1242.11"),
+    ("TL", "S"): Decimal("1207.05"),
+    ("TR", "S"): Decimal("1091.85"),
+    ("PS", "S"): Decimal("880.50"),
+
+    ("IN", "P"): Decimal("1536.85"),
+    ("TL", "P"): Decimal("1493.74"),
+    ("TR", "P"): Decimal("1357.64"),
+    ("PS", "P"): Decimal("1100.17"),
+}
+
+
+def seed_rates(apps, schema_editor):
+    TuitionRate = apps.get_model("planning", "TuitionRate")
+
+    TuitionRate.objects.bulk_create([
+        TuitionRate(
+            department=department,
+            household_type=household_type,
+            amount=amount,
+            effective_from=INITIAL_EFFECTIVE_FROM,
+        )
+        for (department, household_type), amount in INITIAL_RATES.items()
+    ])
+
+
+def unseed_rates(apps, schema_editor):
+    TuitionRate = apps.get_model("planning", "TuitionRate")
+    TuitionRate.objects.filter(effective_from=INITIAL_EFFECTIVE_FROM).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('planning', '0006_tuitionrate'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_rates, unseed_rates),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:11
+
+from django.db import migrations, models
+from django.db.models import Case, IntegerField, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce
+
+
+# HOUSEHOLD_PRIORITY as of this migration.
+HOUSEHOLD_PRIORITY = {"CV": 100, "M": 75, "S": 50, "P": 25}
+
+
+def compute_scores(apps, schema_editor):
+    Child = apps.get_model("people", "Child")
+    WaitlistEntry = apps.get_model("planning", "WaitlistEntry")
+
+    weight = Case(
+        *[
+            When(household__household_type=household_type, then=Value(score))
+            for household_type, score in HOUSEHOLD_PRIORITY.items()
+        ],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+
+    WaitlistEntry.objects.update(priority_score=Coalesce(
+        Subquery(
+            Child.objects
+            .filter(pk=OuterRef("child_id"))
+            .annotate(weight=weight)
+            .values("weight")[:1]
+        ),
+        Value(0),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classrooms', '0002_room_department'),
+        ('people', '0005_child_security_deposit_child_tuition_override'),
+        ('planning', '0007_seed_tuition_rates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='waitlistentry',
+            name='priority_score',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='waitlistentry',
+            index=models.Index(fields=['status', '-priority_score', 'requested_start', 'id'], name='waitlist_priority_idx'),
+        ),
+        migrations.RunPython(compute_scores, migrations.RunPython.noop),
+    ]
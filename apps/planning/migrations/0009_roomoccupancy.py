@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_occupancy(apps, schema_editor):
+    Room = apps.get_model("classrooms", "Room")
+    Placement = apps.get_model("planning", "Placement")
+    MoveUpPlan = apps.get_model("planning", "MoveUpPlan")
+    RoomOccupancy = apps.get_model("planning", "RoomOccupancy")
+
+    def counts(queryset, field):
+        return dict(
+            queryset.values_list(field).annotate(n=Count("id")).order_by()
+        )
+
+    occupied = counts(Placement.objects.filter(end_date__isnull=True), "room_id")
+    planned = MoveUpPlan.objects.filter(status="planned")
+    incoming = counts(
+        planned.filter(exit_type="moveup", target_room__isnull=False),
+        "target_room_id",
+    )
+    outgoing = counts(planned, "current_room_id")
+
+    RoomOccupancy.objects.bulk_create([
+        RoomOccupancy(
+            room_id=room_id,
+            occupied=occupied.get(room_id, 0),
+            incoming=incoming.get(room_id, 0),
+            outgoing=outgoing.get(room_id, 0),
+        )
+        for room_id in Room.objects.values_list("id", flat=True)
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classrooms', '0002_room_department'),
+        ('planning', '0008_waitlist_priority_score'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoomOccupancy',
+            fields=[
+                ('room', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='occupancy', serialize=False, to='classrooms.room')),
+                ('occupied', models.IntegerField(default=0)),
+                ('incoming', models.IntegerField(default=0)),
+                ('outgoing', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'Room occupancy',
+            },
+        ),
+        migrations.RunPython(count_occupancy, migrations.RunPython.noop),
+    ]
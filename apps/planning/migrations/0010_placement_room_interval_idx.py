@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classrooms', '0002_room_department'),
+        ('people', '0005_child_security_deposit_child_tuition_override'),
+        ('planning', '0009_roomoccupancy'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='placement',
+            index=models.Index(fields=['room', 'start_date', 'end_date'], name='placement_room_interval_idx'),
+        ),
+    ]
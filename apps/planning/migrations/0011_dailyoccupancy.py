@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classrooms', '0002_room_department'),
+        ('planning', '0010_placement_room_interval_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(db_index=True)),
+                ('ordinal', models.IntegerField()),
+                ('household_type', models.CharField(choices=[('CV', 'Civil Servant'), ('P', 'Public'), ('S', 'Staff'), ('M', 'Military')], max_length=2)),
+                ('headcount', models.IntegerField(default=0)),
+                ('cumulative', models.BigIntegerField(default=0)),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_occupancy', to='classrooms.room')),
+            ],
+            options={
+                'verbose_name_plural': 'Daily occupancy',
+                'unique_together': {('room', 'household_type', 'date')},
+            },
+        ),
+    ]
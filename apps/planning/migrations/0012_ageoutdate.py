@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:21
+
+from datetime import date
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def _first_of_month(birth_date, months):
+    year, month = divmod(birth_date.year * 12 + birth_date.month + months - 1, 12)
+    return date(year, month + 1, 1)
+
+
+def fill_age_outs(apps, schema_editor):
+    Placement = apps.get_model("planning", "Placement")
+    AgeOutDate = apps.get_model("planning", "AgeOutDate")
+
+    AgeOutDate.objects.bulk_create([
+        AgeOutDate(
+            placement_id=placement_id,
+            child_id=child_id,
+            room_id=room_id,
+            approaching_on=_first_of_month(birth_date, max_age - 2),
+            overdue_on=_first_of_month(birth_date, max_age + 1),
+        )
+        for placement_id, child_id, room_id, birth_date, max_age in (
+            Placement.objects
+            .filter(end_date__isnull=True)
+            .values_list(
+                "id",
+                "child_id",
+                "room_id",
+                "child__birth_date",
+                "room__max_age_months",
+            )
+        )
+    ], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classrooms', '0002_room_department'),
+        ('people', '0005_child_security_deposit_child_tuition_override'),
+        ('planning', '0011_dailyoccupancy'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AgeOutDate',
+            fields=[
+                ('placement', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='age_out', serialize=False, to='planning.placement')),
+                ('approaching_on', models.DateField(db_index=True)),
+                ('overdue_on', models.DateField(db_index=True)),
+                ('child', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='age_outs', to='people.child')),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='age_outs', to='classrooms.room')),
+            ],
+            options={
+                'ordering': ['overdue_on'],
+                'indexes': [models.Index(fields=['room', 'overdue_on'], name='age_out_room_overdue_idx')],
+            },
+        ),
+        migrations.RunPython(fill_age_outs, migrations.RunPython.noop),
+    ]
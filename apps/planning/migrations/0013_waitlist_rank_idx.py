@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 08:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classrooms', '0002_room_department'),
+        ('people', '0006_child_birth_month'),
+        ('planning', '0012_ageoutdate'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='waitlistentry',
+            index=models.Index(fields=['-priority_score', 'requested_start', 'id'], name='waitlist_rank_idx'),
+        ),
+    ]
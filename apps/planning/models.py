@@ -1,14 +1,29 @@
 from django.db import models
 
-from apps.people.models import Child
-from apps.classrooms.models import Room
-from .utils import HOUSEHOLD_PRIORITY
+from apps.people.models import Child, HOUSEHOLD_TYPES
+from apps.classrooms.models import Room, DEPARTMENTS
+
+class PlacementQuerySet(models.QuerySet):
+
+    def on(self, day):
+        """
+        Placements in effect on `day`: started on or before it and not
+        yet ended (end_date is the first day in the next room).
+        Served by placement_room_interval_idx.
+        """
+
+        return self.filter(start_date__lte=day).filter(
+            models.Q(end_date__isnull=True) | models.Q(end_date__gt=day)
+        )
+
 
 class Placement(models.Model):
     """
     The authoritative record of where a child is assigned.
     """
 
+    objects = PlacementQuerySet.as_manager()
+
     child = models.ForeignKey(
         Child,
         on_delete=models.CASCADE,
@@ -30,6 +45,12 @@ class Placement(models.Model):
 
     class Meta:
         ordering = ["start_date"]
+        indexes = [
+            models.Index(
+                fields=["room", "start_date", "end_date"],
+                name="placement_room_interval_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.child} → {self.room}"
@@ -130,7 +151,8 @@ class WaitlistEntry(models.Model):
         blank=True
     )
 
-    priority_score = models.IntegerField(default=0)
+    # Maintained by priority.recompute_priorities(); never edited by hand.
+    priority_score = models.IntegerField(default=0, editable=False)
 
     notes = models.TextField(blank=True)
 
@@ -144,15 +166,24 @@ class WaitlistEntry(models.Model):
         ],
         default="waiting",
     )
-    
-    def priority_score(self):
-        household_type = self.child.household.household_type
-        base_priority = HOUSEHOLD_PRIORITY.get(household_type, 0)
-        return base_priority
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["status", "-priority_score", "requested_start", "id"],
+                name="waitlist_priority_idx",
+            ),
+            # The unfiltered admin changelist.
+            models.Index(
+                fields=["-priority_score", "requested_start", "id"],
+                name="waitlist_rank_idx",
+            ),
+        ]
 
 class AdmissionPlan(models.Model):
 
     STATUS_CHOICES = [
+        ("draft", "Draft"),
         ("planned", "Planned"),
         ("implemented", "Implemented"),
         ("cancelled", "Cancelled"),
@@ -187,4 +218,150 @@ class AdmissionPlan(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
 
+class LegacySyncRecord(models.Model):
+    """
+    Fingerprint of a legacy ACCC row and the object it was imported as.
+    Lets import_accc_data skip rows that have not changed since the
+    last sync.
+    """
+
+    source = models.CharField(max_length=50)
+    legacy_id = models.BigIntegerField()
+    object_id = models.BigIntegerField()
+    fingerprint = models.CharField(max_length=40)
+
+    class Meta:
+        unique_together = ("source", "legacy_id")
+
+    def __str__(self):
+        return f"{self.source} #{self.legacy_id}"
+
+
+class TuitionRate(models.Model):
+    """
+    Monthly tuition for a department and household type, in effect
+    from `effective_from` until the next rate for the same pair.
+    """
+
+    department = models.CharField(max_length=2, choices=DEPARTMENTS)
+
+    household_type = models.CharField(max_length=2, choices=HOUSEHOLD_TYPES)
+
+    amount = models.DecimalField(max_digits=8, decimal_places=2)
+
+    effective_from = models.DateField()
+
+    class Meta:
+        unique_together = ("department", "household_type", "effective_from")
+        ordering = ["department", "household_type", "effective_from"]
+
+    def __str__(self):
+        return (
+            f"{self.get_department_display()} / "
+            f"{self.get_household_type_display()} from {self.effective_from}"
+        )
+
+
+class RoomOccupancy(models.Model):
+    """
+    Denormalized headcounts for a room, kept in step with Placement and
+    MoveUpPlan writes (see occupancy.py). `reconcile_occupancy` repairs
+    any drift.
+    """
+
+    room = models.OneToOneField(
+        Room,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="occupancy",
+    )
+
+    # Open placements.
+    occupied = models.IntegerField(default=0)
+
+    # Planned move-ups into the room.
+    incoming = models.IntegerField(default=0)
+
+    # Planned move-ups and withdrawals out of the room.
+    outgoing = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = "Room occupancy"
+
+    def __str__(self):
+        return f"{self.room}: {self.occupied} of {self.room.capacity}"
+
+
+class DailyOccupancy(models.Model):
+    """
+    Headcount of one room and household type on one day, with the
+    running total of headcounts up to and including that day (see
+    rollup.py).
+    """
+
+    date = models.DateField(db_index=True)
+
+    # date.toordinal(), for day arithmetic in UPDATEs.
+    ordinal = models.IntegerField()
+
+    room = models.ForeignKey(
+        Room,
+        on_delete=models.CASCADE,
+        related_name="daily_occupancy",
+    )
+
+    household_type = models.CharField(max_length=2, choices=HOUSEHOLD_TYPES)
+
+    headcount = models.IntegerField(default=0)
+
+    cumulative = models.BigIntegerField(default=0)
+
+    class Meta:
+        unique_together = ("room", "household_type", "date")
+        verbose_name_plural = "Daily occupancy"
+
+    def __str__(self):
+        return f"{self.room} / {self.household_type} on {self.date}: {self.headcount}"
+
+
+class AgeOutDate(models.Model):
+    """
+    When the child of an open placement starts approaching, and then
+    passes, the room's maximum age (see age_outs.py).
+    """
+
+    placement = models.OneToOneField(
+        Placement,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="age_out",
+    )
+
+    child = models.ForeignKey(
+        Child,
+        on_delete=models.CASCADE,
+        related_name="age_outs",
+    )
+
+    room = models.ForeignKey(
+        Room,
+        on_delete=models.CASCADE,
+        related_name="age_outs",
+    )
+
+    approaching_on = models.DateField(db_index=True)
+
+    overdue_on = models.DateField(db_index=True)
+
+    class Meta:
+        ordering = ["overdue_on"]
+        indexes = [
+            models.Index(
+                fields=["room", "overdue_on"],
+                name="age_out_room_overdue_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.child} ages out of {self.room} on {self.overdue_on}"
 
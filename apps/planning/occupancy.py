@@ -0,0 +1,160 @@
+"""
+Denormalized room headcounts.
+
+RoomOccupancy stores, per room, the open placements (`occupied`) and
+the planned move-ups in (`incoming`) and out (`outgoing`), so reading
+them is a primary-key lookup instead of a count over placements.
+
+Every Placement and MoveUpPlan write turns the row's old and new state
+into counter contributions and applies the difference with F()
+updates, in the same transaction as the write (see signals.py). Bulk
+writes that bypass signals call reconcile(), which also backs the
+`reconcile_occupancy` command.
+"""
+
+from collections import Counter
+
+from django.db.models import Count, F
+
+from apps.classrooms.models import Room
+
+from .models import Placement, MoveUpPlan, RoomOccupancy
+
+
+COUNTERS = ("occupied", "incoming", "outgoing")
+
+
+def placement_counts(room_id, end_date):
+    """
+    Counter contributions of one placement: {(room id, field): n}.
+    """
+
+    if room_id is None or end_date is not None:
+        return Counter()
+
+    return Counter({(room_id, "occupied"): 1})
+
+
+def plan_counts(current_room_id, target_room_id, status, exit_type):
+    """
+    Counter contributions of one move-up plan: {(room id, field): n}.
+    """
+
+    counts = Counter()
+
+    if status != "planned":
+        return counts
+
+    if current_room_id is not None:
+        counts[(current_room_id, "outgoing")] += 1
+
+    if exit_type == "moveup" and target_room_id is not None:
+        counts[(target_room_id, "incoming")] += 1
+
+    return counts
+
+
+def apply_change(old, new):
+    """
+    Applies the difference between two sets of contributions, one
+    UPDATE per room whose counters change.
+    """
+
+    delta = Counter(new)
+    delta.subtract(old)
+
+    by_room = {}
+    for (room_id, field), n in delta.items():
+        if n:
+            by_room.setdefault(room_id, {})[field] = F(field) + n
+
+    # Rooms without a row (created by a bulk write that has not
+    # reconciled yet, or being deleted) are skipped.
+    for room_id, changes in by_room.items():
+        RoomOccupancy.objects.filter(room_id=room_id).update(**changes)
+
+
+def actual_counts(room_ids=None):
+    """
+    {room id: {field: n}} counted from placements and plans.
+    """
+
+    placements = Placement.objects.filter(end_date__isnull=True)
+    plans = MoveUpPlan.objects.filter(status="planned")
+    rooms = Room.objects.all()
+
+    if room_ids is not None:
+        placements = placements.filter(room_id__in=room_ids)
+        plans = plans.filter(current_room_id__in=room_ids)
+        rooms = rooms.filter(id__in=room_ids)
+
+    def grouped(queryset, field):
+        return dict(
+            queryset.values_list(field).annotate(n=Count("id")).order_by()
+        )
+
+    occupied = grouped(placements, "room_id")
+    outgoing = grouped(plans, "current_room_id")
+
+    incoming_plans = MoveUpPlan.objects.filter(
+        status="planned", exit_type="moveup", target_room__isnull=False,
+    )
+    if room_ids is not None:
+        incoming_plans = incoming_plans.filter(target_room_id__in=room_ids)
+    incoming = grouped(incoming_plans, "target_room_id")
+
+    return {
+        room_id: {
+            "occupied": occupied.get(room_id, 0),
+            "incoming": incoming.get(room_id, 0),
+            "outgoing": outgoing.get(room_id, 0),
+        }
+        for room_id in rooms.values_list("id", flat=True)
+    }
+
+
+def reconcile(room_ids=None, repair=True):
+    """
+    Compares stored counters with actual counts.
+
+    Returns [(room id, field, stored, actual)] for every counter that
+    drifted (stored is None for a missing row) and, with `repair`,
+    fixes them.
+    """
+
+    actual = actual_counts(room_ids)
+
+    stored = {
+        row.room_id: row
+        for row in RoomOccupancy.objects.filter(room_id__in=list(actual))
+    }
+
+    drift = []
+    missing = []
+    changed = []
+
+    for room_id, counts in actual.items():
+        row = stored.get(room_id)
+
+        if row is None:
+            drift.extend(
+                (room_id, field, None, counts[field]) for field in COUNTERS
+            )
+            missing.append(RoomOccupancy(room_id=room_id, **counts))
+            continue
+
+        fields = [f for f in COUNTERS if getattr(row, f) != counts[f]]
+
+        if fields:
+            drift.extend(
+                (room_id, f, getattr(row, f), counts[f]) for f in fields
+            )
+            for f in fields:
+                setattr(row, f, counts[f])
+            changed.append(row)
+
+    if repair:
+        RoomOccupancy.objects.bulk_create(missing)
+        RoomOccupancy.objects.bulk_update(changed, COUNTERS)
+
+    return drift
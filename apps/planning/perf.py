@@ -0,0 +1,232 @@
+"""
+Per-request performance timings.
+
+ServerTimingMiddleware (see middleware.py) times every request: SQL
+query count and time, template render time and total time. It sends
+them back as a Server-Timing header, which browser devtools show under
+the request's timing tab, and records them here per URL name.
+
+The histogram is in-process: each worker keeps its own since it
+started, and /planning/_perf/ shows the worker that served the page.
+Recording, here and in metrics.py, stops inside paused(), so
+benchmark requests do not count as traffic.
+Template time comes from wrapping the template backend's render(),
+installed when the middleware loads; nested renders count once.
+"""
+
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+from django.template.backends.django import Template
+
+
+# Upper bounds (ms) of the total time buckets; the last one is open.
+BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float("inf"))
+
+# Timings of the request being served, or None outside one.
+_request_timings = contextvars.ContextVar("planning_request_timings", default=None)
+
+
+class Timings:
+    """
+    What one request spent, in milliseconds.
+    """
+
+    __slots__ = ("queries", "sql_ms", "template_ms", "total_ms", "depth")
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_ms = 0.0
+        self.template_ms = 0.0
+        self.total_ms = 0.0
+        self.depth = 0
+
+    def server_timing(self):
+        """
+        Server-Timing header value.
+        """
+
+        return ", ".join([
+            f'db;dur={self.sql_ms:.1f};desc="{self.queries} queries"',
+            f"tpl;dur={self.template_ms:.1f}",
+            f"total;dur={self.total_ms:.1f}",
+        ])
+
+
+def start_request():
+    timings = Timings()
+    return timings, _request_timings.set(timings)
+
+
+def end_request(token):
+    _request_timings.reset(token)
+
+
+def count_query(timings):
+    """
+    Execute wrapper adding every query's count and time to `timings`.
+    """
+
+    def wrapper(execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            timings.queries += 1
+            timings.sql_ms += (time.perf_counter() - started) * 1000
+
+    return wrapper
+
+
+# -------------------------------------------------------
+# Template render time
+# -------------------------------------------------------
+
+_installed = False
+
+
+def install():
+    """
+    Wraps template rendering so the current request's Timings get the
+    time spent in it. Idempotent.
+    """
+
+    global _installed
+
+    if _installed:
+        return
+
+    render = Template.render
+
+    def timed_render(self, *args, **kwargs):
+        timings = _request_timings.get()
+
+        if timings is None or timings.depth:
+            return render(self, *args, **kwargs)
+
+        timings.depth += 1
+        started = time.perf_counter()
+        try:
+            return render(self, *args, **kwargs)
+        finally:
+            timings.depth -= 1
+            timings.template_ms += (time.perf_counter() - started) * 1000
+
+    Template.render = timed_render
+    _installed = True
+
+
+# -------------------------------------------------------
+# Histogram
+# -------------------------------------------------------
+
+_lock = threading.Lock()
+_stats = {}
+_paused = {"depth": 0}
+
+
+@contextmanager
+def paused():
+    """
+    Stops recording requests and cache lookups in this process for the
+    duration of the block.
+    """
+
+    with _lock:
+        _paused["depth"] += 1
+    try:
+        yield
+    finally:
+        with _lock:
+            _paused["depth"] -= 1
+
+
+def recording():
+    return not _paused["depth"]
+
+
+def record(url_name, timings):
+
+    if not recording():
+        return
+
+    with _lock:
+        stats = _stats.get(url_name)
+
+        if stats is None:
+            stats = _stats[url_name] = {
+                "requests": 0,
+                "queries": 0,
+                "sql_ms": 0.0,
+                "template_ms": 0.0,
+                "total_ms": 0.0,
+                "max_ms": 0.0,
+                "buckets": [0] * len(BUCKETS_MS),
+            }
+
+        stats["requests"] += 1
+        stats["queries"] += timings.queries
+        stats["sql_ms"] += timings.sql_ms
+        stats["template_ms"] += timings.template_ms
+        stats["total_ms"] += timings.total_ms
+        stats["max_ms"] = max(stats["max_ms"], timings.total_ms)
+
+        for i, bound in enumerate(BUCKETS_MS):
+            if timings.total_ms <= bound:
+                stats["buckets"][i] += 1
+                break
+
+
+def reset():
+
+    with _lock:
+        _stats.clear()
+
+
+def _percentile(buckets, requests, fraction):
+    """
+    Upper bound of the bucket holding the `fraction` quantile.
+    """
+
+    rank = fraction * requests
+    seen = 0
+
+    for bound, n in zip(BUCKETS_MS, buckets):
+        seen += n
+        if seen >= rank:
+            return bound
+
+    return BUCKETS_MS[-1]
+
+
+def snapshot():
+    """
+    Per URL name averages, approximate percentiles and bucket counts,
+    slowest average first.
+    """
+
+    with _lock:
+        items = [(name, dict(stats, buckets=list(stats["buckets"])))
+                 for name, stats in _stats.items()]
+
+    rows = []
+
+    for name, stats in items:
+        n = stats["requests"]
+
+        rows.append({
+            "url_name": name,
+            "requests": n,
+            "avg_ms": round(stats["total_ms"] / n, 1),
+            "p50_ms": _percentile(stats["buckets"], n, 0.5),
+            "p95_ms": _percentile(stats["buckets"], n, 0.95),
+            "max_ms": round(stats["max_ms"], 1),
+            "avg_queries": round(stats["queries"] / n, 1),
+            "avg_sql_ms": round(stats["sql_ms"] / n, 1),
+            "avg_template_ms": round(stats["template_ms"] / n, 1),
+            "buckets": stats["buckets"],
+        })
+
+    return sorted(rows, key=lambda row: row["avg_ms"], reverse=True)
@@ -0,0 +1,174 @@
+"""
+Weighted waitlist scoring and the materialized priority.
+
+WAITLIST_SCORING (utils.py) compiles into a single SQL expression,
+evaluated against each WaitlistEntry row:
+
+    household type weight           Case/When on the child's household
+  + sibling already placed          Exists over open placements
+  + preferred room fits the child   Exists over preferred rooms, using
+                                    the age at the requested start
+  + months waiting × weight         date arithmetic, capped
+
+scored_waitlist() ranks any number of entries in one query with it.
+WaitlistEntry.priority_score stores the same score, indexed, so the
+waitlist can be ordered and paginated by the database. It is
+recomputed with a single UPDATE, never loading entries into Python.
+
+Writes that can change a score (entries and their preferred rooms, a
+child's household, a household's type) recompute the affected entries through signals.
+Bulk recomputes also rebuild the waitlist positions (see ranking.py).
+Time on the list moves with the calendar, so run
+`manage.py recompute_waitlist_priority` daily and after changing the
+weights.
+"""
+
+from datetime import date
+
+from django.db.models import (
+    Case,
+    Exists,
+    F,
+    IntegerField,
+    OuterRef,
+    Subquery,
+    Value,
+    When,
+)
+from django.db.models.functions import Coalesce, ExtractMonth, ExtractYear, Greatest, Least
+
+from .eligibility import month_ordinal
+from . import ranking
+from .models import Placement, WaitlistEntry
+from .utils import WAITLIST_SCORING
+
+
+def _month_ordinal_expression(field):
+    return ExtractYear(field) * 12 + ExtractMonth(field)
+
+
+def score_expression(scoring=None, as_of=None):
+    """
+    SQL expression for the score of the WaitlistEntry row it is
+    evaluated against, with the weights in `scoring` (default:
+    WAITLIST_SCORING) and time on the list counted up to `as_of`
+    (default: today).
+    """
+
+    scoring = scoring or WAITLIST_SCORING
+    as_of = as_of or date.today()
+
+    household = Case(
+        *[
+            When(child__household__household_type=household_type, then=Value(weight))
+            for household_type, weight in scoring["household_type"].items()
+        ],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+
+    sibling = Case(
+        When(
+            Exists(
+                Placement.objects
+                .filter(
+                    child__household_id=OuterRef("child__household_id"),
+                    end_date__isnull=True,
+                )
+                .exclude(child_id=OuterRef("child_id"))
+            ),
+            then=Value(scoring["sibling_enrolled"]),
+        ),
+        default=Value(0),
+    )
+
+    preferred_room = Case(
+        When(
+            Exists(
+                WaitlistEntry.preferred_rooms.through.objects
+                .filter(waitlistentry_id=OuterRef("pk"))
+                .annotate(age=(
+                    _month_ordinal_expression(OuterRef("requested_start"))
+                    - _month_ordinal_expression(OuterRef("child__birth_date"))
+                ))
+                .filter(
+                    room__min_age_months__lte=F("age"),
+                    room__max_age_months__gte=F("age"),
+                )
+            ),
+            then=Value(scoring["preferred_room_match"]),
+        ),
+        default=Value(0),
+    )
+
+    months_waiting = Greatest(
+        Least(
+            Value(month_ordinal(as_of))
+            - _month_ordinal_expression("requested_start"),
+            Value(scoring["max_months_waiting"]),
+        ),
+        Value(0),
+    )
+
+    return (
+        household
+        + sibling
+        + preferred_room
+        + months_waiting * Value(scoring["per_month_waiting"])
+    )
+
+
+def scored_waitlist(entries=None, scoring=None, as_of=None):
+    """
+    `entries` (default: all waitlist entries) annotated with a live
+    `score` and ranked by it, in one query.
+    """
+
+    if entries is None:
+        entries = WaitlistEntry.objects.all()
+
+    return (
+        entries
+        .annotate(score=score_expression(scoring, as_of))
+        .order_by("-score", "requested_start", "id")
+    )
+
+
+def _store_scores(entries, scoring=None, as_of=None):
+
+    # UPDATE cannot join, so the score is read back through a
+    # correlated subquery on the same row.
+    score = Subquery(
+        WaitlistEntry.objects
+        .filter(pk=OuterRef("pk"))
+        .annotate(score=score_expression(scoring, as_of))
+        .values("score")[:1]
+    )
+
+    return entries.update(priority_score=Coalesce(score, Value(0)))
+
+
+def recompute_priorities(entries=None, scoring=None, as_of=None):
+    """
+    Stores the current score of `entries` (a WaitlistEntry queryset,
+    default: all of them) in priority_score with one UPDATE. Returns
+    the number of rows.
+    """
+
+    if entries is None:
+        entries = WaitlistEntry.objects.all()
+
+    count = _store_scores(entries, scoring, as_of)
+    ranking.invalidate()
+
+    return count
+
+
+def refresh_priority(entry):
+    """
+    Recomputes one entry's stored score and moves it on the waitlist.
+    """
+
+    _store_scores(WaitlistEntry.objects.filter(pk=entry.pk))
+    entry.refresh_from_db(fields=["priority_score"])
+    ranking.entry_changed(entry)
@@ -0,0 +1,277 @@
+"""
+Live waitlist positions.
+
+Waiting entries are kept in an in-process order-statistic treap keyed
+by (-priority_score, requested_start, id), the order the waitlist is
+served in. An entry's position is the number of keys before it, plus
+one, found in one walk down the tree: O(log n). Saving or deleting an
+entry moves or drops its key in O(log n), so positions stay current
+without re-ranking the table.
+
+Every process builds its treap with one query and keeps it in step
+with its own writes. Each write bumps a version counter in the shared
+cache; a process whose bump does not land right after the version it
+loaded knows another process has written, and rebuilds on its next
+lookup. Bulk priority recomputes call invalidate(). All updates run
+after the surrounding transaction commits.
+"""
+
+import random
+import threading
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import WaitlistEntry
+
+
+VERSION_KEY = "planning:waitlist:version"
+
+
+class _Node:
+    __slots__ = ("key", "priority", "size", "left", "right")
+
+    def __init__(self, key):
+        self.key = key
+        self.priority = random.random()
+        self.size = 1
+        self.left = None
+        self.right = None
+
+
+def _size(node):
+    return node.size if node else 0
+
+
+def _update(node):
+    node.size = 1 + _size(node.left) + _size(node.right)
+    return node
+
+
+class RankIndex:
+    """
+    Set of distinct, sortable keys with insert, remove and rank in
+    O(log n) expected time, via a treap with subtree sizes.
+    """
+
+    def __init__(self, keys=()):
+        self.root = self._build(sorted(keys))
+
+    def __len__(self):
+        return _size(self.root)
+
+    @staticmethod
+    def _build(keys):
+        """
+        Treap over sorted keys in O(n), with the usual stack-based
+        Cartesian tree construction.
+        """
+
+        stack = []
+
+        for key in keys:
+            node = _Node(key)
+            last = None
+            while stack and stack[-1].priority < node.priority:
+                last = _update(stack.pop())
+            node.left = last
+            if stack:
+                stack[-1].right = node
+            stack.append(node)
+
+        while len(stack) > 1:
+            _update(stack.pop())
+
+        return _update(stack[0]) if stack else None
+
+    def _split(self, node, key):
+        """
+        (keys < key, keys >= key)
+        """
+
+        if node is None:
+            return None, None
+
+        if node.key < key:
+            left, right = self._split(node.right, key)
+            node.right = left
+            return _update(node), right
+
+        left, right = self._split(node.left, key)
+        node.left = right
+        return left, _update(node)
+
+    def _merge(self, left, right):
+        if left is None or right is None:
+            return left or right
+
+        if left.priority > right.priority:
+            left.right = self._merge(left.right, right)
+            return _update(left)
+
+        right.left = self._merge(left, right.left)
+        return _update(right)
+
+    def _drop_first(self, node):
+        if node.left is None:
+            return node.right
+        node.left = self._drop_first(node.left)
+        return _update(node)
+
+    def insert(self, key):
+        left, right = self._split(self.root, key)
+        self.root = self._merge(self._merge(left, _Node(key)), right)
+
+    def remove(self, key):
+        left, right = self._split(self.root, key)
+
+        first = right
+        while first is not None and first.left is not None:
+            first = first.left
+
+        if first is not None and first.key == key:
+            right = self._drop_first(right)
+
+        self.root = self._merge(left, right)
+
+    def rank(self, key):
+        """
+        Number of keys smaller than `key`.
+        """
+
+        node, rank = self.root, 0
+
+        while node is not None:
+            if node.key < key:
+                rank += _size(node.left) + 1
+                node = node.right
+            else:
+                node = node.left
+
+        return rank
+
+
+def _key(entry_id, priority_score, requested_start):
+    return (-priority_score, requested_start, entry_id)
+
+
+_lock = threading.Lock()
+_state = {"version": None, "index": None, "keys": {}}
+
+
+def _load():
+    """
+    Current treap and {entry id: key}; caller holds _lock.
+    """
+
+    version = cache.get(VERSION_KEY)
+
+    if version is None:
+        version = time.time_ns()
+        cache.set(VERSION_KEY, version, None)
+
+    if _state["index"] is None or _state["version"] != version:
+        keys = {
+            entry_id: _key(entry_id, score, requested_start)
+            for entry_id, score, requested_start in (
+                WaitlistEntry.objects
+                .filter(status="waiting")
+                .values_list("id", "priority_score", "requested_start")
+            )
+        }
+        _state.update(version=version, index=RankIndex(keys.values()), keys=keys)
+
+    return _state["index"], _state["keys"]
+
+
+def _bump():
+    """
+    Bumps the shared version after a local write. Keeps the local
+    treap only if no other process wrote since it was loaded.
+    """
+
+    try:
+        version = cache.incr(VERSION_KEY)
+    except ValueError:
+        version = None
+        cache.set(VERSION_KEY, time.time_ns(), None)
+
+    if version is not None and _state["version"] == version - 1:
+        _state["version"] = version
+    else:
+        _state["index"] = None
+
+
+def _apply(entry_id, key):
+    with _lock:
+        index, keys = _load()
+
+        old = keys.pop(entry_id, None)
+        if old is not None:
+            index.remove(old)
+
+        if key is not None:
+            keys[entry_id] = key
+            index.insert(key)
+
+        _bump()
+
+
+def entry_changed(entry):
+    """
+    Moves `entry` to its new place, or drops it if no longer waiting.
+    """
+
+    key = None
+    if entry.status == "waiting":
+        key = _key(entry.id, entry.priority_score, entry.requested_start)
+
+    transaction.on_commit(lambda: _apply(entry.id, key))
+
+
+def entry_removed(entry_id):
+    transaction.on_commit(lambda: _apply(entry_id, None))
+
+
+def invalidate():
+    """
+    Rebuilds every process's treap on its next lookup. For bulk writes.
+    """
+
+    def drop():
+        with _lock:
+            _state["index"] = None
+            cache.set(VERSION_KEY, time.time_ns(), None)
+
+    transaction.on_commit(drop)
+
+
+def positions(entry_ids):
+    """
+    {entry id: 1-based position on the waitlist} for the given entries;
+    entries that are not waiting are left out.
+    """
+
+    with _lock:
+        index, keys = _load()
+
+        return {
+            entry_id: index.rank(keys[entry_id]) + 1
+            for entry_id in entry_ids
+            if entry_id in keys
+        }
+
+
+def position(entry_id):
+    """
+    1-based position of one entry on the waitlist, or None.
+    """
+
+    return positions([entry_id]).get(entry_id)
+
+
+def waiting_count():
+
+    with _lock:
+        return len(_load()[0])
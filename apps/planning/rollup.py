@@ -0,0 +1,322 @@
+"""
+Daily occupancy rollup for range reports.
+
+DailyOccupancy holds one row per day, room and household type, from
+the first placement through today. Each row stores the headcount and
+the running total of headcounts up to that day, so the person-days of
+any date range are cum(end) - cum(start - 1): two row lookups per
+room and household type, whatever the length of the range.
+
+The table is built lazily. A report first extends it through today,
+and rebuilds it from placements if it is empty. A placement write
+adjusts only the rows its stay covers, plus the running totals after
+them (see signals.py). Bulk writes recount the rooms they touched
+from their earliest stay with refresh_rooms(). Writes neither path can
+express call invalidate(), and the next report rebuilds the table. An
+example is a stay starting before the table.
+"""
+
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F, Max, Min, Q
+from django.utils.timezone import now
+
+from apps.classrooms.models import Room
+from apps.people.models import HOUSEHOLD_TYPES
+
+from .models import DailyOccupancy, Placement
+
+
+BATCH_SIZE = 5000
+
+
+def _bounds():
+    bounds = DailyOccupancy.objects.aggregate(first=Min("date"), last=Max("date"))
+    return bounds["first"], bounds["last"]
+
+
+def _fill(first, last, base=None, room_ids=None):
+    """
+    Appends the rows for [first, last], counted from placements with
+    one difference array per room and household type. `base` holds
+    each series' running total on the day before `first`. `room_ids`
+    limits the rows to those rooms (default: all).
+    """
+
+    if last < first or room_ids is not None and not room_ids:
+        return
+
+    base = base or {}
+    days = (last - first).days + 1
+
+    rooms = Room.objects.all()
+    placements = (
+        Placement.objects
+        .filter(start_date__lte=last)
+        .filter(Q(end_date__isnull=True) | Q(end_date__gt=first))
+    )
+
+    if room_ids is not None:
+        rooms = rooms.filter(id__in=room_ids)
+        placements = placements.filter(room_id__in=room_ids)
+
+    diff = {
+        (room_id, household_type): [0] * (days + 1)
+        for room_id in rooms.values_list("id", flat=True)
+        for household_type, _ in HOUSEHOLD_TYPES
+    }
+
+    placements = placements.values_list(
+        "room_id",
+        "child__household__household_type",
+        "start_date",
+        "end_date",
+    )
+
+    for room_id, household_type, start, end in placements:
+        series = diff.get((room_id, household_type))
+        if series is None:
+            continue
+
+        a = max((start - first).days, 0)
+        b = days if end is None else min((end - first).days, days)
+
+        if a < b:
+            series[a] += 1
+            series[b] -= 1
+
+    def rows():
+        for (room_id, household_type), series in diff.items():
+            headcount = 0
+            cumulative = base.get((room_id, household_type), 0)
+
+            for i in range(days):
+                headcount += series[i]
+                cumulative += headcount
+                day = first + timedelta(days=i)
+
+                yield DailyOccupancy(
+                    date=day,
+                    ordinal=day.toordinal(),
+                    room_id=room_id,
+                    household_type=household_type,
+                    headcount=headcount,
+                    cumulative=cumulative,
+                )
+
+    # Rows are counted from placements, so a row that already exists
+    # is the one a concurrent report just wrote for the same day.
+    DailyOccupancy.objects.bulk_create(
+        rows(), batch_size=BATCH_SIZE, ignore_conflicts=True,
+    )
+
+
+def rebuild(through=None):
+    """
+    Recounts the whole table, from the first placement through
+    `through` (default: today).
+    """
+
+    through = through or now().date()
+    first = Placement.objects.aggregate(first=Min("start_date"))["first"]
+
+    with transaction.atomic():
+        DailyOccupancy.objects.all().delete()
+
+        if first is not None:
+            _fill(first, through)
+
+
+def extend(through=None):
+    """
+    Adds the days after the last row, through `through` (default:
+    today). Rebuilds an empty table.
+    """
+
+    through = through or now().date()
+    first, last = _bounds()
+
+    if first is not None and last >= through:
+        return
+
+    # Reports extend the table from GET requests, outside any
+    # transaction, and two of them may extend the same days.
+    with transaction.atomic():
+        first, last = _bounds()
+
+        if first is None:
+            rebuild(through)
+            return
+
+        if last >= through:
+            return
+
+        base = {
+            (room_id, household_type): cumulative
+            for room_id, household_type, cumulative in (
+                DailyOccupancy.objects
+                .filter(date=last)
+                .values_list("room_id", "household_type", "cumulative")
+            )
+        }
+
+        _fill(last + timedelta(days=1), through, base)
+
+
+def built():
+    """
+    Whether the table has rows. Until a report builds it, writes have
+    nothing to adjust.
+    """
+
+    return DailyOccupancy.objects.exists()
+
+
+def invalidate():
+    """
+    Empties the table; the next report rebuilds it.
+    """
+
+    DailyOccupancy.objects.all().delete()
+
+
+def refresh_rooms(room_ids, since):
+    """
+    Recounts the rows of `room_ids` from `since` on, after a bulk write
+    whose stays in those rooms all start on or after `since`. Rooms the
+    table has no rows for yet are counted from its first day.
+    """
+
+    room_ids = {room_id for room_id in room_ids if room_id is not None}
+    first, last = _bounds()
+
+    if first is None or not room_ids or since is None or since > last:
+        # Not in the table yet: extend() counts it.
+        return
+
+    if since < first:
+        invalidate()
+        return
+
+    known = set(
+        DailyOccupancy.objects
+        .filter(date=first, room_id__in=room_ids)
+        .values_list("room_id", flat=True)
+        .distinct()
+    )
+
+    _fill(first, last, room_ids=room_ids - known)
+
+    DailyOccupancy.objects.filter(room_id__in=known, date__gte=since).delete()
+
+    base = {
+        (room_id, household_type): cumulative
+        for room_id, household_type, cumulative in (
+            DailyOccupancy.objects
+            .filter(room_id__in=known, date=since - timedelta(days=1))
+            .values_list("room_id", "household_type", "cumulative")
+        )
+    }
+
+    _fill(since, last, base, room_ids=known)
+
+
+def apply_stay(room_id, household_type, start, end, delta):
+    """
+    Adds `delta` children of `household_type` to `room_id` for the
+    days in [start, end) (end None: open), adjusting the running totals
+    of every later day.
+    """
+
+    if room_id is None or (end is not None and end <= start):
+        return
+
+    first, last = _bounds()
+
+    if first is None or start > last:
+        # Not in the table yet: extend() counts it.
+        return
+
+    if start < first:
+        invalidate()
+        return
+
+    series = DailyOccupancy.objects.filter(
+        room_id=room_id, household_type=household_type,
+    )
+    offset = start.toordinal() - 1
+
+    stay = series.filter(date__gte=start)
+    if end is not None:
+        stay = stay.filter(date__lt=end)
+
+    updated = stay.update(
+        headcount=F("headcount") + delta,
+        cumulative=F("cumulative") + delta * (F("ordinal") - offset),
+    )
+
+    if not updated:
+        # A room or household type the table has no rows for.
+        invalidate()
+        return
+
+    if end is not None:
+        series.filter(date__gte=end).update(
+            cumulative=F("cumulative") + delta * (end.toordinal() - start.toordinal())
+        )
+
+
+def occupancy_between(start, end):
+    """
+    Average occupancy and household mix per room over [start, end],
+    clipped to today. Returns (start, end, rows) with one row per room,
+    ordered by age.
+    """
+
+    end = min(end, now().date())
+    extend(end)
+
+    days = (end - start).days + 1
+    rooms = list(Room.objects.order_by("min_age_months"))
+
+    if days < 1:
+        return start, end, []
+
+    before = start - timedelta(days=1)
+    person_days = {}
+
+    for room_id, household_type, day, cumulative in (
+        DailyOccupancy.objects
+        .filter(date__in=[before, end])
+        .values_list("room_id", "household_type", "date", "cumulative")
+    ):
+        sign = 1 if day == end else -1
+        key = (room_id, household_type)
+        person_days[key] = person_days.get(key, 0) + sign * cumulative
+
+    rows = []
+
+    for room in rooms:
+        by_type = {
+            household_type: person_days.get((room.id, household_type), 0)
+            for household_type, _ in HOUSEHOLD_TYPES
+        }
+        total = sum(by_type.values())
+        average = total / days
+
+        rows.append({
+            "room": room,
+            "person_days": total,
+            "average": round(average, 2),
+            "occupancy_pct": (
+                round(average / room.capacity * 100, 1) if room.capacity else 0
+            ),
+            "household_pct": {
+                household_type: round(n / total * 100, 1)
+                for household_type, n in by_type.items()
+                if n
+            },
+        })
+
+    return start, end, rows
@@ -0,0 +1,135 @@
+"""
+In-process room registry.
+
+Rooms change a few times a year but are read by nearly every request.
+All rooms are loaded once per process, ordered by age range, and
+served from memory: lookups by id, and candidate rooms for an age via
+a bisect over the minimum ages. No query once loaded.
+
+Room writes call invalidate() (see signals.py), which drops this
+process's copy and bumps a version counter in the shared cache once
+the write commits; other processes compare that counter before using
+theirs, as tuition.py does. Each load is swapped in as one immutable
+snapshot, so a lookup never pairs rooms from one load with the index
+of another. Lookups hand out copies, so relations cached on a
+returned room never leak into the registry or between requests.
+"""
+
+import copy
+import time
+from bisect import bisect_right
+from collections import namedtuple
+
+from django.core.cache import cache
+from django.db import transaction
+from django.http import Http404
+
+from apps.classrooms.models import Room
+
+from . import metrics
+
+
+VERSION_KEY = "planning:rooms:version"
+
+Snapshot = namedtuple("Snapshot", ["version", "rooms", "min_ages", "by_id"])
+
+_state = {"snapshot": None}
+
+
+def invalidate():
+    """
+    Drops the loaded rooms here and in every other process, on commit:
+    a bump before it would let a reader reload the old rooms under the
+    new version.
+    """
+
+    def drop():
+        _state["snapshot"] = None
+        cache.set(VERSION_KEY, time.time_ns(), None)
+
+    transaction.on_commit(drop)
+
+
+def _snapshot():
+    """
+    The loaded rooms, ordered by age, their minimum ages and the rooms
+    by id, all from the same load.
+    """
+
+    version = cache.get(VERSION_KEY)
+
+    if version is None:
+        version = time.time_ns()
+        cache.set(VERSION_KEY, version, None)
+
+    snapshot = _state["snapshot"]
+    stale = snapshot is None or snapshot.version != version
+    metrics.cache_lookup("room_registry", hits=not stale, misses=stale)
+
+    if stale:
+        rooms = tuple(Room.objects.order_by("min_age_months", "id"))
+
+        snapshot = Snapshot(
+            version=version,
+            rooms=rooms,
+            min_ages=tuple(room.min_age_months for room in rooms),
+            by_id={room.id: room for room in rooms},
+        )
+        _state["snapshot"] = snapshot
+
+    return snapshot
+
+
+def all_rooms():
+    """
+    Every room, ordered by age.
+    """
+
+    return [copy.copy(room) for room in _snapshot().rooms]
+
+
+def get(room_id):
+    """
+    The room with id `room_id` (int or string), or None.
+    """
+
+    by_id = _snapshot().by_id
+
+    try:
+        room = by_id.get(int(room_id))
+    except (TypeError, ValueError):
+        return None
+
+    return copy.copy(room) if room is not None else None
+
+
+def get_or_404(room_id):
+
+    room = get(room_id)
+
+    if room is None:
+        raise Http404("No Room matches the given query.")
+
+    return room
+
+
+def rooms_for_age(age_months, below=0, above=0, exclude=None):
+    """
+    Rooms, ordered by age, whose range [min, max] overlaps
+    [age - below, age + above]. With below = above = 0, the rooms a
+    child of that age is within the limits of.
+    """
+
+    snapshot = _snapshot()
+    end = bisect_right(snapshot.min_ages, age_months + above)
+
+    return [
+        copy.copy(room)
+        for room in snapshot.rooms[:end]
+        if room.max_age_months >= age_months - below and room.id != exclude
+    ]
+
+
+def total_capacity():
+
+    return sum(room.capacity for room in _snapshot().rooms)
@@ -0,0 +1,599 @@
+"""
+Roster import from the center's ODS/XLSX spreadsheets.
+
+The roster lists one block per room: a header row whose second cell is
+"ROOM NAME (min - max age)" followed by numbered seat rows, one per
+child, with the household type in parentheses after the child's name
+("Arthur Ryan (M)"). Rows are streamed from the workbook and upserted
+into Room, Household, Child and Placement in batches.
+"""
+
+import re
+from collections import Counter, namedtuple
+from datetime import date, datetime, timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import Min
+
+from apps.people.models import Household, Child, month_ordinal
+from apps.classrooms.models import Room
+
+from .dashboard_cache import invalidate_all
+from .models import Placement
+from .occupancy import reconcile as reconcile_occupancy
+from . import age_outs, rollup, room_registry
+from .spreadsheets import iter_rows
+from .tuition import rates_as_of
+
+
+DEFAULT_BATCH_SIZE = 500
+
+ROOM_HEADER_RE = re.compile(r"^\s*(?P<name>[^(]+?)\s*\((?P<ages>.*)$", re.S)
+AGE_RANGE_RE = re.compile(
+    r"(?P<low>\d+(?:\.\d+)?)\s*(?P<low_unit>wk|mo|yr)?\w*\s*-\s*"
+    r"(?P<high>\d+(?:\.\d+)?)\s*(?P<high_unit>wk|mo|yr)",
+    re.I,
+)
+CHILD_NAME_RE = re.compile(r"^(?P<name>.*?)\s*\(\s*(?P<type>CV|P|S|M)\s*\)?\s*$")
+NICKNAME_RE = re.compile(r"\([^)]*\)")
+
+# Header labels (lowercased) -> roster field
+COLUMNS = {
+    "security deposit": "security_deposit",
+    "accc enroll date": "enroll_date",
+    "birthdate": "birth_date",
+    "date enrolled in current room": "room_start",
+    "tuition rate": "tuition_rate",
+}
+
+EXCEL_EPOCH = date(1899, 12, 30)
+
+
+RosterRow = namedtuple(
+    "RosterRow",
+    [
+        "sheet",
+        "room",
+        "first_name",
+        "last_name",
+        "household_type",
+        "birth_date",
+        "start_date",
+        "security_deposit",
+    ],
+)
+
+
+class RosterReport:
+    """
+    Dry-run friendly summary of what an import changed.
+    """
+
+    def __init__(self):
+        self.counts = Counter()
+        self.changes = []
+        self.skipped = []
+        self.conflicts = []
+
+    def record(self, kind, action, description):
+        self.counts[(kind, action)] += 1
+        self.changes.append(f"{'+' if action == 'created' else '~'} {kind} {description}")
+
+    @property
+    def changed(self):
+        return bool(self.changes)
+
+    def unchanged(self, kind):
+        self.counts[(kind, "unchanged")] += 1
+
+    def skip(self, sheet, description):
+        self.skipped.append(f"{sheet}: {description}")
+
+    def conflict(self, sheet, description):
+        self.conflicts.append(f"{sheet}: {description}")
+
+    def summary(self):
+        kinds = ["room", "household", "child", "placement"]
+        return [
+            f"{kind}: "
+            f"{self.counts[(kind, 'created')]} created, "
+            f"{self.counts[(kind, 'updated')]} updated, "
+            f"{self.counts[(kind, 'unchanged')]} unchanged"
+            for kind in kinds
+        ]
+
+
+# -------------------------------------------------------
+# Cell parsing
+# -------------------------------------------------------
+
+def parse_date(value):
+
+    if isinstance(value, float):
+        return EXCEL_EPOCH + timedelta(days=int(value))
+
+    value = (value or "").strip()
+
+    for fmt in ("%m/%d/%Y", "%m/%d/%y", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+
+    return None
+
+
+def parse_money(value):
+
+    if isinstance(value, float):
+        return Decimal(str(round(value, 2)))
+
+    value = (value or "").replace("$", "").replace(",", "").strip()
+
+    try:
+        return Decimal(value) if value else None
+    except InvalidOperation:
+        return None
+
+
+def _to_months(value, unit):
+    value = float(value)
+    unit = unit.lower()
+
+    if unit == "yr":
+        return round(value * 12)
+    if unit == "wk":
+        return int(value * 7 // 30)
+    return round(value)
+
+
+def parse_room_header(label):
+    """
+    "MARINER (12mo - 18mo, ...)" -> ("Mariner", 12, 18)
+    """
+
+    match = ROOM_HEADER_RE.match(label or "")
+    if not match:
+        return None
+
+    ages = AGE_RANGE_RE.search(match.group("ages"))
+    if not ages:
+        return None
+
+    high_unit = ages.group("high_unit")
+    low_unit = ages.group("low_unit") or high_unit
+
+    return (
+        match.group("name").strip().title(),
+        _to_months(ages.group("low"), low_unit),
+        _to_months(ages.group("high"), high_unit),
+    )
+
+
+def parse_child_name(label):
+    """
+    "Robert (Rye) Dorin (CV)" -> ("Robert", "Dorin", "CV")
+    """
+
+    match = CHILD_NAME_RE.match((label or "").strip())
+    if not match:
+        return None
+
+    parts = NICKNAME_RE.sub("", match.group("name")).split()
+    if len(parts) < 2:
+        return None
+
+    return parts[0], " ".join(parts[1:]), match.group("type")
+
+
+def _department_for_rate(rate, household_type, as_of):
+
+    for (department, htype), amount in rates_as_of(as_of).items():
+        if htype == household_type and amount == rate:
+            return department
+
+    return None
+
+
+# -------------------------------------------------------
+# Import
+# -------------------------------------------------------
+
+class RosterImporter:
+    """
+    Streams a roster workbook and upserts it in batches.
+
+    Children are matched on (first name, last name, birth date). The
+    roster has no household key and a shared family name does not make
+    a family, so every new child gets a household of their own; staff
+    merge siblings' households in the admin.
+    """
+
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE, today=None):
+        self.batch_size = batch_size
+        self.today = today or date.today()
+        self.report = RosterReport()
+
+        self.rooms = {r.name.lower(): r for r in Room.objects.all()}
+        self.new_rooms = set()
+        self.seats = Counter()
+        self.pending = []
+
+        # What the bulk writes touched, for the derived tables.
+        self.created_room_ids = set()
+        self.stay_ids = set()
+
+    def run(self, fileobj, dry_run=False):
+
+        with transaction.atomic():
+
+            for row in self.parse(fileobj):
+                self.pending.append(row)
+                if len(self.pending) >= self.batch_size:
+                    self.flush()
+
+            self.flush()
+            self.update_capacities()
+
+            # Bulk writes bypass the occupancy counter, rollup and age-out
+            # signals.
+            if self.report.changed:
+                reconcile_occupancy()
+                self.refresh_rollup()
+                # Room age limits are saved one by one, so their
+                # signal refreshes those rooms' rows.
+                age_outs.refresh(Placement.objects.filter(pk__in=self.stay_ids))
+
+            if dry_run:
+                transaction.set_rollback(True)
+
+        if not dry_run and self.report.changed:
+            # Bulk writes bypass the dashboard cache and room registry
+            # signals.
+            invalidate_all()
+            room_registry.invalidate()
+
+        return self.report
+
+    # ---------------------------------------------------
+    # Parsing
+    # ---------------------------------------------------
+
+    def parse(self, fileobj):
+        """
+        Yields a RosterRow for every child row in the workbook.
+        """
+
+        room = None
+        columns = {}
+
+        for sheet, values in iter_rows(fileobj):
+
+            cells = [v.strip() if isinstance(v, str) else v for v in values]
+            labels = [c.lower() if isinstance(c, str) else "" for c in cells]
+
+            if "birthdate" in labels:
+                columns = {
+                    COLUMNS[label]: i
+                    for i, label in enumerate(labels)
+                    if label in COLUMNS
+                }
+                room = self.room_for_header(sheet, cells[1] if len(cells) > 1 else "")
+                continue
+
+            if room is None or not cells or not isinstance(cells[0], float):
+                continue
+
+            # Numbered seat: counts toward capacity even when empty.
+            self.seats[room.name.lower()] = max(
+                self.seats[room.name.lower()], int(cells[0])
+            )
+
+            def cell(field):
+                i = columns.get(field)
+                return cells[i] if i is not None and i < len(cells) else ""
+
+            name = parse_child_name(cells[1] if len(cells) > 1 else "")
+            if name is None:
+                if len(cells) > 1 and cells[1]:
+                    self.report.skip(sheet, f"unrecognized child name {cells[1]!r}")
+                continue
+
+            first_name, last_name, household_type = name
+            birth_date = parse_date(cell("birth_date"))
+
+            if birth_date is None:
+                self.report.skip(sheet, f"{first_name} {last_name}: no birth date")
+                continue
+
+            if room.name.lower() in self.new_rooms:
+                department = _department_for_rate(
+                    parse_money(cell("tuition_rate")), household_type, self.today
+                )
+                if department:
+                    room.department = department
+                    room.save(update_fields=["department"])
+                    self.new_rooms.discard(room.name.lower())
+
+            yield RosterRow(
+                sheet=sheet,
+                room=room,
+                first_name=first_name,
+                last_name=last_name,
+                household_type=household_type,
+                birth_date=birth_date,
+                start_date=(
+                    parse_date(cell("room_start"))
+                    or parse_date(cell("enroll_date"))
+                    or self.today
+                ),
+                security_deposit=parse_money(cell("security_deposit")),
+            )
+
+    def room_for_header(self, sheet, label):
+
+        parsed = parse_room_header(label)
+        if parsed is None:
+            self.report.skip(sheet, f"unrecognized room header {label!r}")
+            return None
+
+        name, min_age, max_age = parsed
+        room = self.rooms.get(name.lower())
+
+        if room is None:
+            room = Room.objects.create(
+                name=name,
+                capacity=0,
+                min_age_months=min_age,
+                max_age_months=max_age,
+            )
+            self.rooms[name.lower()] = room
+            self.new_rooms.add(name.lower())
+            self.created_room_ids.add(room.id)
+            self.report.record("room", "created", f"{name} ({min_age}-{max_age} mo)")
+
+        elif (room.min_age_months, room.max_age_months) != (min_age, max_age):
+            self.report.record(
+                "room",
+                "updated",
+                f"{room.name}: ages {room.min_age_months}-{room.max_age_months}"
+                f" → {min_age}-{max_age} mo",
+            )
+            room.min_age_months = min_age
+            room.max_age_months = max_age
+            room.save(update_fields=["min_age_months", "max_age_months"])
+
+        else:
+            self.report.unchanged("room")
+
+        return room
+
+    def update_capacities(self):
+
+        changed = []
+
+        for key, seats in self.seats.items():
+            room = self.rooms[key]
+            if room.capacity < seats:
+                if key not in self.new_rooms and room.capacity:
+                    self.report.record(
+                        "room", "updated",
+                        f"{room.name}: capacity {room.capacity} → {seats}",
+                    )
+                room.capacity = seats
+                changed.append(room)
+
+        Room.objects.bulk_update(changed, ["capacity"])
+
+    # ---------------------------------------------------
+    # Batched upsert
+    # ---------------------------------------------------
+
+    def flush(self):
+
+        rows = self.pending
+        self.pending = []
+
+        if not rows:
+            return
+
+        children = self.upsert_children(rows)
+        self.upsert_placements(rows, children)
+
+    def upsert_children(self, rows):
+        """
+        Returns {(first_name, last_name, birth_date): Child}.
+        """
+
+        existing = {
+            (c.first_name, c.last_name, c.birth_date): c
+            for c in Child.objects
+            .select_related("household")
+            .filter(
+                last_name__in={r.last_name for r in rows},
+                birth_date__in={r.birth_date for r in rows},
+            )
+        }
+
+        households = self.upsert_households(rows, existing)
+
+        new_children = []
+        changed_children = []
+        seen = set()
+
+        for row in rows:
+            key = (row.first_name, row.last_name, row.birth_date)
+            child = existing.get(key)
+            deposit = row.security_deposit
+
+            if key in seen:
+                continue
+            seen.add(key)
+
+            if child is None:
+                child = Child(
+                    household=households[key],
+                    first_name=row.first_name,
+                    last_name=row.last_name,
+                    birth_date=row.birth_date,
+                    birth_month=month_ordinal(row.birth_date),
+                )
+                if deposit is not None:
+                    child.security_deposit = deposit
+
+                existing[key] = child
+                new_children.append(child)
+                self.report.record("child", "created", f"{child} ({row.birth_date})")
+                continue
+
+            if not child.enrolled or (
+                deposit is not None and child.security_deposit != deposit
+            ):
+                self.report.record("child", "updated", str(child))
+                child.enrolled = True
+                if deposit is not None:
+                    child.security_deposit = deposit
+                changed_children.append(child)
+            else:
+                self.report.unchanged("child")
+
+        Child.objects.bulk_create(new_children)
+        Child.objects.bulk_update(
+            changed_children, ["enrolled", "security_deposit"]
+        )
+
+        return existing
+
+    def upsert_households(self, rows, children):
+        """
+        Returns {child key: Household} for children not yet imported.
+
+        A roster household type that disagrees with an existing child's
+        household is reported as a conflict, not applied: it would
+        change tuition and priority for everyone in the household.
+        """
+
+        new_children = {}
+        seen = set()
+
+        for row in rows:
+            key = (row.first_name, row.last_name, row.birth_date)
+            child = children.get(key)
+
+            if key in seen:
+                continue
+            seen.add(key)
+
+            if child is None:
+                new_children[key] = row
+            elif child.household.household_type != row.household_type:
+                self.report.conflict(
+                    row.sheet,
+                    f"{child}: household {child.household} is type "
+                    f"{child.household.household_type}, the roster says "
+                    f"{row.household_type}",
+                )
+            else:
+                self.report.unchanged("household")
+
+        names = {
+            key: f"{row.last_name} ({row.first_name}, {row.birth_date:%m/%d/%Y})"
+            for key, row in new_children.items()
+        }
+
+        # Named after the child, so a household left behind by an
+        # earlier import of the same child is taken back.
+        households = {
+            h.name: h
+            for h in Household.objects.filter(name__in=names.values())
+        }
+
+        new_households = []
+
+        for key, row in new_children.items():
+            name = names[key]
+
+            if name in households:
+                self.report.unchanged("household")
+                continue
+
+            households[name] = Household(
+                name=name, household_type=row.household_type
+            )
+            new_households.append(households[name])
+            self.report.record(
+                "household", "created", f"{name} ({row.household_type})"
+            )
+
+        Household.objects.bulk_create(new_households)
+
+        return {key: households[name] for key, name in names.items()}
+
+    def upsert_placements(self, rows, children):
+
+        placed = [
+            (row, children[(row.first_name, row.last_name, row.birth_date)])
+            for row in rows
+        ]
+
+        current = {
+            p.child_id: p
+            for p in Placement.objects.filter(
+                child_id__in=[child.id for _, child in placed],
+                end_date__isnull=True,
+            )
+        }
+
+        new_placements = []
+        ended = []
+
+        for row, child in placed:
+            placement = current.get(child.id)
+
+            if placement and placement.room_id == row.room.id:
+                self.report.unchanged("placement")
+                continue
+
+            if placement:
+                placement.end_date = max(row.start_date, placement.start_date)
+                ended.append(placement)
+
+            new_placement = Placement(
+                child=child,
+                room=row.room,
+                start_date=row.start_date,
+            )
+            current[child.id] = new_placement
+            new_placements.append(new_placement)
+
+            self.report.record(
+                "placement",
+                "updated" if placement else "created",
+                f"{child} → {row.room.name} from {row.start_date}",
+            )
+
+        Placement.objects.bulk_update(ended, ["end_date"])
+        Placement.objects.bulk_create(new_placements)
+
+        self.stay_ids.update(p.id for p in ended + new_placements)
+
+    # ---------------------------------------------------
+    # Derived tables
+    # ---------------------------------------------------
+
+    def stays(self):
+        """
+        Placements this import wrote.
+        """
+
+        return Placement.objects.filter(pk__in=self.stay_ids)
+
+    def refresh_rollup(self):
+
+        stays = self.stays()
+
+        rollup.refresh_rooms(
+            set(stays.values_list("room_id", flat=True)) | self.created_room_ids,
+            stays.aggregate(since=Min("start_date"))["since"],
+        )
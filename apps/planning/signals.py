@@ -0,0 +1,324 @@
+"""
+Cache invalidation for the planning dashboard, and denormalized
+counters.
+
+Handlers bump the version counters of the rooms whose cards a write
+can change (see dashboard_cache.py). Placements and plans can move
+between rooms, so their previous state is looked up before saving;
+the same lookup gives the room occupancy counters and the daily
+occupancy rollup their delta (see occupancy.py and rollup.py), and
+tells when the age-out calendar needs a refresh (see age_outs.py).
+Tuition rate and room writes reload the in-process rate lookup and
+room registry (see tuition.py and room_registry.py), and
+writes that can change a waitlist entry's priority (its preferred
+rooms included) recompute it and its waitlist position (see
+priority.py and ranking.py).
+"""
+
+from collections import Counter
+
+from django.db.models.signals import m2m_changed, pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from apps.people.models import Child, Household
+from apps.classrooms.models import Room
+
+from .dashboard_cache import invalidate_rooms, invalidate_all
+from .models import Placement, MoveUpPlan, RoomOccupancy, TuitionRate, WaitlistEntry
+from .occupancy import apply_change, placement_counts, plan_counts
+from .priority import recompute_priorities, refresh_priority
+from . import age_outs, ranking, rollup, room_registry, tuition
+
+
+def _previous_value(instance, field):
+    if instance.pk is None:
+        return None
+
+    return (
+        type(instance).objects
+        .filter(pk=instance.pk)
+        .values_list(field, flat=True)
+        .first()
+    )
+
+
+def _previous_row(instance, fields):
+    if instance.pk is None:
+        return None
+
+    return (
+        type(instance).objects
+        .filter(pk=instance.pk)
+        .values_list(*fields)
+        .first()
+    )
+
+
+PLACEMENT_FIELDS = ("room_id", "end_date", "start_date")
+PLAN_FIELDS = ("current_room_id", "target_room_id", "status", "exit_type")
+
+
+def _current_row(instance, fields):
+    return tuple(getattr(instance, field) for field in fields)
+
+
+@receiver(pre_save, sender=Placement)
+def remember_placement(sender, instance, **kwargs):
+    row = _previous_row(instance, PLACEMENT_FIELDS)
+
+    instance._previous_room_id = row[0] if row else None
+    instance._previous_counts = placement_counts(*row[:2]) if row else Counter()
+    instance._previous_row = row
+
+
+@receiver(pre_save, sender=MoveUpPlan)
+def remember_plan(sender, instance, **kwargs):
+    row = _previous_row(instance, PLAN_FIELDS)
+
+    instance._previous_room_id = row[0] if row else None
+    instance._previous_counts = plan_counts(*row) if row else Counter()
+
+
+@receiver(post_save, sender=Placement)
+@receiver(post_delete, sender=Placement)
+def placement_changed(sender, instance, **kwargs):
+    invalidate_rooms([
+        instance.room_id,
+        getattr(instance, "_previous_room_id", None),
+    ])
+
+
+@receiver(post_save, sender=MoveUpPlan)
+@receiver(post_delete, sender=MoveUpPlan)
+def plan_changed(sender, instance, **kwargs):
+    invalidate_rooms([
+        instance.current_room_id,
+        getattr(instance, "_previous_room_id", None),
+    ])
+
+
+@receiver(post_save, sender=Placement)
+def placement_saved_occupancy(sender, instance, **kwargs):
+    apply_change(
+        instance._previous_counts,
+        placement_counts(*_current_row(instance, PLACEMENT_FIELDS)[:2]),
+    )
+
+
+@receiver(post_delete, sender=Placement)
+def placement_deleted_occupancy(sender, instance, **kwargs):
+    apply_change(
+        placement_counts(*_current_row(instance, PLACEMENT_FIELDS)[:2]),
+        Counter(),
+    )
+
+
+def _household_type(child_id):
+    return (
+        Child.objects
+        .filter(pk=child_id)
+        .values_list("household__household_type", flat=True)
+        .first()
+    )
+
+
+@receiver(post_save, sender=Placement)
+def placement_saved_rollup(sender, instance, **kwargs):
+    row = _current_row(instance, PLACEMENT_FIELDS)
+
+    if row == instance._previous_row or not rollup.built():
+        return
+
+    household_type = _household_type(instance.child_id)
+
+    if instance._previous_row:
+        room_id, end_date, start_date = instance._previous_row
+        rollup.apply_stay(room_id, household_type, start_date, end_date, -1)
+
+    room_id, end_date, start_date = row
+    rollup.apply_stay(room_id, household_type, start_date, end_date, 1)
+
+
+@receiver(post_delete, sender=Placement)
+def placement_deleted_rollup(sender, instance, **kwargs):
+    if not rollup.built():
+        return
+
+    rollup.apply_stay(
+        instance.room_id,
+        _household_type(instance.child_id),
+        instance.start_date,
+        instance.end_date,
+        -1,
+    )
+
+
+@receiver(post_save, sender=Placement)
+def placement_saved_age_out(sender, instance, created, **kwargs):
+    if created or _current_row(instance, PLACEMENT_FIELDS) != instance._previous_row:
+        age_outs.refresh(Placement.objects.filter(pk=instance.pk))
+
+
+@receiver(pre_save, sender=Room)
+def remember_room_age_limit(sender, instance, **kwargs):
+    instance._previous_max_age = _previous_value(instance, "max_age_months")
+
+
+@receiver(post_save, sender=Room)
+def room_age_limit_changed(sender, instance, created, **kwargs):
+    if not created and instance._previous_max_age != instance.max_age_months:
+        age_outs.refresh(Placement.objects.filter(room=instance))
+
+
+@receiver(post_save, sender=MoveUpPlan)
+def plan_saved_occupancy(sender, instance, **kwargs):
+    apply_change(
+        instance._previous_counts,
+        plan_counts(*_current_row(instance, PLAN_FIELDS)),
+    )
+
+
+@receiver(post_delete, sender=MoveUpPlan)
+def plan_deleted_occupancy(sender, instance, **kwargs):
+    apply_change(
+        plan_counts(*_current_row(instance, PLAN_FIELDS)),
+        Counter(),
+    )
+
+
+@receiver(post_save, sender=Room)
+@receiver(post_delete, sender=Room)
+def room_changed_registry(sender, instance, **kwargs):
+    room_registry.invalidate()
+
+
+@receiver(post_save, sender=Room)
+def room_created_occupancy(sender, instance, created, **kwargs):
+    if created:
+        RoomOccupancy.objects.get_or_create(room=instance)
+
+
+@receiver(post_save, sender=Child)
+@receiver(post_delete, sender=Child)
+def child_changed(sender, instance, **kwargs):
+    invalidate_rooms(
+        Placement.objects
+        .filter(child_id=instance.pk, end_date__isnull=True)
+        .values_list("room_id", flat=True)
+    )
+
+
+@receiver(post_save, sender=Household)
+@receiver(post_delete, sender=Household)
+@receiver(post_save, sender=Room)
+@receiver(post_delete, sender=Room)
+def center_changed(sender, instance, **kwargs):
+    invalidate_all()
+
+
+@receiver(post_save, sender=TuitionRate)
+@receiver(post_delete, sender=TuitionRate)
+def tuition_rate_changed(sender, instance, **kwargs):
+    tuition.invalidate()
+
+
+@receiver(pre_save, sender=Child)
+def remember_child_household(sender, instance, **kwargs):
+    row = _previous_row(instance, ("household_id", "birth_date"))
+
+    instance._previous_household_id = row[0] if row else None
+    instance._previous_birth_date = row[1] if row else None
+
+
+@receiver(pre_save, sender=Household)
+def remember_household_type(sender, instance, **kwargs):
+    instance._previous_household_type = _previous_value(instance, "household_type")
+
+
+@receiver(post_save, sender=WaitlistEntry)
+def waitlist_entry_saved(sender, instance, **kwargs):
+    refresh_priority(instance)
+
+
+@receiver(m2m_changed, sender=WaitlistEntry.preferred_rooms.through)
+def waitlist_preferred_rooms_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    # Preferred rooms are written after the entry is saved (by the
+    # admin, or preferred_rooms.set()), so the post_save score misses
+    # them. From the room side, `instance` is a room and the entries
+    # are in pk_set, or were looked up before a clear.
+    if reverse and action == "pre_clear":
+        instance._cleared_entry_ids = set(
+            WaitlistEntry.objects
+            .filter(preferred_rooms=instance)
+            .values_list("pk", flat=True)
+        )
+
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+
+    if not reverse:
+        refresh_priority(instance)
+    elif action == "post_clear":
+        recompute_priorities(
+            WaitlistEntry.objects.filter(pk__in=instance._cleared_entry_ids)
+        )
+    else:
+        recompute_priorities(WaitlistEntry.objects.filter(pk__in=pk_set))
+
+
+@receiver(post_delete, sender=WaitlistEntry)
+def waitlist_entry_deleted(sender, instance, **kwargs):
+    ranking.entry_removed(instance.pk)
+
+
+@receiver(post_save, sender=Child)
+def child_household_changed(sender, instance, created, **kwargs):
+    if not created and instance._previous_household_id != instance.household_id:
+        recompute_priorities(WaitlistEntry.objects.filter(child=instance))
+
+        previous_type = (
+            Household.objects
+            .filter(pk=instance._previous_household_id)
+            .values_list("household_type", flat=True)
+            .first()
+        )
+        _move_stays(
+            Placement.objects.filter(child=instance),
+            previous_type,
+            instance.household.household_type,
+        )
+
+
+@receiver(post_save, sender=Child)
+def child_birth_date_changed(sender, instance, created, **kwargs):
+    if not created and instance._previous_birth_date != instance.birth_date:
+        age_outs.refresh(Placement.objects.filter(child=instance))
+
+
+@receiver(post_save, sender=Household)
+def household_type_changed(sender, instance, created, **kwargs):
+    if not created and instance._previous_household_type != instance.household_type:
+        recompute_priorities(
+            WaitlistEntry.objects.filter(child__household=instance)
+        )
+        _move_stays(
+            Placement.objects.filter(child__household=instance),
+            instance._previous_household_type,
+            instance.household_type,
+        )
+
+
+def _move_stays(placements, old_type, new_type):
+    """
+    Moves the placements' stays between household types in the
+    occupancy rollup.
+    """
+
+    if old_type == new_type:
+        return
+
+    for room_id, start_date, end_date in placements.values_list(
+        "room_id", "start_date", "end_date"
+    ):
+        rollup.apply_stay(room_id, old_type, start_date, end_date, -1)
+        rollup.apply_stay(room_id, new_type, start_date, end_date, 1)
@@ -0,0 +1,240 @@
+"""
+Slow-query log.
+
+Opt-in: set PLANNING_SLOW_QUERY_MS to a threshold in milliseconds.
+Every query slower than that is appended as one JSON line to
+PLANNING_SLOW_QUERY_LOG (default: comet-slow-queries.jsonl in the
+system temp directory) with:
+
+- origin: the view's URL name, "command:<name>" under manage.py, or
+  the request path for queries run before the view is resolved
+- fingerprint: a hash of the SQL with literals and IN lists collapsed,
+  so the same query with other parameters groups together
+- stack: the project frames that issued the query
+- plan: the database's EXPLAIN output for SELECTs (EXPLAIN QUERY PLAN
+  on SQLite), captured on the spot with the same parameters
+
+The wrapper is added to every database connection as it opens (see
+PlanningConfig.ready()); below the threshold, or with it unset, it
+only times the query. The slow_query_report command ranks the logged
+fingerprints by total time.
+"""
+
+import contextvars
+import hashlib
+import json
+import re
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from contextlib import nullcontext
+from pathlib import Path
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.utils.timezone import now
+
+
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+PLACEHOLDER_RE = re.compile(r"%s|\?")
+IN_LIST_RE = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.I)
+SPACE_RE = re.compile(r"\s+")
+SELECT_RE = re.compile(r"\s*(SELECT|WITH)\b", re.I)
+
+# Stack frames kept per entry, innermost last.
+MAX_STACK_FRAMES = 12
+
+
+def _default_origin():
+    if len(sys.argv) > 1 and Path(sys.argv[0]).name == "manage.py":
+        return f"command:{sys.argv[1]}"
+    return "process"
+
+
+_origin = contextvars.ContextVar("planning_query_origin", default=_default_origin())
+
+_local = threading.local()
+_write_lock = threading.Lock()
+
+
+def set_origin(origin):
+    """
+    Labels the current request's queries; returns a token for
+    reset_origin().
+    """
+
+    return _origin.set(origin)
+
+
+def reset_origin(token):
+    _origin.reset(token)
+
+
+def threshold_ms():
+    return getattr(settings, "PLANNING_SLOW_QUERY_MS", None)
+
+
+def log_path():
+    return Path(
+        getattr(settings, "PLANNING_SLOW_QUERY_LOG", None)
+        or Path(tempfile.gettempdir()) / "comet-slow-queries.jsonl"
+    )
+
+
+def normalize(sql):
+    """
+    SQL with literals as ?, IN lists as IN (...), and single spaces.
+    """
+
+    sql = STRING_RE.sub("?", sql)
+    sql = NUMBER_RE.sub("?", sql)
+    sql = PLACEHOLDER_RE.sub("?", sql)
+    sql = IN_LIST_RE.sub("IN (...)", sql)
+
+    return SPACE_RE.sub(" ", sql).strip()
+
+
+def fingerprint(sql):
+
+    return hashlib.sha1(normalize(sql).encode()).hexdigest()[:12]
+
+
+def _stack():
+    """
+    Project frames of the current stack, outside this module.
+    """
+
+    base = str(settings.BASE_DIR)
+
+    frames = [
+        f"{frame.filename[len(base) + 1:]}:{frame.lineno} in {frame.name}"
+        for frame in traceback.extract_stack()
+        if frame.filename.startswith(base)
+        and "site-packages" not in frame.filename
+        and frame.filename != __file__
+    ]
+
+    return frames[-MAX_STACK_FRAMES:]
+
+
+def _explain(connection, sql, params):
+
+    if not SELECT_RE.match(sql):
+        return None
+
+    # A failed statement aborts the surrounding transaction on
+    # PostgreSQL, so inside one the EXPLAIN runs in a savepoint.
+    if connection.in_atomic_block:
+        block = transaction.atomic(using=connection.alias)
+    else:
+        block = nullcontext()
+
+    try:
+        with block, connection.cursor() as cursor:
+            cursor.execute(f"{connection.ops.explain_query_prefix()} {sql}", params)
+            return [" ".join(str(col) for col in row) for row in cursor.fetchall()]
+    except DatabaseError as exc:
+        return [f"EXPLAIN failed: {exc}"]
+
+
+def _write(entry):
+
+    path = log_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    with _write_lock, open(path, "a") as log:
+        log.write(json.dumps(entry) + "\n")
+
+
+def log_slow_queries(execute, sql, params, many, context):
+    """
+    Execute wrapper logging queries above the threshold.
+    """
+
+    if getattr(_local, "active", False):
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    result = execute(sql, params, many, context)
+    elapsed = (time.perf_counter() - started) * 1000
+    threshold = threshold_ms()
+
+    if threshold is not None and elapsed >= threshold:
+        # The EXPLAIN runs through the same wrappers.
+        _local.active = True
+        try:
+            _write({
+                "at": now().isoformat(),
+                "origin": _origin.get(),
+                "ms": round(elapsed, 3),
+                "fingerprint": fingerprint(sql),
+                "sql": normalize(sql),
+                "many": many,
+                "stack": _stack(),
+                "plan": None if many else _explain(context["connection"], sql, params),
+            })
+        finally:
+            _local.active = False
+
+    return result
+
+
+def install(sender=None, connection=None, **kwargs):
+    """
+    connection_created receiver: adds the wrapper once per connection.
+    It goes first in the list, because execute_wrapper() blocks that
+    are open when a connection is created pop the last one on exit.
+    """
+
+    if connection is not None and log_slow_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, log_slow_queries)
+
+
+# -------------------------------------------------------
+# Report
+# -------------------------------------------------------
+
+def summarize(entries):
+    """
+    Logged entries grouped by fingerprint, by total time, slowest
+    first. Each group keeps its latest SQL, stack and plan.
+    """
+
+    groups = {}
+
+    for entry in entries:
+        group = groups.setdefault(entry["fingerprint"], {
+            "fingerprint": entry["fingerprint"],
+            "count": 0,
+            "total_ms": 0.0,
+            "max_ms": 0.0,
+            "origins": set(),
+        })
+
+        group["count"] += 1
+        group["total_ms"] += entry["ms"]
+        group["max_ms"] = max(group["max_ms"], entry["ms"])
+        group["origins"].add(entry["origin"])
+        group.update(sql=entry["sql"], stack=entry["stack"], plan=entry["plan"])
+
+    for group in groups.values():
+        group["avg_ms"] = group["total_ms"] / group["count"]
+        group["origins"] = sorted(group["origins"])
+
+    return sorted(groups.values(), key=lambda group: group["total_ms"], reverse=True)
+
+
+def read_log(path=None):
+    """
+    Yields the entries of the log, skipping lines that do not parse.
+    """
+
+    with open(path or log_path()) as log:
+        for line in log:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
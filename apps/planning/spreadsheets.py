@@ -0,0 +1,276 @@
+"""
+Streaming readers for ODS and XLSX workbooks.
+
+Both formats are zip archives of XML. Rows are parsed with iterparse
+and detached from the tree as soon as they have been yielded, so
+memory stays bounded no matter how large the workbook is.
+"""
+
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+
+
+ODS_TABLE = "urn:oasis:names:tc:opendocument:xmlns:table:1.0"
+ODS_OFFICE = "urn:oasis:names:tc:opendocument:xmlns:office:1.0"
+ODS_TEXT = "urn:oasis:names:tc:opendocument:xmlns:text:1.0"
+
+XLSX_MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+XLSX_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+XLSX_PKG_REL = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+
+class SpreadsheetError(Exception):
+    pass
+
+
+def iter_rows(fileobj):
+    """
+    Yields (sheet_name, values) for every row of every sheet.
+
+    `fileobj` may be a path or a seekable binary file (e.g. an uploaded
+    file). Values are strings or floats; trailing empty cells are
+    dropped and runs of empty rows are collapsed into one.
+    """
+
+    try:
+        archive = zipfile.ZipFile(fileobj)
+    except zipfile.BadZipFile:
+        raise SpreadsheetError("Not an ODS or XLSX workbook.")
+
+    with archive:
+        names = set(archive.namelist())
+
+        if "content.xml" in names:
+            yield from _iter_ods(archive)
+        elif "xl/workbook.xml" in names:
+            yield from _iter_xlsx(archive)
+        else:
+            raise SpreadsheetError("Not an ODS or XLSX workbook.")
+
+
+def _iterparse_detached(stream, row_tag, on_start=None):
+    """
+    iterparse that removes each finished `row_tag` element from its
+    parent, so parsed rows do not accumulate in memory.
+    """
+
+    stack = []
+
+    for event, elem in ET.iterparse(stream, events=("start", "end")):
+
+        if event == "start":
+            stack.append(elem)
+            if on_start:
+                on_start(elem)
+            continue
+
+        stack.pop()
+
+        if elem.tag == row_tag:
+            yield elem
+            if stack:
+                stack[-1].remove(elem)
+
+
+# -------------------------------------------------------
+# ODS
+# -------------------------------------------------------
+
+def _iter_ods(archive):
+
+    table_tag = f"{{{ODS_TABLE}}}table"
+    row_tag = f"{{{ODS_TABLE}}}table-row"
+    cell_tags = (
+        f"{{{ODS_TABLE}}}table-cell",
+        f"{{{ODS_TABLE}}}covered-table-cell",
+    )
+
+    current = {"sheet": None}
+
+    def on_start(elem):
+        if elem.tag == table_tag:
+            current["sheet"] = elem.get(f"{{{ODS_TABLE}}}name")
+
+    with archive.open("content.xml") as stream:
+
+        previous_empty = False
+
+        for row in _iterparse_detached(stream, row_tag, on_start):
+
+            values = []
+            pending_empty = 0
+
+            for cell in row:
+                if cell.tag not in cell_tags:
+                    continue
+
+                value = _ods_cell_value(cell)
+                repeat = int(cell.get(f"{{{ODS_TABLE}}}number-columns-repeated", 1))
+
+                # Sheets pad rows with thousands of repeated empty
+                # cells; only materialize them when followed by data.
+                if value == "":
+                    pending_empty += repeat
+                    continue
+
+                values.extend([""] * pending_empty)
+                pending_empty = 0
+                values.extend([value] * repeat)
+
+            if not values:
+                if not previous_empty:
+                    yield current["sheet"], []
+                previous_empty = True
+                continue
+
+            previous_empty = False
+            repeat = int(row.get(f"{{{ODS_TABLE}}}number-rows-repeated", 1))
+
+            for _ in range(repeat):
+                yield current["sheet"], values
+
+
+def _ods_cell_value(cell):
+
+    value_type = cell.get(f"{{{ODS_OFFICE}}}value-type")
+
+    if value_type in ("float", "percentage", "currency"):
+        return float(cell.get(f"{{{ODS_OFFICE}}}value"))
+
+    if value_type == "date":
+        return cell.get(f"{{{ODS_OFFICE}}}date-value")[:10]
+
+    # Direct children only: annotations carry their own paragraphs.
+    return "\n".join(
+        "".join(p.itertext())
+        for p in cell.findall(f"{{{ODS_TEXT}}}p")
+    )
+
+
+# -------------------------------------------------------
+# XLSX
+# -------------------------------------------------------
+
+def _iter_xlsx(archive):
+
+    shared = _xlsx_shared_strings(archive)
+    row_tag = f"{{{XLSX_MAIN}}}row"
+
+    for sheet_name, path in _xlsx_sheets(archive):
+
+        with archive.open(path) as stream:
+
+            previous_empty = False
+
+            for row in _iterparse_detached(stream, row_tag):
+
+                values = []
+
+                for cell in row.iter(f"{{{XLSX_MAIN}}}c"):
+                    value = _xlsx_cell_value(cell, shared)
+                    if value == "":
+                        continue
+
+                    column = _xlsx_column_index(cell.get("r"), len(values))
+                    values.extend([""] * (column - len(values)))
+                    values.append(value)
+
+                if not values:
+                    if not previous_empty:
+                        yield sheet_name, []
+                    previous_empty = True
+                    continue
+
+                previous_empty = False
+                yield sheet_name, values
+
+
+def _xlsx_sheets(archive):
+
+    with archive.open("xl/_rels/workbook.xml.rels") as stream:
+        targets = {
+            rel.get("Id"): rel.get("Target")
+            for rel in ET.parse(stream).getroot()
+            .iter(f"{{{XLSX_PKG_REL}}}Relationship")
+        }
+
+    with archive.open("xl/workbook.xml") as stream:
+        workbook = ET.parse(stream).getroot()
+
+    sheets = []
+
+    for sheet in workbook.iter(f"{{{XLSX_MAIN}}}sheet"):
+        target = targets[sheet.get(f"{{{XLSX_REL}}}id")]
+        path = target.lstrip("/") if target.startswith("/") else f"xl/{target}"
+        sheets.append((sheet.get("name"), path))
+
+    return sheets
+
+
+def _xlsx_shared_strings(archive):
+
+    try:
+        stream = archive.open("xl/sharedStrings.xml")
+    except KeyError:
+        return []
+
+    strings = []
+    si_tag = f"{{{XLSX_MAIN}}}si"
+    t_tag = f"{{{XLSX_MAIN}}}t"
+
+    with stream:
+        for _, elem in ET.iterparse(stream):
+            if elem.tag == si_tag:
+                strings.append("".join(t.text or "" for t in elem.iter(t_tag)))
+                elem.clear()
+
+    return strings
+
+
+def _xlsx_cell_value(cell, shared):
+
+    cell_type = cell.get("t")
+
+    if cell_type == "inlineStr":
+        return "".join(
+            t.text or "" for t in cell.iter(f"{{{XLSX_MAIN}}}t")
+        )
+
+    raw = cell.findtext(f"{{{XLSX_MAIN}}}v")
+
+    if raw is None:
+        return ""
+
+    if cell_type == "s":
+        return shared[int(raw)]
+
+    if cell_type in ("str", "e"):
+        return raw
+
+    if cell_type == "b":
+        return float(raw)
+
+    try:
+        return float(raw)
+    except ValueError:
+        return raw
+
+
+_COLUMN_RE = re.compile(r"^([A-Z]+)")
+
+
+def _xlsx_column_index(ref, default):
+
+    if not ref:
+        return default
+
+    match = _COLUMN_RE.match(ref)
+    if not match:
+        return default
+
+    index = 0
+    for char in match.group(1):
+        index = index * 26 + (ord(char) - ord("A") + 1)
+
+    return index - 1
@@ -0,0 +1,384 @@
+"""
+Synthetic center data for load testing.
+
+Generates whole centers: a ladder of rooms by age, households with
+parents and one or more children, and for those children placement
+histories (earlier rooms, then the current one), move-up plans for
+children near their room's maximum age, alumni who have left, and a
+waitlist with preferred rooms and admission plans.
+
+Everything is drawn from one seeded random.Random and dated relative to
+`as_of`, so the same seed and date give the same rows. Primary keys are
+assigned up front and rows are written with batched bulk_create, which
+bypasses model signals; the same repair calls as the bulk importers run
+afterwards.
+"""
+
+import random
+from datetime import date, timedelta
+
+from django.db import transaction
+from django.db.models import Max, Min
+
+from apps.classrooms.models import Room
+from apps.people.models import Household, Parent, Child, HOUSEHOLD_TYPES, month_ordinal
+
+from .dashboard_cache import invalidate_all
+from .models import Placement, MoveUpPlan, WaitlistEntry, AdmissionPlan
+from .occupancy import reconcile as reconcile_occupancy
+from .priority import recompute_priorities
+from . import age_outs, rollup, room_registry
+
+
+DEFAULT_BATCH_SIZE = 5000
+
+# One center: (name, department, min age, max age, capacity), youngest
+# first. Children move up this ladder.
+ROOM_LADDER = [
+    ("Infant A", "IN", 0, 12, 8),
+    ("Infant B", "IN", 0, 12, 8),
+    ("Toddler A", "TL", 12, 24, 12),
+    ("Toddler B", "TL", 12, 24, 12),
+    ("Transition A", "TR", 24, 36, 14),
+    ("Transition B", "TR", 24, 36, 14),
+    ("Preschool A", "PS", 36, 48, 20),
+    ("Preschool B", "PS", 36, 48, 20),
+    ("Preschool C", "PS", 48, 60, 20),
+    ("Preschool D", "PS", 48, 60, 20),
+]
+
+# Share of each room's seats that is filled.
+FILL_RATE = 0.9
+
+# Of the children beyond the enrolled ones: share on the waitlist (the
+# rest are alumni), and share of waitlist entries with an admission plan.
+WAITLIST_SHARE = 0.4
+ADMISSION_SHARE = 0.2
+
+# Household type weights, in HOUSEHOLD_TYPES order.
+HOUSEHOLD_WEIGHTS = [30, 40, 15, 15]
+
+# Children per household and their weights.
+SIBLINGS = [1, 2, 3]
+SIBLING_WEIGHTS = [70, 25, 5]
+
+FIRST_NAMES = [
+    "Ava", "Ben", "Cleo", "Dev", "Ella", "Finn", "Gia", "Hugo", "Iris",
+    "Jack", "Kai", "Lena", "Milo", "Nora", "Owen", "Pia", "Quinn", "Rosa",
+    "Sam", "Tess", "Uma", "Vik", "Wren", "Xavi", "Yara", "Zane",
+]
+
+
+def _next_id(model):
+    return (model.objects.aggregate(n=Max("id"))["n"] or 0) + 1
+
+
+def _add_months(d, months):
+    year, month = divmod(month_ordinal(d) + months - 1, 12)
+    return date(year, month + 1, min(d.day, 28))
+
+
+class SyntheticDataGenerator:
+    """
+    Generates `centers` centers and `children` children in total, at
+    least enough to fill the rooms.
+    """
+
+    def __init__(self, centers=1, children=10000, seed=0, as_of=None,
+                 prefix="Synthetic", batch_size=DEFAULT_BATCH_SIZE):
+        self.centers = centers
+        self.children = children
+        self.random = random.Random(seed)
+        self.as_of = as_of or date.today()
+        self.prefix = prefix
+        self.batch_size = batch_size
+
+        self.rows = {
+            model: []
+            for model in (
+                Room, Household, Parent, Child, Placement,
+                MoveUpPlan, WaitlistEntry, AdmissionPlan,
+            )
+        }
+        self.preferred_rooms = []
+        self.ids = {}
+        self.first_ids = {}
+
+        self._household = None
+        self._siblings_left = 0
+
+    def exists(self):
+        return Room.objects.filter(name__startswith=f"{self.prefix} ").exists()
+
+    def run(self):
+        """
+        Generates and writes everything in one transaction. Returns
+        {model class name: rows written}.
+        """
+
+        with transaction.atomic():
+            self.ids = {model: _next_id(model) for model in self.rows}
+            self.first_ids = dict(self.ids)
+
+            ladders = [self.center(c) for c in range(self.centers)]
+            for ladder in ladders:
+                self.enroll(ladder)
+
+            seats = len(self.rows[Child])
+            remaining = max(self.children - seats, 0)
+            waitlisted = int(remaining * WAITLIST_SHARE)
+
+            for _ in range(waitlisted):
+                self.waitlist(self.random.choice(ladders))
+
+            for _ in range(remaining - waitlisted):
+                self.alumnus(self.random.choice(ladders))
+
+            self.write()
+
+            # Bulk writes bypass the signals that keep derived tables
+            # current.
+            stays = self.written(Placement)
+
+            # Generated households are new, so only generated entries'
+            # scores can change.
+            recompute_priorities(self.written(WaitlistEntry))
+            reconcile_occupancy()
+            rollup.refresh_rooms(
+                self.written(Room).values_list("id", flat=True),
+                stays.aggregate(since=Min("start_date"))["since"],
+            )
+            age_outs.refresh(stays)
+
+        invalidate_all()
+        room_registry.invalidate()
+
+        return {
+            model.__name__: len(rows)
+            for model, rows in self.rows.items()
+        }
+
+    def written(self, model):
+        """
+        The rows of `model` this run wrote: its pre-assigned ids.
+        """
+
+        return model.objects.filter(
+            pk__gte=self.first_ids[model], pk__lt=self.ids[model],
+        )
+
+    # ---------------------------------------------------
+    # Row builders
+    # ---------------------------------------------------
+
+    def _add(self, model, **fields):
+        obj = model(id=self.ids[model], **fields)
+        self.ids[model] += 1
+        self.rows[model].append(obj)
+        return obj
+
+    def center(self, index):
+        """
+        Creates one center's rooms; returns them as [[room, ...], ...]
+        grouped by age band, youngest first.
+        """
+
+        bands = {}
+
+        for name, department, min_age, max_age, capacity in ROOM_LADDER:
+            room = self._add(
+                Room,
+                name=f"{self.prefix} {index + 1} {name}",
+                department=department,
+                min_age_months=min_age,
+                max_age_months=max_age,
+                capacity=capacity,
+            )
+            bands.setdefault((min_age, max_age), []).append(room)
+
+        return [bands[band] for band in sorted(bands)]
+
+    def household(self):
+        """
+        A new household with one or two parents; returns (household,
+        number of children it should get).
+        """
+
+        n = self.ids[Household]
+        household = self._add(
+            Household,
+            name=f"{self.prefix} Household {n}",
+            household_type=self.random.choices(
+                [code for code, _ in HOUSEHOLD_TYPES], HOUSEHOLD_WEIGHTS,
+            )[0],
+        )
+
+        for p in range(self.random.choice([1, 2])):
+            self._add(
+                Parent,
+                household=household,
+                first_name=self.random.choice(FIRST_NAMES),
+                last_name=f"Family{n}",
+                email=f"parent{p}.{n}@example.com",
+                is_primary_contact=p == 0,
+            )
+
+        return household, self.random.choices(SIBLINGS, SIBLING_WEIGHTS)[0]
+
+    def child(self, age_months, enrolled=True):
+        """
+        A child aged `age_months` on as_of, in a new household or as a
+        sibling in the last one.
+        """
+
+        if not self._siblings_left:
+            self._household, self._siblings_left = self.household()
+        self._siblings_left -= 1
+
+        birth_date = _add_months(self.as_of, -age_months) - timedelta(
+            days=self.random.randrange(28)
+        )
+
+        return self._add(
+            Child,
+            household=self._household,
+            first_name=self.random.choice(FIRST_NAMES),
+            last_name=f"Child{self.ids[Child]}",
+            birth_date=birth_date,
+            birth_month=month_ordinal(birth_date),
+            enrolled=enrolled,
+        )
+
+    def history(self, child, ladder, upto, end=None, last_room=None):
+        """
+        Placements for `child` through bands [0, upto]: a room per band,
+        entered at the band's minimum age (the first a few months after
+        birth) and left at its maximum age. The last one, in `last_room`
+        if given, is open unless `end`.
+        """
+
+        start = _add_months(child.birth_date, self.random.randrange(3, 6))
+
+        for band in range(upto + 1):
+            if band == upto and last_room is not None:
+                room = last_room
+            else:
+                room = self.random.choice(ladder[band])
+            start = max(start, _add_months(child.birth_date, room.min_age_months))
+
+            if band < upto:
+                leave = _add_months(child.birth_date, room.max_age_months)
+            else:
+                leave = end
+
+            self._add(
+                Placement,
+                child=child,
+                room=room,
+                start_date=min(start, self.as_of),
+                end_date=leave,
+            )
+
+            if leave is not None:
+                start = leave
+
+    def enroll(self, ladder):
+        """
+        Fills the center's rooms to FILL_RATE, with histories, and plans
+        the move-up of children within two months of their room's
+        maximum age.
+        """
+
+        for band, rooms in enumerate(ladder):
+            for room in rooms:
+                for _ in range(int(room.capacity * FILL_RATE)):
+                    age = self.random.randint(
+                        room.min_age_months,
+                        max(room.max_age_months - 1, room.min_age_months),
+                    )
+                    child = self.child(age)
+                    self.history(child, ladder, band, last_room=room)
+
+                    if age >= room.max_age_months - 2:
+                        self.plan(child, room, ladder, band)
+
+    def plan(self, child, room, ladder, band):
+
+        moving_up = band + 1 < len(ladder)
+
+        self._add(
+            MoveUpPlan,
+            child=child,
+            current_room=room,
+            target_room=self.random.choice(ladder[band + 1]) if moving_up else None,
+            exit_type="moveup" if moving_up else "withdrawal",
+            planned_date=_add_months(child.birth_date, room.max_age_months + 1),
+            status=self.random.choice(["draft", "planned", "planned"]),
+        )
+
+    def waitlist(self, ladder):
+        """
+        A not-yet-enrolled child on the waitlist, some with an
+        admission plan.
+        """
+
+        age = self.random.randint(0, 30)
+        child = self.child(age, enrolled=False)
+        requested_start = self.as_of + timedelta(days=self.random.randint(-90, 270))
+        band = next(
+            i for i, rooms in enumerate(ladder) if age < rooms[0].max_age_months
+        )
+
+        entry = self._add(
+            WaitlistEntry,
+            child=child,
+            requested_start=requested_start,
+        )
+
+        rooms = ladder[band]
+        for room in self.random.sample(rooms, k=self.random.randint(0, len(rooms))):
+            self.preferred_rooms.append(
+                WaitlistEntry.preferred_rooms.through(
+                    waitlistentry_id=entry.id, room_id=room.id,
+                )
+            )
+
+        if self.random.random() < ADMISSION_SHARE:
+            entry.status = "planned"
+            self._add(
+                AdmissionPlan,
+                waitlist_entry=entry,
+                child=child,
+                target_room=self.random.choice(ladder[band]),
+                planned_date=max(requested_start, self.as_of),
+            )
+
+    def alumnus(self, ladder):
+        """
+        A child who went through part of the ladder and has left.
+        """
+
+        age = self.random.randint(24, 120)
+        child = self.child(age, enrolled=False)
+
+        # Leaves at the end of a band already behind them.
+        completed = [
+            i for i, rooms in enumerate(ladder) if rooms[0].max_age_months < age
+        ]
+        upto = self.random.choice(completed)
+        left = _add_months(child.birth_date, ladder[upto][0].max_age_months)
+
+        self.history(child, ladder, upto, end=left)
+
+    # ---------------------------------------------------
+    # Writing
+    # ---------------------------------------------------
+
+    def write(self):
+
+        for model, rows in self.rows.items():
+            model.objects.bulk_create(rows, batch_size=self.batch_size)
+
+        WaitlistEntry.preferred_rooms.through.objects.bulk_create(
+            self.preferred_rooms, batch_size=self.batch_size,
+        )
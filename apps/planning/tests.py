@@ -0,0 +1,1410 @@
+import io
+import json
+import random
+import sqlite3
+import tempfile
+from datetime import date, timedelta
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from apps.people.models import Household, Parent, Child
+from apps.classrooms.models import Room
+
+from .benchmarks import compare, run_benchmarks
+from .billing import billing_lines
+from .matching import match_waitlist
+from .occupancy import reconcile
+from .models import (
+    Placement,
+    MoveUpPlan,
+    WaitlistEntry,
+    TuitionRate,
+    RoomOccupancy,
+    DailyOccupancy,
+    AgeOutDate,
+    LegacySyncRecord,
+)
+from .eligibility import (
+    age_out_date,
+    ages_in_months,
+    batch_moveup_status,
+    classify_ages,
+)
+from .forecasting import add_months, forecast_occupancy
+from .priority import scored_waitlist
+from .ranking import RankIndex
+from . import ranking
+from .roster import RosterImporter
+from .synthetic import SyntheticDataGenerator
+from . import age_outs, metrics, perf, rollup, room_registry, slow_queries
+from .tuition import rate_for
+from .utils import HOUSEHOLD_PRIORITY, WAITLIST_SCORING
+from .views import _refresh_room_card, _refresh_two_room_cards
+
+
+ROSTER = Path(__file__).resolve().parents[2] / "tests" / "april20_2026.ods"
+
+# The same roster saved as XLSX: dates and money are numeric cells.
+ROSTER_XLSX = ROSTER.with_suffix(".xlsx")
+
+# Fixed query budgets. These must not depend on the number of
+# rooms, children or plans on the dashboard.
+DASHBOARD_QUERY_BUDGET = 5
+ROOM_CARD_QUERY_BUDGET = 3
+TWO_ROOM_CARDS_QUERY_BUDGET = 3
+
+
+def seed_center(rooms=2, children_per_room=3, with_plans=True):
+    """
+    Creates rooms full of placed children, with a planned move-up
+    for every other child.
+    """
+
+    today = date.today()
+    created_rooms = []
+
+    for r in range(rooms):
+        room = Room.objects.create(
+            name=f"Room {r}",
+            capacity=children_per_room + 2,
+            min_age_months=r * 12,
+            max_age_months=r * 12 + 12,
+        )
+        created_rooms.append(room)
+
+        for c in range(children_per_room):
+            household = Household.objects.create(
+                name=f"Household {r}-{c}",
+                household_type=["CV", "P", "S", "M"][c % 4],
+            )
+            child = Child.objects.create(
+                household=household,
+                first_name=f"Child{c}",
+                last_name=f"Room{r}",
+                birth_date=today - timedelta(days=30 * (r * 12 + c)),
+            )
+            Placement.objects.create(
+                child=child,
+                room=room,
+                start_date=today - timedelta(days=30),
+            )
+
+            if with_plans and c % 2 == 0:
+                MoveUpPlan.objects.create(
+                    child=child,
+                    current_room=room,
+                    target_room=room,
+                    planned_date=today,
+                    status="planned",
+                )
+
+    return created_rooms
+
+
+LEGACY_SCHEMA = """
+CREATE TABLE accc_household (
+    id INTEGER PRIMARY KEY, name TEXT, address TEXT, phone_number TEXT,
+    household_type TEXT
+);
+CREATE TABLE accc_parent (
+    id INTEGER PRIMARY KEY, first_name TEXT, last_name TEXT, email TEXT,
+    phone_number TEXT, household_id INTEGER
+);
+CREATE TABLE accc_room (
+    id INTEGER PRIMARY KEY, name TEXT, capacity INTEGER, min_age INTEGER,
+    max_age INTEGER
+);
+CREATE TABLE accc_child (
+    id INTEGER PRIMARY KEY, first_name TEXT, last_name TEXT, birth_date DATE,
+    household_id INTEGER, enrolled BOOLEAN, notes TEXT, room_id INTEGER,
+    accc_enroll_date DATE
+);
+CREATE TABLE accc_waitlist (child_id INTEGER, priority INTEGER);
+CREATE TABLE accc_roomtransition (
+    child_id INTEGER, current_room_id INTEGER, new_room_id INTEGER,
+    start_date DATE
+);
+"""
+
+
+def legacy_db(path, children=5):
+    """
+    A small legacy ACCC database: two rooms, a household with one
+    parent per child, every child but the last placed in the first
+    room, the last one waitlisted and the first one moving up.
+    """
+
+    db = sqlite3.connect(path)
+    db.executescript(LEGACY_SCHEMA)
+
+    db.executemany("INSERT INTO accc_room VALUES (?, ?, ?, ?, ?)", [
+        (1, "Legacy Infants", 8, 0, 12),
+        (2, "Legacy Toddlers", 10, 12, 24),
+    ])
+
+    for i in range(1, children + 1):
+        db.execute(
+            "INSERT INTO accc_household VALUES (?, ?, ?, ?, ?)",
+            (i, f"Legacy {i}", f"{i} Main St", None, ["P", "S", "CV", "M"][i % 4]),
+        )
+        db.execute(
+            "INSERT INTO accc_parent VALUES (?, ?, ?, ?, ?, ?)",
+            (i, "Parent", f"Legacy{i}", f"parent{i}@example.com", "555-0100", i),
+        )
+        placed = i < children
+        db.execute(
+            "INSERT INTO accc_child VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                i, "Child", f"Legacy{i}", f"2025-0{i % 9 + 1}-15", i, placed, None,
+                1 if placed else None, "2026-01-05" if placed else None,
+            ),
+        )
+
+    db.execute("INSERT INTO accc_waitlist VALUES (?, ?)", (children, 3))
+    db.execute(
+        "INSERT INTO accc_roomtransition VALUES (?, ?, ?, ?)",
+        (1, 1, 2, "2026-09-01"),
+    )
+
+    db.commit()
+    return db
+
+
+WRITE_STATEMENTS = ("INSERT", "UPDATE", "DELETE")
+
+
+def writes(ctx):
+    """
+    The INSERT, UPDATE and DELETE statements captured by `ctx`.
+    """
+
+    return [
+        query["sql"] for query in ctx.captured_queries
+        if query["sql"].lstrip().upper().startswith(WRITE_STATEMENTS)
+    ]
+
+
+class PlanningTestCase(TestCase):
+    """
+    Starts every test from an empty cache. The in-process room
+    registry, tuition rates and waitlist positions reload on a new
+    version, and their invalidations run on commit, which a TestCase
+    never reaches. Metrics files go to a temporary directory per class
+    rather than the real one.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        directory = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(directory.cleanup)
+
+        override = override_settings(PLANNING_METRICS_DIR=directory.name)
+        override.enable()
+        cls.addClassCleanup(override.disable)
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+
+class DashboardQueryBudgetTests(PlanningTestCase):
+
+    def assertQueryBudget(self, budget, func):
+        with CaptureQueriesContext(connection) as ctx:
+            response = func()
+
+        self.assertLessEqual(
+            len(ctx),
+            budget,
+            "Query budget exceeded:\n"
+            + "\n".join(q["sql"] for q in ctx.captured_queries),
+        )
+        return response
+
+    def test_dashboard_small_center(self):
+        seed_center(rooms=1, children_per_room=1)
+
+        response = self.assertQueryBudget(
+            DASHBOARD_QUERY_BUDGET,
+            lambda: self.client.get(reverse("planning-dashboard")),
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_dashboard_large_center(self):
+        seed_center(rooms=6, children_per_room=10)
+
+        response = self.assertQueryBudget(
+            DASHBOARD_QUERY_BUDGET,
+            lambda: self.client.get(reverse("planning-dashboard")),
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Public")
+
+    def test_dashboard_warm_cache(self):
+        seed_center(rooms=3, children_per_room=5)
+        self.client.get(reverse("planning-dashboard"))
+
+        self.assertQueryBudget(
+            0,
+            lambda: self.client.get(reverse("planning-dashboard")),
+        )
+
+    def test_refresh_room_card(self):
+        room = seed_center(rooms=3, children_per_room=10)[0]
+        request = RequestFactory().get("/")
+
+        response = self.assertQueryBudget(
+            ROOM_CARD_QUERY_BUDGET,
+            lambda: _refresh_room_card(request, room),
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_refresh_two_room_cards(self):
+        room_a, room_b = seed_center(rooms=2, children_per_room=10)
+        request = RequestFactory().get("/")
+
+        response = self.assertQueryBudget(
+            TWO_ROOM_CARDS_QUERY_BUDGET,
+            lambda: _refresh_two_room_cards(request, room_a, room_b),
+        )
+        self.assertEqual(response.status_code, 200)
+
+
+class AsOfDashboardTests(PlanningTestCase):
+
+    def test_dashboard_shows_past_and_future_rosters(self):
+        room_a, room_b = seed_center(rooms=2, children_per_room=1, with_plans=False)
+        today = date.today()
+        placement = Placement.objects.get(room=room_a)
+        child = placement.child
+
+        placement.end_date = today + timedelta(days=10)
+        placement.save()
+        Placement.objects.create(
+            child=child, room=room_b, start_date=today + timedelta(days=10),
+        )
+
+        def roster(day):
+            return set(
+                Placement.objects.on(day).values_list("room_id", flat=True)
+                .filter(child=child)
+            )
+
+        self.assertEqual(roster(today - timedelta(days=30)), {room_a.id})
+        self.assertEqual(roster(today + timedelta(days=9)), {room_a.id})
+        self.assertEqual(roster(today + timedelta(days=10)), {room_b.id})
+        self.assertEqual(roster(today - timedelta(days=31)), set())
+
+        future = (today + timedelta(days=20)).isoformat()
+        response = self.client.get(reverse("planning-dashboard"), {"as_of": future})
+
+        self.assertContains(response, "Move-up actions are disabled")
+        self.assertContains(response, "2 / 6")
+        self.assertNotContains(response, "Plan Move-Up")
+
+
+class RosterImportTests(PlanningTestCase):
+
+    def test_dry_run_writes_nothing(self):
+        report = RosterImporter().run(ROSTER, dry_run=True)
+
+        self.assertEqual(report.counts[("child", "created")], 100)
+        self.assertFalse(Child.objects.exists())
+        self.assertFalse(Room.objects.exists())
+
+    def test_import_is_idempotent(self):
+        RosterImporter().run(ROSTER)
+
+        mariner = Room.objects.get(name="Mariner")
+        self.assertEqual(
+            (mariner.min_age_months, mariner.max_age_months, mariner.capacity),
+            (12, 18, 8),
+        )
+        self.assertEqual(
+            Placement.objects.filter(end_date__isnull=True).count(), 100
+        )
+
+        rollup.extend()
+
+        with CaptureQueriesContext(connection) as ctx:
+            report = RosterImporter().run(ROSTER)
+
+        self.assertEqual(report.changes, [])
+        self.assertEqual(report.counts[("placement", "unchanged")], 100)
+
+        # Nothing changed, so nothing is written, derived tables included.
+        self.assertEqual(writes(ctx), [])
+        self.assertTrue(DailyOccupancy.objects.exists())
+
+
+    def test_xlsx_matches_ods(self):
+        report = RosterImporter().run(ROSTER_XLSX)
+
+        self.assertEqual(report.counts[("child", "created")], 100)
+        self.assertEqual(report.skipped, [])
+
+        # Excel serial dates: 45971 is 2025-11-10.
+        child = Child.objects.get(first_name="Arthur", last_name="Ryan")
+        self.assertEqual(child.birth_date, date(2025, 11, 10))
+        self.assertEqual(child.placements.get().start_date, date(2026, 3, 30))
+
+        self.assertEqual(RosterImporter().run(ROSTER).changes, [])
+
+    def test_household_types_are_never_rewritten(self):
+        # Another family that happens to share Arthur Ryan's name.
+        ryans = Household.objects.create(name="Ryan", household_type="P")
+        # Robert Dorin is already known, in a household of another type.
+        dorins = Household.objects.create(name="Dorin", household_type="P")
+        Child.objects.create(
+            household=dorins,
+            first_name="Robert",
+            last_name="Dorin",
+            birth_date=date(2024, 8, 25),
+        )
+
+        report = RosterImporter().run(ROSTER)
+
+        arthur = Child.objects.get(first_name="Arthur", last_name="Ryan")
+        self.assertNotEqual(arthur.household_id, ryans.id)
+        self.assertEqual(arthur.household.household_type, "M")
+
+        ryans.refresh_from_db()
+        dorins.refresh_from_db()
+        self.assertEqual((ryans.household_type, dorins.household_type), ("P", "P"))
+        self.assertEqual(len(report.conflicts), 1)
+        self.assertIn("Robert Dorin", report.conflicts[0])
+
+
+class LegacyImportTests(PlanningTestCase):
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = str(Path(directory.name) / "legacy.sqlite3")
+        self.legacy = legacy_db(self.path)
+        self.addCleanup(self.legacy.close)
+
+    def sync(self, batch_size=2):
+        call_command(
+            "import_accc_data",
+            source=self.path,
+            batch_size=batch_size,
+            stdout=io.StringIO(),
+        )
+
+    def test_import_maps_legacy_rows_in_batches(self):
+        # A batch size of 2 streams every table over several batches.
+        self.sync(batch_size=2)
+
+        self.assertEqual(Household.objects.count(), 5)
+        self.assertEqual(Parent.objects.count(), 5)
+        self.assertEqual(Child.objects.count(), 5)
+        self.assertEqual(Room.objects.count(), 2)
+        self.assertEqual(Placement.objects.count(), 4)
+
+        child = Child.objects.get(pk=2)
+        self.assertEqual(
+            (child.last_name, child.birth_date, child.birth_month,
+             child.household.household_type, child.notes),
+            ("Legacy2", date(2025, 3, 15), 2025 * 12 + 3, "CV", ""),
+        )
+        self.assertEqual(Parent.objects.get(pk=2).household_id, 2)
+
+        placement = Placement.objects.get(child_id=2)
+        self.assertEqual(
+            (placement.room.name, placement.start_date, placement.end_date),
+            ("Legacy Infants", date(2026, 1, 5), None),
+        )
+
+        entry = WaitlistEntry.objects.get()
+        self.assertEqual(entry.child_id, 5)
+        self.assertEqual(entry.requested_start, date.today())
+        self.assertEqual(entry.status, "waiting")
+
+        plan = MoveUpPlan.objects.get()
+        self.assertEqual(
+            (plan.child_id, plan.current_room_id, plan.target_room_id,
+             plan.planned_date, plan.status),
+            (1, 1, 2, date(2026, 9, 1), "planned"),
+        )
+
+        with self.assertRaises(CommandError):
+            self.sync(batch_size=0)
+
+    def test_unchanged_sync_writes_nothing(self):
+        self.sync()
+        rollup.extend()
+        self.assertTrue(DailyOccupancy.objects.exists())
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.sync()
+
+        self.assertEqual(writes(ctx), [])
+        self.assertTrue(DailyOccupancy.objects.exists())
+        self.assertEqual(AgeOutDate.objects.count(), 4)
+
+    def test_sync_repairs_only_what_changed(self):
+        self.sync()
+        rollup.extend()
+        untouched = WaitlistEntry.objects.update(priority_score=-1)
+
+        self.legacy.execute("UPDATE accc_child SET room_id = 2 WHERE id = 2")
+        self.legacy.commit()
+        self.sync()
+
+        self.assertEqual(reconcile(repair=False), [])
+        self.assertEqual(
+            AgeOutDate.objects.get(child_id=2).room_id, 2,
+        )
+        self.assertEqual(
+            WaitlistEntry.objects.filter(priority_score=-1).count(), untouched,
+        )
+
+        refreshed = sorted(DailyOccupancy.objects.values_list(
+            "room_id", "household_type", "date", "headcount", "cumulative",
+        ))
+        rollup.rebuild()
+        self.assertEqual(refreshed, sorted(DailyOccupancy.objects.values_list(
+            "room_id", "household_type", "date", "headcount", "cumulative",
+        )))
+
+    def test_sync_updates_and_removes_changed_rows(self):
+        self.sync()
+        today = date.today()
+
+        self.legacy.executescript("""
+            UPDATE accc_household SET name = 'Renamed' WHERE id = 4;
+            UPDATE accc_child SET room_id = 2 WHERE id = 2;
+            UPDATE accc_child SET room_id = NULL WHERE id = 3;
+            DELETE FROM accc_waitlist;
+        """)
+        self.sync()
+
+        self.assertEqual(Household.objects.get(pk=4).name, "Renamed")
+        self.assertFalse(WaitlistEntry.objects.exists())
+
+        # A room change ends the stay and starts another: the earlier
+        # stay is kept for as-of rosters and the occupancy rollup.
+        self.assertEqual(
+            list(
+                Placement.objects.filter(child_id=2)
+                .order_by("id")
+                .values_list("room_id", "start_date", "end_date")
+            ),
+            [(1, date(2026, 1, 5), today), (2, today, None)],
+        )
+
+        # A child with no room left is no longer placed, with history.
+        self.assertEqual(
+            list(Placement.objects.filter(child_id=3).values_list("room_id", "end_date")),
+            [(1, today)],
+        )
+
+        self.legacy.execute("UPDATE accc_child SET room_id = 2 WHERE id = 3")
+        self.legacy.commit()
+        self.sync()
+
+        self.assertEqual(
+            Placement.objects.filter(child_id=3, end_date__isnull=True).get().room_id,
+            2,
+        )
+
+    def test_first_sync_adopts_rows_loaded_without_records(self):
+        # As left by the one-shot import: the objects, but no records.
+        self.sync()
+        LegacySyncRecord.objects.all().delete()
+        counts = [
+            model.objects.count()
+            for model in (Household, Child, Placement, WaitlistEntry, MoveUpPlan)
+        ]
+
+        self.legacy.execute("UPDATE accc_household SET name = 'Renamed' WHERE id = 4")
+        self.legacy.commit()
+        self.sync()
+
+        self.assertEqual(counts, [
+            model.objects.count()
+            for model in (Household, Child, Placement, WaitlistEntry, MoveUpPlan)
+        ])
+        self.assertEqual(Household.objects.get(pk=4).name, "Renamed")
+        self.assertEqual(
+            LegacySyncRecord.objects.filter(source="placements").count(), 4,
+        )
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.sync()
+
+        self.assertEqual(writes(ctx), [])
+
+
+class EligibilityTests(SimpleTestCase):
+
+    def test_ages_count_calendar_months(self):
+        self.assertEqual(
+            ages_in_months(
+                [date(2025, 1, 31), date(2025, 2, 1), date(2026, 1, 1)],
+                as_of=date(2026, 1, 1),
+            ),
+            [12, 11, 0],
+        )
+
+    def test_status_at_room_boundaries(self):
+        # A 12-24 month room.
+        ages = [11, 12, 21, 22, 24, 25]
+
+        self.assertEqual(
+            classify_ages(ages, [12] * len(ages), [24] * len(ages)),
+            ["early", "ready", "ready", "approaching", "approaching", "overdue"],
+        )
+
+        # Exactly at the minimum, exactly at the maximum, and one month
+        # over, as of the same day.
+        as_of = date(2026, 6, 15)
+        self.assertEqual(
+            batch_moveup_status(
+                [date(2025, 6, 1), date(2024, 6, 30), date(2024, 5, 1)],
+                [12, 12, 12],
+                [24, 24, 24],
+                as_of,
+            ),
+            [("ready", "Eligible"), ("approaching", "Approaching"), ("overdue", "Overdue")],
+        )
+
+
+class ForecastTests(PlanningTestCase):
+
+    def test_planned_moveup_moves_seat_between_rooms(self):
+        start = date(2026, 1, 1)
+
+        infants = Room.objects.create(
+            name="Infants", capacity=4, min_age_months=0, max_age_months=12,
+        )
+        toddlers = Room.objects.create(
+            name="Toddlers", capacity=4, min_age_months=12, max_age_months=24,
+        )
+        household = Household.objects.create(name="Forecast")
+        child = Child.objects.create(
+            household=household,
+            first_name="Fran",
+            last_name="Forecast",
+            birth_date=date(2025, 6, 15),
+        )
+        Placement.objects.create(child=child, room=infants, start_date=date(2025, 9, 1))
+        MoveUpPlan.objects.create(
+            child=child,
+            current_room=infants,
+            target_room=toddlers,
+            planned_date=date(2026, 3, 1),
+            status="planned",
+        )
+
+        forecast = forecast_occupancy(start=start, months=24)
+        infant_days, toddler_days = forecast["occupancy"]
+        move = (date(2026, 3, 1) - start).days
+        age_out = (date(2027, 7, 1) - start).days
+
+        self.assertEqual(forecast["rooms"], [infants, toddlers])
+        self.assertEqual(infant_days[move - 1], 1)
+        self.assertEqual(infant_days[move], 0)
+        self.assertEqual(toddler_days[move - 1], 0)
+        self.assertEqual(toddler_days[move], 1)
+        self.assertEqual(toddler_days[age_out], 0)
+
+
+class WaitlistMatchingTests(PlanningTestCase):
+
+    def test_higher_priority_gets_the_first_open_seat(self):
+        start = date(2026, 1, 1)
+
+        room = Room.objects.create(
+            name="Ones", capacity=1, min_age_months=0, max_age_months=24,
+        )
+        entries = {}
+        birth_dates = {"P": date(2025, 6, 1), "CV": date(2025, 1, 1)}
+
+        for household_type in ["P", "CV"]:
+            household = Household.objects.create(
+                name=f"Waiting {household_type}",
+                household_type=household_type,
+            )
+            child = Child.objects.create(
+                household=household,
+                first_name="Wait",
+                last_name=household_type,
+                birth_date=birth_dates[household_type],
+            )
+            entries[household_type] = WaitlistEntry.objects.create(
+                child=child,
+                requested_start=start,
+            )
+
+        plans = match_waitlist(start=start, months=36)
+
+        self.assertEqual(
+            [(p.waitlist_entry_id, p.target_room_id, p.planned_date) for p in plans],
+            [
+                (entries["CV"].id, room.id, start),
+                # Once the CV child ages out of the room.
+                (entries["P"].id, room.id, date(2027, 2, 1)),
+            ],
+        )
+
+    def test_priority_follows_household_type(self):
+        household = Household.objects.create(name="Waiting", household_type="P")
+        child = Child.objects.create(
+            household=household,
+            first_name="Wait",
+            last_name="Ing",
+            birth_date=date(2025, 1, 1),
+        )
+        entry = WaitlistEntry.objects.create(
+            child=child,
+            requested_start=date.today() + timedelta(days=60),
+        )
+        self.assertEqual(entry.priority_score, HOUSEHOLD_PRIORITY["P"])
+
+        household.household_type = "CV"
+        household.save()
+
+        entry.refresh_from_db()
+        self.assertEqual(entry.priority_score, HOUSEHOLD_PRIORITY["CV"])
+
+    def test_weighted_score_ranks_in_one_query(self):
+        scoring = {
+            "household_type": {"P": 1},
+            "sibling_enrolled": 100,
+            "preferred_room_match": 10,
+            "per_month_waiting": 1000,
+            "max_months_waiting": 2,
+        }
+        as_of = date(2026, 6, 1)
+        room = Room.objects.create(
+            name="Ones", capacity=4, min_age_months=12, max_age_months=24,
+        )
+        household = Household.objects.create(name="Placed", household_type="P")
+        sibling = Child.objects.create(
+            household=household, first_name="Big", last_name="Sibling",
+            birth_date=date(2023, 1, 1),
+        )
+        Placement.objects.create(child=sibling, room=room, start_date=date(2024, 1, 1))
+
+        def entry(name, household, requested_start, preferred=()):
+            child = Child.objects.create(
+                household=household, first_name=name, last_name="Waiting",
+                birth_date=date(2025, 1, 1),
+            )
+            entry = WaitlistEntry.objects.create(
+                child=child, requested_start=requested_start,
+            )
+            entry.preferred_rooms.set(preferred)
+            return entry
+
+        other = Household.objects.create(name="Other", household_type="P")
+        plain = entry("Plain", other, as_of)
+        # 14 months old at the requested start: fits the room.
+        fits = entry("Fits", other, date(2026, 3, 1), [room])
+        has_sibling = entry("Sibling", household, as_of)
+        # Waiting for 17 months, capped at 2.
+        waiting = entry("Waiting", other, date(2025, 1, 1))
+
+        with CaptureQueriesContext(connection) as ctx:
+            scores = [
+                (e.id, e.score)
+                for e in scored_waitlist(scoring=scoring, as_of=as_of)
+            ]
+
+        self.assertEqual(len(ctx), 1)
+        self.assertEqual(scores, [
+            (fits.id, 2011),
+            (waiting.id, 2001),
+            (has_sibling.id, 101),
+            (plain.id, 1),
+        ])
+
+        # The stored score (default weights, as of today) includes the
+        # preferred room set after create().
+        fits.refresh_from_db()
+        self.assertEqual(
+            fits.priority_score,
+            scored_waitlist().get(pk=fits.pk).score,
+        )
+
+
+class WaitlistPriorityTests(PlanningTestCase):
+
+    def test_preferred_rooms_update_the_stored_score(self):
+        room = Room.objects.create(
+            name="Ones", capacity=4, min_age_months=12, max_age_months=24,
+        )
+        household = Household.objects.create(name="Waiting", household_type="P")
+        child = Child.objects.create(
+            household=household, first_name="Pref", last_name="Room",
+            birth_date=date.today() - timedelta(days=540),
+        )
+        entry = WaitlistEntry.objects.create(
+            child=child, requested_start=date.today(),
+        )
+        base = entry.priority_score
+
+        def stored():
+            entry.refresh_from_db()
+            return entry.priority_score
+
+        match = WAITLIST_SCORING["preferred_room_match"]
+
+        entry.preferred_rooms.set([room])
+        self.assertEqual(stored(), base + match)
+
+        entry.preferred_rooms.clear()
+        self.assertEqual(stored(), base)
+
+        # From the room's side too.
+        room.waitlistentry_set.add(entry)
+        self.assertEqual(stored(), base + match)
+
+        room.waitlistentry_set.clear()
+        self.assertEqual(stored(), base)
+
+
+class WaitlistPositionTests(PlanningTestCase):
+
+    def test_rank_index_matches_sorted_order(self):
+        keys = random.Random(1).sample(range(10000), 500)
+        index = RankIndex(keys[:250])
+
+        for key in keys[250:]:
+            index.insert(key)
+        for key in keys[:100]:
+            index.remove(key)
+
+        remaining = sorted(keys[100:])
+        self.assertEqual(len(index), len(remaining))
+        self.assertEqual(
+            [index.rank(key) for key in remaining],
+            list(range(len(remaining))),
+        )
+
+    def test_positions_follow_waitlist_changes(self):
+        entries = []
+
+        with self.captureOnCommitCallbacks(execute=True):
+            for i, household_type in enumerate(["P", "S", "CV"]):
+                household = Household.objects.create(
+                    name=f"Waiting {i}", household_type=household_type,
+                )
+                child = Child.objects.create(
+                    household=household,
+                    first_name="Wait",
+                    last_name=str(i),
+                    birth_date=date(2025, 1, 1),
+                )
+                entries.append(WaitlistEntry.objects.create(
+                    child=child,
+                    requested_start=date.today() + timedelta(days=60),
+                ))
+
+        public, staff, civil_servant = entries
+        self.assertEqual(
+            ranking.positions([e.id for e in entries]),
+            {civil_servant.id: 1, staff.id: 2, public.id: 3},
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            civil_servant.status = "withdrawn"
+            civil_servant.save()
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(ranking.position(staff.id), 1)
+            self.assertIsNone(ranking.position(civil_servant.id))
+        self.assertEqual(len(ctx), 0)
+
+        response = self.client.get(
+            reverse("waitlist-position", args=[public.id])
+        )
+        self.assertEqual(
+            response.json(),
+            {"entry": public.id, "status": "waiting", "position": 2, "waiting": 2},
+        )
+
+
+class DashboardCacheTests(PlanningTestCase):
+
+    def test_writes_invalidate_only_affected_cards(self):
+        room_a, room_b = seed_center(rooms=2, children_per_room=2)
+        request = RequestFactory().get("/")
+        _refresh_two_room_cards(request, room_a, room_b)
+
+        with CaptureQueriesContext(connection) as cached:
+            _refresh_two_room_cards(request, room_a, room_b)
+
+        plan = MoveUpPlan.objects.filter(current_room=room_a).first()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            plan.status = "cancelled"
+            plan.save()
+
+            # Not committed yet: the cached cards still stand, so no
+            # concurrent rebuild can be stored under the new version.
+            with CaptureQueriesContext(connection) as ctx:
+                _refresh_two_room_cards(request, room_a, room_b)
+            self.assertEqual(len(ctx), len(cached))
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = _refresh_two_room_cards(request, room_a, room_b)
+
+        # Only room A is rebuilt: placements and plans, one query each.
+        self.assertEqual(len(ctx), 2)
+        self.assertNotContains(response, f"cancel-moveup/{plan.id}/")
+
+    def test_room_change_invalidates_everything(self):
+        room = seed_center(rooms=1, children_per_room=1)[0]
+        self.client.get(reverse("planning-dashboard"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            room.name = "Renamed Room"
+            room.save()
+
+        response = self.client.get(reverse("planning-dashboard"))
+        self.assertContains(response, "Renamed Room")
+
+
+class BillingTests(PlanningTestCase):
+
+    def test_billing_run_matches_child_tuition(self):
+        for room in seed_center(rooms=2, children_per_room=3):
+            room.department = "TL"
+            room.save()
+
+        child = Child.objects.first()
+        child.tuition_override = 100
+        child.save()
+
+        rate_for("TL", "P")  # load the rate lookup
+
+        with CaptureQueriesContext(connection) as ctx:
+            lines = list(billing_lines())
+
+        self.assertEqual(len(ctx), 1)
+
+        tuition = {
+            line["child_id"]: line["tuition"]
+            for line in lines if line["child_id"] is not None
+        }
+        self.assertEqual(
+            tuition,
+            {c.id: c.tuition for c in Child.objects.all()},
+        )
+        self.assertEqual(tuition[child.id], 100)
+
+        totals = [line for line in lines if line["child_id"] is None]
+        self.assertEqual(len(totals), Household.objects.count())
+        self.assertEqual(
+            sum(line["tuition"] for line in totals),
+            sum(tuition.values()),
+        )
+        self.assertIn(rate_for("TL", "P"), tuition.values())
+
+    def test_rate_changes_are_effective_dated(self):
+        today = date.today()
+        old_rate = rate_for("IN", "P")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            TuitionRate.objects.create(
+                department="IN",
+                household_type="P",
+                amount=2000,
+                effective_from=today + timedelta(days=1),
+            )
+
+            # Not committed yet: readers keep the rates they loaded.
+            self.assertEqual(rate_for("IN", "P", today + timedelta(days=1)), old_rate)
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(rate_for("IN", "P", today), old_rate)
+            self.assertEqual(rate_for("IN", "P", today + timedelta(days=1)), 2000)
+            self.assertIsNone(rate_for("IN", "P", date(1999, 1, 1)))
+
+        # One reload after the write, then lookups come from memory.
+        self.assertEqual(len(ctx), 1)
+
+
+class OccupancyCounterTests(PlanningTestCase):
+
+    def counters(self, room):
+        occupancy = RoomOccupancy.objects.get(room=room)
+        return occupancy.occupied, occupancy.incoming, occupancy.outgoing
+
+    def test_transitions_keep_counters_in_sync(self):
+        room_a, room_b = seed_center(rooms=2, children_per_room=2, with_plans=False)
+        child = Placement.objects.filter(room=room_a).first().child
+
+        self.client.post(reverse("create-moveup"), {
+            "child_id": child.id,
+            "room_id": room_a.id,
+            "target_room": room_b.id,
+            "planned_date": date.today().isoformat(),
+            "teacher_notes": "",
+        })
+        self.assertEqual(self.counters(room_a), (2, 0, 1))
+        self.assertEqual(self.counters(room_b), (2, 1, 0))
+
+        plan = MoveUpPlan.objects.get(child=child)
+        self.client.post(reverse("implement-moveup", args=[plan.id]))
+
+        self.assertEqual(self.counters(room_a), (1, 0, 0))
+        self.assertEqual(self.counters(room_b), (3, 0, 0))
+        self.assertEqual(reconcile(repair=False), [])
+
+    def test_reconcile_repairs_drift(self):
+        room = seed_center(rooms=1, children_per_room=3)[0]
+        RoomOccupancy.objects.filter(room=room).update(occupied=10)
+
+        self.assertEqual(reconcile(), [(room.id, "occupied", 10, 3)])
+        self.assertEqual(self.counters(room), (3, 2, 2))
+        self.assertEqual(reconcile(), [])
+
+
+class OccupancyRollupTests(PlanningTestCase):
+
+    def snapshot(self):
+        return sorted(
+            DailyOccupancy.objects.values_list(
+                "room_id", "household_type", "date", "headcount", "cumulative",
+            )
+        )
+
+    def test_incremental_updates_match_a_rebuild(self):
+        today = date.today()
+        room_a, room_b = seed_center(rooms=2, children_per_room=3, with_plans=False)
+        rollup.extend()
+
+        placement = Placement.objects.filter(room=room_a).first()
+        placement.end_date = today - timedelta(days=5)
+        placement.save()
+        Placement.objects.create(
+            child=placement.child,
+            room=room_b,
+            start_date=today - timedelta(days=5),
+        )
+
+        household = Placement.objects.filter(room=room_b).last().child.household
+        household.household_type = "M"
+        household.save()
+
+        Placement.objects.filter(room=room_a).last().delete()
+
+        incremental = self.snapshot()
+        rollup.rebuild()
+        self.assertEqual(incremental, self.snapshot())
+
+    def test_bulk_refresh_recounts_only_touched_rooms(self):
+        today = date.today()
+        room_a, room_b = seed_center(rooms=2, children_per_room=3, with_plans=False)
+        rollup.extend()
+        untouched = sorted(
+            DailyOccupancy.objects.filter(room=room_a).values_list("id", flat=True)
+        )
+
+        # Bulk writes, as the importers make: no signals.
+        child = Child.objects.filter(placements__room=room_b).first()
+        Placement.objects.filter(child=child).update(end_date=today - timedelta(days=3))
+        Placement.objects.bulk_create([
+            Placement(child=child, room=room_a, start_date=today - timedelta(days=3)),
+        ])
+        rollup.refresh_rooms([room_b.id], today - timedelta(days=30))
+
+        # Room A was not passed in, so its rows are left alone.
+        self.assertEqual(
+            sorted(
+                DailyOccupancy.objects.filter(room=room_a).values_list("id", flat=True)
+            ),
+            untouched,
+        )
+
+        rollup.refresh_rooms([room_a.id], today - timedelta(days=3))
+        refreshed = self.snapshot()
+        rollup.rebuild()
+        self.assertEqual(refreshed, self.snapshot())
+
+    def test_placement_writes_skip_an_unbuilt_table(self):
+        room = seed_center(rooms=1, children_per_room=1, with_plans=False)[0]
+        placement = Placement.objects.get(room=room)
+
+        with CaptureQueriesContext(connection) as ctx:
+            placement.start_date -= timedelta(days=1)
+            placement.save()
+
+        self.assertFalse(any(
+            "people_household" in query["sql"] for query in ctx.captured_queries
+        ))
+
+        rollup.extend()
+        placement.end_date = date.today() - timedelta(days=2)
+        placement.save()
+        incremental = self.snapshot()
+        rollup.rebuild()
+        self.assertEqual(incremental, self.snapshot())
+
+    def test_concurrent_extends_do_not_collide(self):
+        today = date.today()
+        seed_center(rooms=2, children_per_room=3, with_plans=False)
+        rollup.extend()
+        rows = self.snapshot()
+
+        # A second report that read the bounds before the first one
+        # committed fills the same days again.
+        rollup._fill(today - timedelta(days=2), today)
+
+        self.assertEqual(rows, self.snapshot())
+
+    def test_range_report_uses_person_days(self):
+        today = date.today()
+        room = seed_center(rooms=1, children_per_room=2, with_plans=False)[0]
+        start = today - timedelta(days=30)
+
+        # Two children for 10 days, then one leaves.
+        Placement.objects.filter(room=room).first().delete()
+        child = Child.objects.first()
+        Placement.objects.create(
+            child=child,
+            room=room,
+            start_date=start,
+            end_date=start + timedelta(days=10),
+        )
+
+        _, end, rows = rollup.occupancy_between(start, today)
+
+        self.assertEqual(end, today)
+        self.assertEqual(rows[0]["person_days"], 31 + 10)
+        self.assertEqual(rows[0]["average"], round(41 / 31, 2))
+
+        # Already built: table bounds, rooms, and the two lookups.
+        with CaptureQueriesContext(connection) as ctx:
+            rollup.occupancy_between(start - timedelta(days=365), today)
+        self.assertEqual(len(ctx), 3)
+
+
+class AgeOutCalendarTests(PlanningTestCase):
+
+    def test_calendar_follows_birth_dates_limits_and_placements(self):
+        today = date.today()
+        room = seed_center(rooms=1, children_per_room=2, with_plans=False)[0]
+        placement = Placement.objects.filter(room=room).first()
+        child = placement.child
+
+        self.assertEqual(
+            AgeOutDate.objects.get(placement=placement).overdue_on,
+            age_out_date(child.birth_date, 12),
+        )
+
+        # Due within 90 days once the child is 11 months old.
+        child.birth_date = today - timedelta(days=335)
+        child.save()
+        self.assertEqual(
+            [a.child for a in age_outs.upcoming(days=90)], [child],
+        )
+
+        room.max_age_months = 24
+        room.save()
+        self.assertEqual(list(age_outs.upcoming(days=90)), [])
+        self.assertEqual(
+            AgeOutDate.objects.get(placement=placement).overdue_on,
+            age_out_date(child.birth_date, 24),
+        )
+
+        placement.end_date = today
+        placement.save()
+        self.assertEqual(AgeOutDate.objects.count(), 1)
+
+    def test_bulk_writers_refresh_only_their_placements(self):
+        SyntheticDataGenerator(children=120, prefix="First").run()
+        marker = date(2000, 1, 1)
+        first = AgeOutDate.objects.update(overdue_on=marker)
+
+        SyntheticDataGenerator(children=120, prefix="Second").run()
+
+        # The first run's rows are left alone, not re-created.
+        self.assertEqual(AgeOutDate.objects.filter(overdue_on=marker).count(), first)
+        self.assertEqual(
+            AgeOutDate.objects.count(),
+            Placement.objects.filter(end_date__isnull=True).count(),
+        )
+
+
+class ChildEligibilityTests(PlanningTestCase):
+
+    def test_eligible_for_matches_python_ages(self):
+        as_of = date(2026, 4, 20)
+        room = Room.objects.create(
+            name="Toddlers", capacity=10, min_age_months=12, max_age_months=24,
+        )
+        household = Household.objects.create(name="Ages")
+
+        for months in range(0, 40, 3):
+            Child.objects.create(
+                household=household,
+                first_name=f"Child{months}",
+                last_name="Ages",
+                birth_date=add_months(as_of, -months),
+            )
+
+        expected = {
+            child.id
+            for child in Child.objects.all()
+            if 12 <= (
+                (as_of.year - child.birth_date.year) * 12
+                + as_of.month - child.birth_date.month
+            ) <= 24
+        }
+
+        self.assertTrue(expected)
+        self.assertEqual(
+            set(Child.objects.eligible_for(room, as_of).values_list("id", flat=True)),
+            expected,
+        )
+
+        child = Child.objects.get(first_name="Child12")
+        child.birth_date = date(2020, 1, 1)
+        child.save(update_fields=["birth_date"])
+        self.assertNotIn(child, Child.objects.eligible_for(room, as_of))
+        self.assertEqual(
+            Child.objects.with_age_months(as_of).get(pk=child.pk).age_in_months, 75,
+        )
+
+
+class RoomRegistryTests(PlanningTestCase):
+
+    def test_lookups_match_sql_and_follow_room_writes(self):
+        rooms = seed_center(rooms=4, children_per_room=1, with_plans=False)
+        room_registry.all_rooms()
+
+        with CaptureQueriesContext(connection) as ctx:
+            for age in range(0, 50):
+                self.assertEqual(
+                    [r.id for r in room_registry.rooms_for_age(
+                        age, below=1, above=3, exclude=rooms[0].id,
+                    )],
+                    list(
+                        Room.objects
+                        .filter(min_age_months__lte=age + 3, max_age_months__gte=age - 1)
+                        .exclude(id=rooms[0].id)
+                        .order_by("min_age_months")
+                        .values_list("id", flat=True)
+                    ),
+                )
+            self.assertEqual(room_registry.get(str(rooms[1].id)), rooms[1])
+        self.assertEqual(len(ctx), 50)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            rooms[1].max_age_months = 60
+            rooms[1].save()
+
+            # Not committed yet: readers keep the loaded rooms.
+            self.assertNotIn(
+                rooms[1].id, [r.id for r in room_registry.rooms_for_age(55)],
+            )
+
+        self.assertIn(rooms[1].id, [r.id for r in room_registry.rooms_for_age(55)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            rooms[2].delete()
+        self.assertIsNone(room_registry.get(rooms[2].id))
+
+
+class SyntheticDataTests(PlanningTestCase):
+
+    def generate(self, prefix):
+        counts = SyntheticDataGenerator(
+            centers=2, children=600, seed=7, as_of=date(2026, 4, 20), prefix=prefix,
+        ).run()
+
+        return counts, list(
+            Child.objects
+            .filter(household__name__startswith=prefix)
+            .order_by("id")
+            .values_list("birth_date", "household__household_type", "enrolled")
+        )
+
+    def test_generation_is_deterministic_and_consistent(self):
+        counts, children = self.generate("One")
+
+        self.assertEqual(counts["Room"], 20)
+        self.assertEqual(counts["Child"], 600)
+        self.assertEqual(self.generate("Two")[1], children)
+
+        self.assertEqual(reconcile(repair=False), [])
+        as_of = date(2026, 4, 20)
+        for room in Room.objects.filter(name__startswith="One "):
+            placed = Child.objects.filter(
+                placements__room=room, placements__end_date__isnull=True,
+            )
+            self.assertEqual(
+                placed.count(),
+                placed.filter(pk__in=Child.objects.eligible_for(room, as_of)).count(),
+            )
+
+    def test_only_generated_waitlist_entries_are_rescored(self):
+        self.generate("One")
+        rescored = WaitlistEntry.objects.update(priority_score=-1)
+
+        self.generate("Two")
+
+        self.assertEqual(WaitlistEntry.objects.filter(priority_score=-1).count(), rescored)
+        self.assertFalse(
+            WaitlistEntry.objects
+            .filter(child__household__name__startswith="Two", priority_score=-1)
+            .exists()
+        )
+
+
+class BenchmarkTests(PlanningTestCase):
+
+    def test_results_and_regressions(self):
+        seed_center(rooms=2, children_per_room=3)
+        perf.reset()
+        names = ["build_global_stats", "refresh_room_card", "admin.moveupplan_changelist"]
+
+        results = run_benchmarks(names, repeat=1)
+
+        self.assertEqual(set(results), set(names))
+        # Cold: the card is rebuilt on every call, not read from cache.
+        self.assertGreater(results["refresh_room_card"]["queries"], 0)
+        self.assertLessEqual(results["refresh_room_card"]["queries"], ROOM_CARD_QUERY_BUDGET)
+
+        # Session, user, two room filters, two counts and the page: no
+        # query per plan.
+        self.assertLessEqual(results["admin.moveupplan_changelist"]["queries"], 7)
+
+        # Again, as with --existing: the benchmark user does not clash.
+        run_benchmarks(names, repeat=1)
+
+        # Benchmark requests are not recorded as traffic.
+        self.assertEqual(perf.snapshot(), [])
+
+        baseline = {"a": {"seconds": 0.1, "queries": 3, "peak_kib": 100}}
+        self.assertEqual(compare({"a": {"seconds": 0.102, "queries": 3, "peak_kib": 110}}, baseline), [])
+        self.assertEqual(
+            compare({"a": {"seconds": 0.2, "queries": 4, "peak_kib": 100}}, baseline),
+            [("a", "queries", 3, 4), ("a", "seconds", 0.1, 0.2)],
+        )
+
+
+class ServerTimingTests(PlanningTestCase):
+
+    def setUp(self):
+        super().setUp()
+        perf.reset()
+
+    def test_timings_header_and_histogram(self):
+        seed_center(rooms=2, children_per_room=2)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("planning-dashboard"))
+
+        header = response["Server-Timing"]
+        self.assertIn(f'desc="{len(ctx)} queries"', header)
+        self.assertIn("tpl;dur=", header)
+        self.assertIn("total;dur=", header)
+
+        row = {r["url_name"]: r for r in perf.snapshot()}["planning-dashboard"]
+        self.assertEqual(row["requests"], 1)
+        self.assertEqual(row["avg_queries"], len(ctx))
+        self.assertGreater(row["avg_template_ms"], 0)
+        self.assertEqual(sum(row["buckets"]), 1)
+
+        self.assertEqual(self.client.get(reverse("perf-report")).status_code, 302)
+
+        self.client.force_login(
+            User.objects.create_superuser("director", "d@example.com", "pw")
+        )
+        self.assertContains(self.client.get(reverse("perf-report")), "planning-dashboard")
+
+
+class MetricsTests(PlanningTestCase):
+
+    def setUp(self):
+        super().setUp()
+        metrics.reset()
+
+    def test_scrape_sums_processes_and_reads_gauges(self):
+        room = seed_center(rooms=1, children_per_room=3)[0]
+        WaitlistEntry.objects.create(
+            child=Child.objects.first(), requested_start=date.today(),
+        )
+        self.client.get(reverse("planning-dashboard"))
+        self.client.get(reverse("planning-dashboard"))
+
+        # Another worker's file.
+        (metrics.metrics_dir() / "99999.json").write_text(json.dumps([
+            ["comet_request_duration_seconds_count", [["view", "planning-dashboard"]], 3],
+        ]))
+
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 403)
+
+        with override_settings(PLANNING_METRICS_TOKEN="secret"):
+            self.assertEqual(self.client.get(reverse("metrics")).status_code, 401)
+            body = self.client.get(
+                reverse("metrics"), headers={"Authorization": "Bearer secret"},
+            ).content.decode()
+
+        self.assertIn('comet_request_duration_seconds_count{view="planning-dashboard"} 5', body)
+        self.assertIn('comet_request_duration_seconds_bucket{view="planning-dashboard",le="+Inf"} 2', body)
+        self.assertIn('comet_cache_requests_total{cache="room_card",result="miss"} 1', body)
+        self.assertIn('comet_cache_requests_total{cache="room_card",result="hit"} 1', body)
+        self.assertIn(f'comet_room_occupied{{room="{room.name}"}} 3', body)
+        self.assertIn(f'comet_room_open_seats{{room="{room.name}"}} 2', body)
+        self.assertIn("comet_waitlist_length 1", body)
+        self.assertIn("# TYPE comet_request_duration_seconds histogram", body)
+
+
+class SlowQueryLogTests(PlanningTestCase):
+
+    def test_slow_queries_are_logged_with_plans(self):
+        seed_center(rooms=2, children_per_room=2)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        log = Path(directory.name) / "slow.jsonl"
+
+        with override_settings(PLANNING_SLOW_QUERY_MS=0, PLANNING_SLOW_QUERY_LOG=log):
+            self.client.get(reverse("planning-dashboard"))
+            list(Child.objects.filter(id__in=[1, 2, 3]))
+            list(Child.objects.filter(id__in=[4, 5]))
+
+        entries = list(slow_queries.read_log(log))
+        origins = {entry["origin"] for entry in entries}
+        self.assertIn("planning-dashboard", origins)
+
+        # The IN lists differ, the fingerprint does not.
+        groups = [
+            g for g in slow_queries.summarize(entries)
+            if '"people_child"."id" IN (...)' in g["sql"]
+        ]
+        self.assertEqual(len(groups), 1)
+        self.assertEqual(groups[0]["count"], 2)
+        self.assertTrue(groups[0]["plan"])
+        self.assertTrue(any("tests.py" in frame for frame in groups[0]["stack"]))
+
+        # Off by default.
+        size = log.stat().st_size
+        list(Child.objects.all())
+        self.assertEqual(log.stat().st_size, size)
+
+    def test_failed_explain_rolls_back_to_a_savepoint(self):
+        with CaptureQueriesContext(connection) as ctx:
+            plan = slow_queries._explain(connection, "SELECT * FROM missing_table", [])
+
+        self.assertTrue(plan[0].startswith("EXPLAIN failed"))
+        statements = [q["sql"] for q in ctx.captured_queries]
+        self.assertTrue(any(sql.startswith("ROLLBACK TO SAVEPOINT") for sql in statements))
+        self.assertEqual(Child.objects.count(), 0)
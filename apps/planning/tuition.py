@@ -0,0 +1,102 @@
+"""
+In-process tuition rate lookup.
+
+Every TuitionRate row is loaded once into a table keyed by (department,
+household type), holding that pair's effective dates in order.
+rates_as_of() resolves all pairs for one date, so bulk tuition
+computations cost one dict lookup per child and no queries.
+
+Writes to TuitionRate call invalidate() (see signals.py), which drops
+this process's table and bumps a version counter in the shared cache
+once the write commits; other processes compare that counter before
+using their copy.
+"""
+
+import time
+from bisect import bisect_right
+from datetime import date
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import TuitionRate
+
+
+VERSION_KEY = "planning:tuition:version"
+
+# Resolved dates kept per process before the memo is reset.
+MAX_MEMO_DATES = 366
+
+_state = {"version": None, "table": None, "memo": {}}
+
+
+def invalidate():
+    """
+    Drops the loaded rates here and in every other process, on
+    commit: a bump before it would let a reader reload the old rates
+    under the new version.
+    """
+
+    def drop():
+        _state["table"] = None
+        cache.set(VERSION_KEY, time.time_ns(), None)
+
+    transaction.on_commit(drop)
+
+
+def _table():
+
+    version = cache.get(VERSION_KEY)
+
+    if version is None:
+        version = time.time_ns()
+        cache.set(VERSION_KEY, version, None)
+
+    if _state["table"] is None or _state["version"] != version:
+        table = {}
+
+        for department, household_type, effective_from, amount in (
+            TuitionRate.objects
+            .order_by("effective_from")
+            .values_list("department", "household_type", "effective_from", "amount")
+        ):
+            dates, amounts = table.setdefault((department, household_type), ([], []))
+            dates.append(effective_from)
+            amounts.append(amount)
+
+        _state.update(version=version, table=table, memo={})
+
+    return _state["table"]
+
+
+def rates_as_of(as_of=None):
+    """
+    {(department, household_type): amount} for the rates in effect on
+    `as_of` (default: today). Pairs with no rate yet are left out.
+    """
+
+    as_of = as_of or date.today()
+    table = _table()
+    memo = _state["memo"]
+
+    if as_of not in memo:
+        if len(memo) >= MAX_MEMO_DATES:
+            memo.clear()
+
+        rates = {}
+        for pair, (dates, amounts) in table.items():
+            i = bisect_right(dates, as_of)
+            if i:
+                rates[pair] = amounts[i - 1]
+
+        memo[as_of] = rates
+
+    return memo[as_of]
+
+
+def rate_for(department, household_type, as_of=None):
+    """
+    Tuition in effect for one department and household type, or None.
+    """
+
+    return rates_as_of(as_of).get((department, household_type))
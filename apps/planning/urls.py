@@ -4,6 +4,42 @@ from . import views
 urlpatterns = [
     path("", views.dashboard, name="planning-dashboard"),
 
+    path(
+        "forecast/",
+        views.forecast_json,
+        name="forecast-json",
+    ),
+
+    path(
+        "waitlist/<int:entry_id>/position/",
+        views.waitlist_position,
+        name="waitlist-position",
+    ),
+
+    path(
+        "reports/occupancy/",
+        views.occupancy_report_json,
+        name="occupancy-report",
+    ),
+
+    path(
+        "billing/<int:year>-<int:month>.csv",
+        views.billing_csv,
+        name="billing-csv",
+    ),
+
+    path(
+        "_perf/",
+        views.perf_report,
+        name="perf-report",
+    ),
+
+    path(
+        "forecast-panel/",
+        views.forecast_panel,
+        name="forecast-panel",
+    ),
+
     path(
         "moveup-form/<int:child_id>/",
         views.moveup_form,
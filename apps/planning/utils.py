@@ -1,5 +1,3 @@
-from decimal import Decimal
-
 HOUSEHOLD_PRIORITY = {
     "CV": 100,
     "M": 75,
@@ -7,11 +5,16 @@ HOUSEHOLD_PRIORITY = {
     "P": 25,
 }
 
-# should NOT hardcode this long-term
-TUITION_RATES = {
-    # (room_name, household_type): rate
-    ("Infant", "staff"): Decimal("1200.00"),
-    ("Infant", "standard"): Decimal("1500.00"),
-    ("Toddler", "staff"): Decimal("1000.00"),
-    ("Toddler", "standard"): Decimal("1300.00"),
+# Waitlist scoring weights (see priority.py). After changing them, run
+# `manage.py recompute_waitlist_priority`.
+WAITLIST_SCORING = {
+    # Points by household type.
+    "household_type": HOUSEHOLD_PRIORITY,
+    # A sibling in the same household currently placed in a room.
+    "sibling_enrolled": 50,
+    # A preferred room whose age range fits the child at the requested start.
+    "preferred_room_match": 10,
+    # Points per whole month since the requested start, up to a cap.
+    "per_month_waiting": 2,
+    "max_months_waiting": 24,
 }
@@ -1,16 +1,26 @@
 from datetime import date
 
+from django.conf import settings
 from django.shortcuts import render, get_object_or_404
 from django.template.loader import render_to_string
-from django.http import HttpResponse
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse, Http404
 from django.contrib import messages
+from django.db import transaction
 from django.utils.timezone import now
 
-from apps.people.models import Child
-from apps.classrooms.models import Room
+from apps.people.models import Child, month_ordinal
 
-from .models import Placement, MoveUpPlan
+from .models import Placement, MoveUpPlan, WaitlistEntry
+from . import metrics, perf, ranking, rollup, room_registry
+from .billing import billing_csv_rows
+from .dashboard_cache import room_cards, cached_global_stats
 from .dashboard_logic import build_dashboard_data, build_global_stats
+from .forecasting import (
+    DEFAULT_HORIZON_MONTHS,
+    forecast_occupancy,
+    monthly_open_seats,
+)
 
 
 # -------------------------------------------------------
@@ -31,7 +41,7 @@ def _parse_transition(target_value):
         return None, "withdrawal"
 
     if target_value:
-        room = get_object_or_404(Room, id=target_value)
+        room = room_registry.get_or_404(target_value)
         return room, "moveup"
 
     return None, "moveup"
@@ -50,15 +60,45 @@ def _transition_message(request, child, exit_type, target_room=None):
 # Dashboard
 # -------------------------------------------------------
 
+def _as_of(request):
+    """
+    The ?as_of=YYYY-MM-DD date, or None when absent, invalid or today.
+    """
+
+    try:
+        as_of = date.fromisoformat(request.GET.get("as_of", ""))
+    except ValueError:
+        return None
+
+    return None if as_of == now().date() else as_of
+
+
 def dashboard(request):
 
-    room_data = build_dashboard_data()
-    stats = build_global_stats()
+    as_of = _as_of(request)
+
+    if as_of is None:
+        cards = room_cards()
+        stats = cached_global_stats()
+    else:
+        # Other dates are rare: rendered directly, never cached.
+        cards = [
+            {
+                "room": data["room"],
+                "html": render_to_string(
+                    "planning/partials/room_card.html",
+                    {"data": data},
+                ),
+            }
+            for data in build_dashboard_data(as_of=as_of)
+        ]
+        stats = build_global_stats(as_of=as_of)
 
     context = {
-        "room_data": room_data,
+        "room_cards": cards,
         "global_stats": stats,
         "today": now().date(),
+        "as_of": as_of,
     }
 
     return render(
@@ -67,6 +107,173 @@ def dashboard(request):
         context
     )
 
+# -------------------------------------------------------
+# Occupancy forecast
+# -------------------------------------------------------
+
+MAX_HORIZON_MONTHS = 60
+
+
+def _horizon_months(request, default):
+
+    try:
+        months = int(request.GET.get("months", default))
+    except ValueError:
+        months = default
+
+    return min(max(months, 1), MAX_HORIZON_MONTHS)
+
+
+def forecast_panel(request):
+
+    forecast = forecast_occupancy(months=_horizon_months(request, 12))
+    months, rows = monthly_open_seats(forecast)
+
+    return render(
+        request,
+        "planning/partials/forecast_panel.html",
+        {
+            "months": months,
+            "rows": rows,
+        },
+    )
+
+
+def forecast_json(request):
+
+    forecast = forecast_occupancy(
+        months=_horizon_months(request, DEFAULT_HORIZON_MONTHS)
+    )
+
+    return JsonResponse({
+        "start": forecast["start"].isoformat(),
+        "days": forecast["days"],
+        "rooms": [
+            {
+                "id": room.id,
+                "name": room.name,
+                "capacity": room.capacity,
+                "occupancy": occupancy,
+            }
+            for room, occupancy in zip(forecast["rooms"], forecast["occupancy"])
+        ],
+    })
+
+# -------------------------------------------------------
+# Waitlist position
+# -------------------------------------------------------
+
+def waitlist_position(request, entry_id):
+
+    entry = get_object_or_404(WaitlistEntry, id=entry_id)
+
+    return JsonResponse({
+        "entry": entry.id,
+        "status": entry.status,
+        "position": ranking.position(entry.id),
+        "waiting": ranking.waiting_count(),
+    })
+
+# -------------------------------------------------------
+# Occupancy report
+# -------------------------------------------------------
+
+@staff_member_required
+def occupancy_report_json(request):
+
+    try:
+        start = date.fromisoformat(request.GET.get("start", ""))
+        end = date.fromisoformat(request.GET.get("end", ""))
+    except ValueError:
+        return JsonResponse(
+            {"error": "start and end must look like YYYY-MM-DD."},
+            status=400,
+        )
+
+    start, end, rows = rollup.occupancy_between(start, end)
+
+    return JsonResponse({
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "rooms": [
+            {
+                "id": row["room"].id,
+                "name": row["room"].name,
+                "capacity": row["room"].capacity,
+                "person_days": row["person_days"],
+                "average": row["average"],
+                "occupancy_pct": row["occupancy_pct"],
+                "household_pct": row["household_pct"],
+            }
+            for row in rows
+        ],
+    })
+
+# -------------------------------------------------------
+# Request timings
+# -------------------------------------------------------
+
+@staff_member_required
+def perf_report(request):
+
+    if request.method == "POST":
+        perf.reset()
+
+    return render(
+        request,
+        "planning/perf.html",
+        {
+            "rows": perf.snapshot(),
+            "buckets": perf.BUCKETS_MS,
+        },
+    )
+
+# -------------------------------------------------------
+# Prometheus metrics
+# -------------------------------------------------------
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint. The scraper must send
+    PLANNING_METRICS_TOKEN as a bearer token; without a token set, the
+    metrics are served only with DEBUG on.
+    """
+
+    token = getattr(settings, "PLANNING_METRICS_TOKEN", None)
+
+    if not token and not settings.DEBUG:
+        return HttpResponse(status=403)
+
+    if token and request.headers.get("Authorization") != f"Bearer {token}":
+        return HttpResponse(status=401)
+
+    return HttpResponse(
+        metrics.render(),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+# -------------------------------------------------------
+# Billing
+# -------------------------------------------------------
+
+@staff_member_required
+def billing_csv(request, year, month):
+
+    try:
+        billing_month = date(year, month, 1)
+    except ValueError:
+        raise Http404("Invalid billing month.")
+
+    response = StreamingHttpResponse(
+        billing_csv_rows(billing_month),
+        content_type="text/csv",
+    )
+    response["Content-Disposition"] = (
+        f'attachment; filename="billing-{billing_month:%Y-%m}.csv"'
+    )
+
+    return response
+
 # -------------------------------------------------------
 # Transition form (create)
 # -------------------------------------------------------
@@ -76,21 +283,15 @@ def moveup_form(request, child_id):
     child = get_object_or_404(Child, id=child_id)
 
     room_id = request.GET.get("room_id")
-    current_room = get_object_or_404(Room, id=room_id)
+    current_room = room_registry.get_or_404(room_id)
 
     today = date.today()
 
-    age_months = (
-        (today.year - child.birth_date.year) * 12
-        + (today.month - child.birth_date.month)
-    )
-
-    rooms = Room.objects.filter(
-        min_age_months__lte=age_months + 3,
-        max_age_months__gte=age_months - 1,
-    ).exclude(id=current_room.id).order_by("min_age_months")
+    age_months = month_ordinal(today) - child.birth_month
 
-    max_room = Room.objects.order_by("-max_age_months").first()
+    rooms = room_registry.rooms_for_age(
+        age_months, below=1, above=3, exclude=current_room.id,
+    )
 
     return render(
         request,
@@ -115,7 +316,7 @@ def create_moveup(request):
         return resp
 
     child = get_object_or_404(Child, id=request.POST.get("child_id"))
-    current_room = get_object_or_404(Room, id=request.POST.get("room_id"))
+    current_room = room_registry.get_or_404(request.POST.get("room_id"))
 
     target_room, exit_type = _parse_transition(
         request.POST.get("target_room")
@@ -149,15 +350,17 @@ def create_moveup(request):
         messages.error(request, "Target room must be different.")
         return _refresh_room_card(request, current_room)
 
-    MoveUpPlan.objects.create(
-        child=child,
-        current_room=current_room,
-        target_room=target_room,
-        planned_date=planned_date,
-        teacher_notes=notes,
-        exit_type=exit_type,
-        status="planned",
-    )
+    # The plan and the room occupancy counters commit together.
+    with transaction.atomic():
+        MoveUpPlan.objects.create(
+            child=child,
+            current_room=current_room,
+            target_room=target_room,
+            planned_date=planned_date,
+            teacher_notes=notes,
+            exit_type=exit_type,
+            status="planned",
+        )
 
     _transition_message(request, child, exit_type, target_room)
 
@@ -170,23 +373,20 @@ def create_moveup(request):
 
 def edit_moveup_form(request, plan_id):
 
-    plan = get_object_or_404(MoveUpPlan, id=plan_id)
+    plan = get_object_or_404(
+        MoveUpPlan.objects.select_related("child"), id=plan_id,
+    )
 
-    current_room = plan.current_room
+    current_room = room_registry.get(plan.current_room_id)
+    plan.current_room = current_room
 
     today = date.today()
 
-    age_months = (
-        (today.year - plan.child.birth_date.year) * 12
-        + (today.month - plan.child.birth_date.month)
-    )
+    age_months = month_ordinal(today) - plan.child.birth_month
 
-    rooms = Room.objects.filter(
-        min_age_months__lte=age_months + 3,
-        max_age_months__gte=age_months - 1,
-    ).exclude(id=current_room.id).order_by("min_age_months")
-    
-    max_room = Room.objects.order_by("-max_age_months").first()
+    rooms = room_registry.rooms_for_age(
+        age_months, below=1, above=3, exclude=plan.current_room_id,
+    )
 
     return render(
         request,
@@ -225,7 +425,8 @@ def update_moveup(request, plan_id):
     plan.planned_date = request.POST.get("planned_date")
     plan.teacher_notes = request.POST.get("teacher_notes")
 
-    plan.save()
+    with transaction.atomic():
+        plan.save()
 
     _transition_message(request, plan.child, exit_type, target_room)
 
@@ -245,7 +446,9 @@ def cancel_moveup(request, plan_id):
     plan = get_object_or_404(MoveUpPlan, id=plan_id)
 
     plan.status = "cancelled"
-    plan.save()
+
+    with transaction.atomic():
+        plan.save()
 
     messages.warning(request, "Move-up plan cancelled.")
 
@@ -268,30 +471,33 @@ def implement_moveup(request, plan_id):
     source_room = plan.current_room
     target_room = plan.target_room
 
-    placement = Placement.objects.filter(
-        child=child,
-        room=source_room,
-        end_date__isnull=True,
-    ).first()
+    # Placements, plan and room occupancy counters commit together.
+    with transaction.atomic():
+
+        placement = Placement.objects.filter(
+            child=child,
+            room=source_room,
+            end_date__isnull=True,
+        ).first()
 
-    if placement:
-        placement.end_date = now().date()
-        placement.save()
+        if placement:
+            placement.end_date = now().date()
+            placement.save()
 
-    if plan.exit_type == "moveup":
+        if plan.exit_type == "moveup":
 
-        Placement.objects.create(
-            child=child,
-            room=target_room,
-            start_date=now().date(),
-        )
+            Placement.objects.create(
+                child=child,
+                room=target_room,
+                start_date=now().date(),
+            )
 
-    else:
-        child.enrolled = False
-        child.save()
+        else:
+            child.enrolled = False
+            child.save()
 
-    plan.status = "completed"
-    plan.save()
+        plan.status = "completed"
+        plan.save()
 
     _transition_message(request, child, plan.exit_type, target_room)
 
@@ -306,13 +512,7 @@ def implement_moveup(request, plan_id):
 # -------------------------------------------------------
 def _refresh_room_card(request, room):
 
-    data = build_dashboard_data(room_ids=[room.id])[0]
-
-    room_html = render_to_string(
-        "planning/partials/room_card.html",
-        {"data": data},
-        request=request,
-    )
+    room_html = room_cards(room_ids=[room.id])[0]["html"]
 
     messages_html = render_to_string(
         "partials/messages.html",
@@ -331,21 +531,12 @@ def _refresh_room_card(request, room):
 
 def _refresh_two_room_cards(request, room_a, room_b):
 
-    rooms = build_dashboard_data(room_ids=[room_a.id, room_b.id])
-
-    room_map = {r["room"].id: r for r in rooms}
+    cards = room_cards(room_ids=[room_a.id, room_b.id])
 
-    room_a_html = render_to_string(
-        "planning/partials/room_card.html",
-        {"data": room_map[room_a.id]},
-        request=request,
-    )
+    room_map = {card["room"].id: card["html"] for card in cards}
 
-    room_b_html = render_to_string(
-        "planning/partials/room_card.html",
-        {"data": room_map[room_b.id]},
-        request=request,
-    )
+    room_a_html = room_map[room_a.id]
+    room_b_html = room_map[room_b.id]
 
     messages_html = render_to_string(
         "partials/messages.html",
@@ -45,6 +45,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "apps.planning.middleware.ServerTimingMiddleware",
+    "apps.planning.middleware.QueryOriginMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -128,3 +130,19 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+
+# Bearer token Prometheus must send to scrape /metrics, which exposes
+# room occupancy, the waitlist length and view names. Without a token,
+# /metrics is served only with DEBUG on.
+PLANNING_METRICS_TOKEN = None
+
+# Directory for the per-process metrics files (default: comet-metrics
+# in the system temp directory). Empty it when the server starts.
+PLANNING_METRICS_DIR = None
+
+
+# Slow-query log (apps/planning/slow_queries.py): queries slower than
+# this many milliseconds are logged with their EXPLAIN output to
+# PLANNING_SLOW_QUERY_LOG. None turns it off.
+PLANNING_SLOW_QUERY_MS = None
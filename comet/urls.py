@@ -18,12 +18,15 @@ from django.contrib import admin
 from django.urls import path, include
 from django.views.generic import RedirectView
 
+from apps.planning.views import metrics_view
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("people/", include("apps.people.urls")),  # Includes all ACCC app URLs
     path("classrooms/", include("apps.classrooms.urls")),  # Includes all ACCC app URLs
     # path("operations/", include("apps.operations.urls")),  # Includes all ACCC app URLs
     path("planning/", include("apps.planning.urls")),  # Includes all ACCC app URLs
+    path("metrics", metrics_view, name="metrics"),
     path('', RedirectView.as_view(url='/planning', permanent=True)),
 ]
 urlpatterns += [